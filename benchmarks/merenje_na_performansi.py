@@ -0,0 +1,332 @@
+import argparse
+import contextlib
+import glob
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Додади го главниот директориум во патеката
+KOREN = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, KOREN)
+
+from examples.create_example import sozdadi_sekvenca
+from main import najdi_sliki_vo_folder
+from src.image_loader import TokNaSliki
+from src.instrumentation import Statistika
+from src.stitcher import PanoramaStitcher
+
+# Сценарија за скалирање: (број на слики, висина на сликите)
+SINTETICKI_SLUCAI = ['4x480', '8x480', '16x480', '4x960', '4x1920']
+
+# Преклоп помеѓу соседните синтетички слики
+SINTETICKI_PREKLOP = 0.4
+
+# Подесувања од кои зависат резултатите; основна линија со други вредности не се споредува
+PODESUVANJA_ZA_SPOREDBA = ('rezim', 'maks_sirina', 'sinteticki_preklop')
+
+
+def slicnost(rezultat, ocekuvana, golemina=512):
+    """
+    SSIM помеѓу резултатот и очекуваната панорама, во сиви тонови
+
+    Двете слики се намалуваат на обликот на очекуваната (најголема страна golemina),
+    па мали разлики во исечувањето ја намалуваат вредноста малку, а погрешна
+    регистрација многу.
+
+    Returns:
+        float: Од -1 до 1 (1 = исти слики)
+    """
+    visina, sirina = ocekuvana.shape[:2]
+    razmer = min(1.0, golemina / max(visina, sirina))
+    oblik = (max(1, int(sirina * razmer)), max(1, int(visina * razmer)))
+
+    a, b = (
+        cv2.cvtColor(cv2.resize(slika, oblik, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY).astype(np.float64)
+        for slika in (rezultat, ocekuvana)
+    )
+
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    zamati = lambda x: cv2.GaussianBlur(x, (11, 11), 1.5)
+    mu_a, mu_b = zamati(a), zamati(b)
+    var_a = zamati(a * a) - mu_a ** 2
+    var_b = zamati(b * b) - mu_b ** 2
+    kov = zamati(a * b) - mu_a * mu_b
+
+    mapa = ((2 * mu_a * mu_b + c1) * (2 * kov + c2)) / ((mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+    return float(mapa.mean())
+
+
+def maksimalen_rss_mb():
+    """
+    Највисокиот RSS на тековниот процес во MB (None ако не е достапен)
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux го враќа во KB, macOS во бајти
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def izvrsi_slucaj(slucaj, statistika, delovi=None):
+    """
+    Изврши го целиот тек (вчитување, спојување, енкодирање) за еден случај
+
+    Args:
+        delovi (list): Сликите на синтетичкиот случај (од sozdadi_sekvenca)
+
+    Returns:
+        numpy.ndarray: Панорамата или None
+    """
+    if slucaj['vid'] == 'realen':
+        sliki = TokNaSliki(najdi_sliki_vo_folder(slucaj['folder']), slucaj['maks_sirina'], statistika=statistika)
+    else:
+        sliki = delovi
+
+    stitcher = PanoramaStitcher(statistika=statistika, **slucaj['parametri'])
+    panorama = stitcher.napravi_panorama(sliki)
+
+    if panorama is not None:
+        with statistika.etapa('enkodiranje'):
+            cv2.imencode('.jpg', panorama)
+    return panorama
+
+
+def izmeri_slucaj(slucaj):
+    """
+    Измери го случајот: најдобро време од повторувањата, времиња по етапи,
+    врв на tracemalloc, највисок RSS и сличност со очекуваната панорама
+
+    Се извршува во свој процес, за RSS да се однесува само на овој случај.
+    Синтетичката сцена се генерира еднаш, надвор од мерењето.
+    """
+    delovi = ocekuvana = None
+    if slucaj['vid'] == 'sinteticki':
+        delovi, homografii, scena = sozdadi_sekvenca(
+            slucaj['sirina'], slucaj['visina'], slucaj['broj_sliki'], SINTETICKI_PREKLOP
+        )
+        # Очекуваната панорама е делот од сцената покриен со сликите, без маргината
+        x0, y0 = (int(round(v)) for v in homografii[0][:2, 2])
+        x1 = int(round(homografii[-1][0, 2])) + delovi[-1].shape[1]
+        ocekuvana = scena[y0:y0 + delovi[0].shape[0], x0:x1]
+
+    merenja = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(slucaj['povtoruvanja']):
+            statistika = Statistika()
+            pocetok = time.perf_counter()
+            panorama = izvrsi_slucaj(slucaj, statistika, delovi)
+            merenja.append((time.perf_counter() - pocetok, statistika.izvestaj(), panorama))
+
+        # tracemalloc го успорува извршувањето, па меморијата се мери во посебно поминување
+        tracemalloc.start()
+        izvrsi_slucaj(slucaj, Statistika(), delovi)
+        _, vrv = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    vreme, izvestaj, panorama = min(merenja, key=lambda m: m[0])
+
+    if slucaj['vid'] == 'realen':
+        ocekuvani = glob.glob(os.path.join(slucaj['folder'], '*_Expected.jpg'))
+        ocekuvana = cv2.imread(ocekuvani[0]) if ocekuvani else None
+
+    return {
+        'uspeh': panorama is not None,
+        'vreme': round(vreme, 4),
+        'etapi': {ime: etapa['vreme'] for ime, etapa in izvestaj['etapi'].items()},
+        'broevi': izvestaj['broevi'],
+        'tracemalloc_vrv_mb': round(vrv / (1024 * 1024), 2),
+        'rss_vrv_mb': maksimalen_rss_mb(),
+        'oblik': list(panorama.shape[:2]) if panorama is not None else None,
+        'slicnost': round(slicnost(panorama, ocekuvana), 4)
+                    if panorama is not None and ocekuvana is not None else None,
+    }
+
+
+def izmeri_vo_poseben_proces(slucaj):
+    """
+    Изврши го izmeri_slucaj во нов процес (spawn) и врати го резултатот
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as izvrsitel:
+        return izvrsitel.submit(izmeri_slucaj, slucaj).result()
+
+
+def napravi_slucai(folderi, sinteticki, parametri, maks_sirina, povtoruvanja):
+    """
+    Листа на случаи (речници) за реалните папки и синтетичките секвенци
+    """
+    slucai = {}
+    for folder in folderi:
+        slucai[os.path.basename(os.path.normpath(folder))] = {
+            'vid': 'realen', 'folder': folder, 'maks_sirina': maks_sirina,
+            'parametri': parametri, 'povtoruvanja': povtoruvanja,
+        }
+    for opis in sinteticki:
+        broj_sliki, visina = (int(x) for x in opis.split('x'))
+        # Сцена во која sozdadi_sekvenca сече слики visina x 4/3 visina
+        # (со маргина од еден пиксел околу деловите)
+        sirina_na_slika = visina * 4 // 3
+        sirina = int(sirina_na_slika * (1 + (broj_sliki - 1) * (1 - SINTETICKI_PREKLOP))) + 2
+        slucai[f"sinteticki_{opis}"] = {
+            'vid': 'sinteticki', 'broj_sliki': broj_sliki, 'visina': visina + 2, 'sirina': sirina,
+            'parametri': dict(parametri, smer='horizontal'), 'povtoruvanja': povtoruvanja,
+        }
+    return slucai
+
+
+def sporedi_so_osnova(rezultati, osnova, prag_na_vreme=0.2, prag_na_memorija=0.2, prag_na_slicnost=0.02,
+                      min_razlika_vo_vreme=0.05):
+    """
+    Најди ги регресиите во однос на основната линија
+
+    Времето и меморијата се регресија ако се поголеми за повеќе од прагот (релативно);
+    сличноста ако падне за повеќе од prag_na_slicnost (апсолутно). Разлики во времето
+    помали од min_razlika_vo_vreme секунди се шум и не се пријавуваат.
+
+    Returns:
+        list: Пораки за секоја регресија
+    """
+    regresii = []
+    for ime, novo in rezultati.items():
+        staro = osnova.get(ime)
+        if staro is None:
+            continue
+
+        if staro['uspeh'] and not novo['uspeh']:
+            regresii.append(f"{ime}: панорамата повеќе не се креира")
+            continue
+
+        if novo['vreme'] > staro['vreme'] * (1 + prag_na_vreme) and \
+                novo['vreme'] - staro['vreme'] > min_razlika_vo_vreme:
+            regresii.append(f"{ime}: време {staro['vreme']:.2f} s -> {novo['vreme']:.2f} s")
+
+        for kluc in ('tracemalloc_vrv_mb', 'rss_vrv_mb'):
+            if staro.get(kluc) and novo.get(kluc) and novo[kluc] > staro[kluc] * (1 + prag_na_memorija):
+                regresii.append(f"{ime}: {kluc} {staro[kluc]:.1f} -> {novo[kluc]:.1f}")
+
+        if staro.get('slicnost') is not None and novo.get('slicnost') is not None and \
+                novo['slicnost'] < staro['slicnost'] - prag_na_slicnost:
+            regresii.append(f"{ime}: сличност {staro['slicnost']:.3f} -> {novo['slicnost']:.3f}")
+
+    return regresii
+
+
+def razliki_vo_podesuvanjata(podesuvanja, osnova):
+    """
+    Најди ги подесувањата (PODESUVANJA_ZA_SPOREDBA) во кои основната линија се разликува
+
+    Returns:
+        list: Пораки за секое различно (или незапишано) подесување
+    """
+    razliki = []
+    for kluc in PODESUVANJA_ZA_SPOREDBA:
+        if kluc not in osnova:
+            razliki.append(f"{kluc}: не е запишано во основната линија (сега {podesuvanja[kluc]})")
+        elif osnova[kluc] != podesuvanja[kluc]:
+            razliki.append(f"{kluc}: {osnova[kluc]} во основната линија, сега {podesuvanja[kluc]}")
+    return razliki
+
+
+def napravi_tabela(rezultati):
+    """
+    Резултатите како Markdown табела
+    """
+    linii = [
+        "| Случај | Време | Најбавна етапа | tracemalloc | RSS | Сличност |",
+        "|---|---|---|---|---|---|",
+    ]
+    for ime, r in rezultati.items():
+        etapa = max(r['etapi'].items(), key=lambda e: e[1], default=('-', 0))
+        rss = f"{r['rss_vrv_mb']:.0f} MB" if r['rss_vrv_mb'] is not None else "-"
+        slicnost_ = f"{r['slicnost']:.3f}" if r['slicnost'] is not None else "-"
+        oznaka = '✅' if r['uspeh'] else '❌'
+        linii.append(f"| {ime} | {oznaka} {r['vreme'] * 1000:.0f} ms | {etapa[0]} ({etapa[1] * 1000:.0f} ms) "
+                     f"| {r['tracemalloc_vrv_mb']:.0f} MB | {rss} | {slicnost_} |")
+    return "\n".join(linii)
+
+
+def glavna_funkcija():
+    parser = argparse.ArgumentParser(
+        description='Измери време по етапи, меморија и квалитет врз реалните примери и синтетички секвенци'
+    )
+    parser.add_argument('folderi', nargs='*',
+                        help='Папки со panorama part слики (default: сите во Real_Life_examples)')
+    parser.add_argument('--sinteticki', nargs='*', default=SINTETICKI_SLUCAI,
+                        help='Синтетички секвенци како BROJxVISINA (default: %(default)s)')
+    parser.add_argument('--bez_realni', action='store_true', help='Не ги мери реалните папки')
+    parser.add_argument('--maks_sirina', type=int, default=1200)
+    parser.add_argument('--rezim', choices=['inkrementalen', 'globalen'], default='inkrementalen')
+    parser.add_argument('--povtoruvanja', type=int, default=3,
+                        help='Колку пати да се изврши секој случај (се зема најдоброто време)')
+    parser.add_argument('--izlez', help='Зачувај ги резултатите како JSON основна линија')
+    parser.add_argument('--sporedi', help='Спореди со JSON основна линија и врати код 1 при регресија')
+    parser.add_argument('--prag_na_vreme', type=float, default=0.2,
+                        help='Дозволено релативно зголемување на времето (default: 0.2)')
+    parser.add_argument('--prag_na_memorija', type=float, default=0.2,
+                        help='Дозволено релативно зголемување на меморијата (default: 0.2)')
+    parser.add_argument('--prag_na_slicnost', type=float, default=0.02,
+                        help='Дозволен апсолутен пад на сличноста (default: 0.02)')
+    args = parser.parse_args()
+
+    folderi = [] if args.bez_realni else (
+        args.folderi or sorted(glob.glob(os.path.join(KOREN, 'Real_Life_examples', '*_Panorama')))
+    )
+    parametri = dict(rezim=args.rezim, broj_rabotnici=1)
+    slucai = napravi_slucai(folderi, args.sinteticki, parametri, args.maks_sirina, args.povtoruvanja)
+    podesuvanja = {
+        'rezim': args.rezim, 'maks_sirina': args.maks_sirina, 'sinteticki_preklop': SINTETICKI_PREKLOP,
+        'povtoruvanja': args.povtoruvanja, 'python': platform.python_version(), 'opencv': cv2.__version__,
+        'procesori': os.cpu_count(), 'platforma': platform.platform(),
+    }
+
+    # Споредбата има смисла само со основна линија снимена со истите подесувања,
+    # па тоа се проверува пред мерењето
+    if args.sporedi:
+        with open(args.sporedi, encoding='utf-8') as f:
+            osnova = json.load(f)
+        razliki = razliki_vo_podesuvanjata(podesuvanja, osnova.get('podesuvanja', {}))
+        if razliki:
+            print(f"❌ {args.sporedi} е снимена со други подесувања; споредбата не е можна:")
+            for poraka in razliki:
+                print(f" • {poraka}")
+            sys.exit(2)
+
+    rezultati = {}
+    for ime, slucaj in slucai.items():
+        print(f"Мерење: {ime}...", flush=True)
+        rezultati[ime] = izmeri_vo_poseben_proces(slucaj)
+
+    print()
+    print(napravi_tabela(rezultati))
+
+    if args.izlez:
+        with open(args.izlez, 'w', encoding='utf-8') as f:
+            json.dump({'podesuvanja': podesuvanja, 'slucai': rezultati}, f, indent=2, ensure_ascii=False)
+        print(f"\nОсновната линија е зачувана во {args.izlez}")
+
+    if args.sporedi:
+        regresii = sporedi_so_osnova(rezultati, osnova['slucai'], args.prag_na_vreme, args.prag_na_memorija,
+                                     args.prag_na_slicnost)
+        if regresii:
+            print(f"\n❌ {len(regresii)} регресии во однос на {args.sporedi}:")
+            for poraka in regresii:
+                print(f" • {poraka}")
+            sys.exit(1)
+        print(f"\n✅ Нема регресии во однос на {args.sporedi}")
+
+
+if __name__ == "__main__":
+    glavna_funkcija()
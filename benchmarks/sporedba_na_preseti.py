@@ -0,0 +1,188 @@
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+
+import cv2
+
+# Додади го главниот директориум во патеката
+KOREN = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, KOREN)
+
+from benchmarks.merenje_na_performansi import slicnost
+from main import najdi_sliki_vo_folder
+from src.features import PRESETI
+from src.image_loader import vcitaj_sliki, promeni_golemina_na_slikite
+from src.stitcher import PanoramaStitcher
+
+
+# Најмала сличност (SSIM) со референцата за панорамата да се смета за точна
+PRAG_NA_SLICNOST = 0.9
+
+# Пресетот чиј резултат е референца за папките без *_Expected.jpg
+REFERENTEN_PRESET = 'quality'
+
+
+def razumna_golemina(panorama, sliki):
+    """
+    Дали платното може да е панорама од овие слики
+
+    Сликите се преклопуваат, па панорамата не може да има поголема површина
+    (ни поголема страна) од сите слики ставени една до друга; погрешна
+    хомографија обично дава многукратно поголемо платно.
+    """
+    visina, sirina = panorama.shape[:2]
+    return (visina * sirina <= sum(s.shape[0] * s.shape[1] for s in sliki)
+            and visina <= sum(s.shape[0] for s in sliki)
+            and sirina <= sum(s.shape[1] for s in sliki))
+
+
+def izmeri_preset(sliki, preset, rezim, referenca=None, prag_na_slicnost=PRAG_NA_SLICNOST):
+    """
+    Изврши го stitcher-от со даден пресет и провери го квалитетот на резултатот
+
+    Args:
+        referenca (numpy.ndarray): Очекувана панорама; без неа се проверува само големината
+
+    Returns:
+        dict: Време во секунди, дали е успешно, колку слики се споени без хомографија,
+              сличност со референцата, облик на платното, причина за неуспех и панорамата
+    """
+    stitcher = PanoramaStitcher(preset=preset, rezim=rezim)
+
+    pocetok = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        panorama = stitcher.napravi_panorama(sliki)
+    vreme = time.perf_counter() - pocetok
+
+    rezultat = {
+        'vreme': vreme,
+        'uspeh': False,
+        'ednostavni': stitcher.broj_ednostavni_spojuvanja,
+        'slicnost': None,
+        'oblik': panorama.shape[:2] if panorama is not None else None,
+        'pricina': None,
+        'panorama': panorama,
+    }
+
+    # Успех: секоја слика е регистрирана со хомографија, платното е со разумна
+    # големина и резултатот личи на референцата
+    if panorama is None:
+        rezultat['pricina'] = 'нема резултат'
+    elif stitcher.broj_ednostavni_spojuvanja:
+        rezultat['pricina'] = f"{stitcher.broj_ednostavni_spojuvanja} без хомографија"
+    elif not razumna_golemina(panorama, sliki):
+        rezultat['pricina'] = f"платно {panorama.shape[1]}x{panorama.shape[0]}"
+    else:
+        if referenca is not None:
+            rezultat['slicnost'] = slicnost(panorama, referenca)
+        if rezultat['slicnost'] is not None and rezultat['slicnost'] < prag_na_slicnost:
+            rezultat['pricina'] = f"SSIM {rezultat['slicnost']:.2f}"
+        else:
+            rezultat['uspeh'] = True
+    return rezultat
+
+
+def najdi_referenca(folder):
+    """
+    Очекуваната панорама (*_Expected.jpg) во папката или None
+    """
+    ocekuvani = glob.glob(os.path.join(folder, '*_Expected.jpg'))
+    return cv2.imread(ocekuvani[0]) if ocekuvani else None
+
+
+def napravi_izvestaj(folderi, preseti, maks_sirina, rezim, povtoruvanja):
+    """
+    Спореди ги пресетите на сите папки и врати извештај во Markdown
+
+    Референцата е *_Expected.jpg од папката, а ако ја нема, панорамата од
+    REFERENTEN_PRESET (ако таа самата помине на проверката на големината).
+    """
+    rezultati = {preset: [] for preset in preseti}
+    redovi = []
+
+    # Референтниот пресет се мери прв, за неговиот резултат да биде референца,
+    # а колоните остануваат во дадениот редослед
+    redosled = preseti
+    preseti = sorted(preseti, key=lambda preset: preset != REFERENTEN_PRESET)
+
+    for folder in folderi:
+        with contextlib.redirect_stdout(io.StringIO()):
+            sliki = promeni_golemina_na_slikite(
+                vcitaj_sliki(najdi_sliki_vo_folder(folder), maks_sirina), maks_sirina
+            )
+        if len(sliki) < 2:
+            continue
+
+        referenca = najdi_referenca(folder)
+        izvor_na_referenca = 'Expected'
+
+        celii = {}
+        for preset in preseti:
+            merenja = [izmeri_preset(sliki, preset, rezim, referenca) for _ in range(povtoruvanja)]
+            najdobro = min(merenja, key=lambda m: m['vreme'])
+            rezultati[preset].append(najdobro)
+
+            if referenca is None and preset == REFERENTEN_PRESET:
+                izvor_na_referenca = REFERENTEN_PRESET if najdobro['uspeh'] else '-'
+                if najdobro['uspeh']:
+                    referenca = najdobro['panorama']
+
+            if najdobro['uspeh']:
+                oznaka = '✅' if najdobro['slicnost'] is None else f"✅ {najdobro['slicnost']:.3f}"
+            else:
+                oznaka = f"❌ ({najdobro['pricina']})"
+            celii[preset] = f"{najdobro['vreme'] * 1000:.0f} ms {oznaka}"
+            najdobro['panorama'] = None
+
+        redovi.append([os.path.basename(folder), str(len(sliki)), izvor_na_referenca]
+                      + [celii[preset] for preset in redosled])
+
+    linii = [
+        f"# Споредба на пресети ({rezim}, maks_sirina={maks_sirina})",
+        "",
+        f"Успех: секоја слика е регистрирана со хомографија, платното не е поголемо од сликите "
+        f"ставени една до друга и SSIM со референцата е барем {PRAG_NA_SLICNOST}. Референцата е "
+        f"*_Expected.jpg, или резултатот од `{REFERENTEN_PRESET}` за папките без него.",
+        "",
+        "| Папка | Слики | Референца | " + " | ".join(redosled) + " |",
+        "|---|---|---|" + "---|" * len(redosled),
+    ]
+    linii += ["| " + " | ".join(red) + " |" for red in redovi]
+
+    vkupno = ["**Вкупно**", "", ""]
+    for preset in redosled:
+        merenja = rezultati[preset]
+        vreme = sum(m['vreme'] for m in merenja)
+        uspesni = sum(m['uspeh'] for m in merenja)
+        vkupno.append(f"{vreme * 1000:.0f} ms, {uspesni}/{len(merenja)} успешни")
+    linii.append("| " + " | ".join(vkupno) + " |")
+
+    return "\n".join(linii) + "\n"
+
+
+def glavna_funkcija():
+    parser = argparse.ArgumentParser(description='Спореди време и квалитет на пресетите за детекција')
+    parser.add_argument('folderi', nargs='*',
+                        help='Папки со panorama part слики (default: сите во Real_Life_examples)')
+    parser.add_argument('--maks_sirina', type=int, default=1200)
+    parser.add_argument('--rezim', choices=['inkrementalen', 'globalen'], default='inkrementalen')
+    parser.add_argument('--povtoruvanja', type=int, default=3,
+                        help='Колку пати да се изврши секој пресет (се зема најдоброто време)')
+    parser.add_argument('--izlez', help='Зачувај го извештајот во Markdown фајл')
+    args = parser.parse_args()
+
+    folderi = args.folderi or sorted(glob.glob(os.path.join(KOREN, 'Real_Life_examples', '*_Panorama')))
+    izvestaj = napravi_izvestaj(folderi, list(PRESETI), args.maks_sirina, args.rezim, args.povtoruvanja)
+
+    print(izvestaj)
+    if args.izlez:
+        with open(args.izlez, 'w', encoding='utf-8') as f:
+            f.write(izvestaj)
+
+
+if __name__ == "__main__":
+    glavna_funkcija()
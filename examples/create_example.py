@@ -1,6 +1,11 @@
+import argparse
 import cv2
+import json
+import math
 import numpy as np
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 def sozdadi_horizontalni_primeri_sliki():
     """
@@ -15,13 +20,12 @@ def sozdadi_horizontalni_primeri_sliki():
 
     # Додади комплексна текстура
     # 1. Градиент позадина
-    for i in range(500):
-        for j in range(1500):
-            golema_slika[i, j] = [
-                (i + j) % 256,  # R
-                (i * 2 + j) % 256,  # G
-                (i + j * 2) % 256  # B
-            ]
+    i, j = np.ogrid[:500, :1500]
+    golema_slika[...] = np.dstack([
+        (i + j) % 256,  # R
+        (i * 2 + j) % 256,  # G
+        (i + j * 2) % 256  # B
+    ])
 
     # 2. Додади различни облици на различни места
     # Прв дел од сликата
@@ -71,13 +75,12 @@ def sozdadi_vertikalni_primeri_sliki():
     golema_slika = np.zeros((1500, 500, 3), dtype=np.uint8)  # Висока и тесна
 
     # Додади комплексна текстура - вертикален градиент
-    for i in range(1500):
-        for j in range(500):
-            golema_slika[i, j] = [
-                (i * 2 + j) % 256,  # R
-                (i + j * 3) % 256,  # G
-                (i * 3 + j * 2) % 256  # B
-            ]
+    i, j = np.ogrid[:1500, :500]
+    golema_slika[...] = np.dstack([
+        (i * 2 + j) % 256,  # R
+        (i + j * 3) % 256,  # G
+        (i * 3 + j * 2) % 256  # B
+    ])
 
     # 2. Додади различни облици на различни висини (за вертикален преклоп)
     # Горен дел од сликата
@@ -118,6 +121,146 @@ def sozdadi_vertikalni_primeri_sliki():
     print("✅ Креирани се 3 вертикални слики со голем преклоп!")
     print("  Овие се портрет-ориентирани слики за вертикална панорама.")
 
+def sintetiziraj_tekstura(visina, sirina, rng, golemini_na_kletki=(256, 64, 16, 4), opagjanje=0.9,
+                          gustina_na_oblici=1 / 5000):
+    """
+    Векторизирана текстура: шум во повеќе октави (мрежи од случајни вредности,
+    зголемени со кубна интерполација) и случајни кругови и правоаголници
+
+    Шумот дава клучни точки на секоја резолуција, а облиците остри агли.
+
+    Args:
+        visina (int): Висина на текстурата
+        sirina (int): Ширина на текстурата
+        rng (numpy.random.Generator): Генератор на случајни броеви
+        golemini_na_kletki (tuple): Големина на ќелиите на секоја октава во пиксели
+        opagjanje (float): Колку пати е послаба секоја следна (пофина) октава
+        gustina_na_oblici (float): Број на облици по пиксел
+
+    Returns:
+        numpy.ndarray: BGR слика (visina, sirina, 3)
+    """
+    tekstura = np.zeros((visina, sirina, 3), dtype=np.float32)
+    amplituda = 1.0
+    for kletka in golemini_na_kletki:
+        mreza = rng.random((visina // kletka + 2, sirina // kletka + 2, 3), dtype=np.float32)
+        tekstura += amplituda * cv2.resize(mreza, (sirina, visina), interpolation=cv2.INTER_CUBIC)
+        amplituda *= opagjanje
+
+    cv2.normalize(tekstura, tekstura, 0, 255, cv2.NORM_MINMAX)
+    tekstura = tekstura.astype(np.uint8)
+
+    broj_oblici = int(visina * sirina * gustina_na_oblici)
+    centri = rng.integers(0, (sirina, visina), size=(broj_oblici, 2))
+    golemini = rng.integers(5, max(6, min(visina, sirina) // 20), size=broj_oblici)
+    boi = rng.integers(0, 256, size=(broj_oblici, 3))
+    for (x, y), r, boja, krug in zip(centri, golemini, boi, rng.random(broj_oblici) < 0.5):
+        boja = tuple(int(b) for b in boja)
+        if krug:
+            cv2.circle(tekstura, (int(x), int(y)), int(r), boja, -1)
+        else:
+            cv2.rectangle(tekstura, (int(x - r), int(y - r)), (int(x + r), int(y + r // 2)), boja, -1)
+
+    return tekstura
+
+def sozdadi_sekvenca(sirina=4000, visina=1500, broj_delovi=5, preklop=0.4, smer='horizontal',
+                     tresenje=0, rotacija=0.0, seme=0):
+    """
+    Креирај секвенца на делови од една синтетичка сцена, со позната хомографија за секој дел
+
+    Деловите се нанижани по насоката со даден преклоп; секој дел може случајно
+    да се помести (tresenje) и да се ротира околу својот центар (rotacija), а
+    останува цел во сцената. Хомографијата на делот ги пресликува неговите
+    пиксели во пикселите на сцената, па релативната хомографија од дел j во
+    дел i е inv(H_i) @ H_j.
+
+    Args:
+        sirina (int): Ширина на сцената (платното)
+        visina (int): Висина на сцената
+        broj_delovi (int): Број на делови
+        preklop (float): Дел од сликата што се преклопува со следниот дел (0 до 1)
+        smer (str): 'horizontal' или 'vertical'
+        tresenje (int): Најголемо случајно поместување на секој дел во пиксели
+        rotacija (float): Најголема случајна ротација на секој дел во степени
+        seme (int): Семе за генераторот на случајни броеви
+
+    Returns:
+        tuple: (delovi, homografii, scena)
+    """
+    if smer not in ('horizontal', 'vertical'):
+        raise ValueError(f"Непозната насока: {smer}")
+    if not 0 <= preklop < 1:
+        raise ValueError(f"Преклопот мора да биде во [0, 1): {preklop}")
+
+    rng = np.random.default_rng(seme)
+    scena = sintetiziraj_tekstura(visina, sirina, rng)
+
+    # Распоредот се пресметува по должината (dolzina) и попреку (sirocina) на насоката
+    dolzina, sirocina = (sirina, visina) if smer == 'horizontal' else (visina, sirina)
+
+    # Маргина доволна за најголемото поместување и ротација на делот
+    sin_r = math.sin(math.radians(abs(rotacija)))
+    dolzina_na_del_gore = dolzina / (1 + (broj_delovi - 1) * (1 - preklop))
+    margina_d = tresenje + math.ceil(sirocina * sin_r / 2) + 1
+    margina_s = tresenje + math.ceil(dolzina_na_del_gore * sin_r / 2) + 1
+
+    d = int((dolzina - 2 * margina_d) / (1 + (broj_delovi - 1) * (1 - preklop)))
+    s = sirocina - 2 * margina_s
+    if d < 16 or s < 16:
+        raise ValueError("Сцената е премала за овој број на делови, поместување и ротација")
+    cekor = d * (1 - preklop)
+
+    # Замена на x и y, за вертикалниот распоред да се пресмета како хоризонтален
+    zamena = np.array([[0, 1, 0], [1, 0, 0], [0, 0, 1]], dtype=np.float64)
+
+    delovi, homografii = [], []
+    for i in range(broj_delovi):
+        pomestuvanje = rng.uniform(-tresenje, tresenje, size=2) if tresenje else np.zeros(2)
+        agol = math.radians(rng.uniform(-rotacija, rotacija)) if rotacija else 0.0
+
+        cd = margina_d + d / 2 + round(i * cekor) + pomestuvanje[0]
+        cs = sirocina / 2 + pomestuvanje[1]
+        cos_a, sin_a = math.cos(agol), math.sin(agol)
+        H = np.array([[1, 0, cd], [0, 1, cs], [0, 0, 1]], dtype=np.float64) \
+            .dot(np.array([[cos_a, -sin_a, 0], [sin_a, cos_a, 0], [0, 0, 1]])) \
+            .dot(np.array([[1, 0, -d / 2], [0, 1, -s / 2], [0, 0, 1]]))
+
+        golemina = (d, s)
+        if smer == 'vertical':
+            H = zamena.dot(H).dot(zamena)
+            golemina = (s, d)
+
+        # WARP_INVERSE_MAP: пикселот (x, y) од делот се зема од H @ (x, y) во сцената
+        delovi.append(cv2.warpAffine(scena, H[:2], golemina, flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP))
+        homografii.append(H)
+
+    return delovi, homografii, scena
+
+def zacuvaj_sekvenca(direktorium, ime, delovi, homografii, scena):
+    """
+    Зачувај ја секвенцата како папка што main.py --folder ја препознава
+
+    Во direktorium/{ime}_Panorama се запишуваат {ime}_panorama_Part{N}.jpg,
+    сцената како {ime}_Panorama_Expected.jpg и хомографиите во {ime}_homografii.json.
+
+    Returns:
+        str: Патека до папката
+    """
+    folder = os.path.join(direktorium, f"{ime}_Panorama")
+    os.makedirs(folder, exist_ok=True)
+
+    zapisi = [(os.path.join(folder, f"{ime}_panorama_Part{i}.jpg"), del_) for i, del_ in enumerate(delovi, start=1)]
+    zapisi.append((os.path.join(folder, f"{ime}_Panorama_Expected.jpg"), scena))
+
+    # cv2.imwrite го ослободува GIL, па JPEG енкодирањето оди паралелно
+    with ThreadPoolExecutor() as izvrsitel:
+        list(izvrsitel.map(lambda zapis: cv2.imwrite(*zapis), zapisi))
+
+    with open(os.path.join(folder, f"{ime}_homografii.json"), 'w', encoding='utf-8') as f:
+        json.dump({f"Part{i}": H.tolist() for i, H in enumerate(homografii, start=1)}, f, indent=2)
+
+    return folder
+
 def sozdadi_primeri_sliki():
     """
     Креирај ги сите пример слики (хоризонтални и вертикални)
@@ -149,5 +292,41 @@ def sozdadi_primeri_sliki():
     print("  python main.py examples/slika1.jpg examples/slika2.jpg examples/slika3.jpg --smer auto --pokazi")
     print("  python main.py examples/slika4.jpg examples/slika5.jpg examples/slika6.jpg --smer auto --pokazi")
 
+def glavna_funkcija():
+    """
+    Без аргументи ги креира пример сликите; со --sekvenci креира синтетички
+    секвенци за тестирање на брзината и точноста
+    """
+    parser = argparse.ArgumentParser(description='Креирај пример слики или синтетички секвенци за панорама')
+    parser.add_argument('--sekvenci', type=int, default=0,
+                        help='Колку синтетички секвенци да се креираат (default: 0, само пример сликите)')
+    parser.add_argument('--izlez', default='sinteticki_sekvenci', help='Директориум за секвенците')
+    parser.add_argument('--sirina', type=int, default=4000, help='Ширина на сцената (default: 4000)')
+    parser.add_argument('--visina', type=int, default=1500, help='Висина на сцената (default: 1500)')
+    parser.add_argument('--delovi', type=int, default=5, help='Број на делови по секвенца (default: 5)')
+    parser.add_argument('--preklop', type=float, default=0.4, help='Преклоп помеѓу соседни делови (default: 0.4)')
+    parser.add_argument('--smer', choices=['horizontal', 'vertical'], default='horizontal')
+    parser.add_argument('--tresenje', type=int, default=0,
+                        help='Најголемо случајно поместување на деловите во пиксели (default: 0)')
+    parser.add_argument('--rotacija', type=float, default=0.0,
+                        help='Најголема случајна ротација на деловите во степени (default: 0)')
+    parser.add_argument('--seme', type=int, default=0, help='Семе на првата секвенца; секоја следна е +1')
+    args = parser.parse_args()
+
+    if not args.sekvenci:
+        sozdadi_primeri_sliki()
+        return
+
+    pocetok = time.perf_counter()
+    for i in range(args.sekvenci):
+        delovi, homografii, scena = sozdadi_sekvenca(
+            args.sirina, args.visina, args.delovi, args.preklop, args.smer,
+            args.tresenje, args.rotacija, args.seme + i
+        )
+        folder = zacuvaj_sekvenca(args.izlez, f"Sinteticka{args.seme + i}", delovi, homografii, scena)
+        print(f"✅ [{i + 1}/{args.sekvenci}] {folder}")
+
+    print(f"Креирани се {args.sekvenci} секвенци за {time.perf_counter() - pocetok:.1f} s")
+
 if __name__ == "__main__":
-    sozdadi_primeri_sliki()
\ No newline at end of file
+    glavna_funkcija()
\ No newline at end of file
@@ -3,14 +3,23 @@ import argparse
 import sys
 import os
 import glob
+import io
+import time
+import contextlib
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 
 # Додади патека до src директориумот
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-from src.image_loader import vcitaj_sliki, promeni_golemina_na_slikite
+from src.image_loader import TokNaSliki
+from src.instrumentation import Statistika
+from src.manifest import hesh_na_fajl, vcitaj_manifest, zacuvaj_manifest
 from src.stitcher import PanoramaStitcher
-from src.utils import pokazi_slika, zacuvaj_slika
+from src.utils import bez_ispis, broj_na_procesori, pokazi_slika, zacuvaj_slika
 
 def najdi_sliki_vo_folder(folder_patistina):
     """
@@ -72,7 +81,11 @@ def generiraj_unikatno_ime_za_slika(bazno_ime):
         brojach += 1
 
 def obraboti_panorama_folder(folder_patistina, pokazi_rezultat=False,
-                             maks_sirina=1200, smer='auto'):
+                             maks_sirina=1200, smer='auto', rezim=None, matcher='bf',
+                             detektor='sift', preset=None, minijatura=0, udel_na_preklop=None,
+                             broj_rabotnici=None, privremen_direktorium=None, isecuvanje='opfat',
+                             statistika=None, kes_direktorium=None, kes_na_disk_maks_mb=1024, manifest=False,
+                             model_na_dvizenje='auto'):
     """
     Обработи една panorama папка
 
@@ -81,6 +94,23 @@ def obraboti_panorama_folder(folder_patistina, pokazi_rezultat=False,
         pokazi_rezultat (bool): Дали да се прикаже резултатот
         maks_sirina (int): Максимална ширина на сликите
         smer (str): 'auto' за автоматска детекција, 'horizontal' за хоризонтална панорама, 'vertical' за вертикална
+        rezim (str): 'inkrementalen', 'globalen' (регистрација на соседни слики, едно компонирање)
+                     или None (inkrementalen, а со manifest globalen)
+                     или 'edno_do_drugo' (слики без преклоп, едно платно)
+        matcher (str): 'bf', 'flann' или 'crosscheck'
+        detektor (str): 'sift', 'orb' или 'akaze'
+        preset (str): 'fast', 'balanced', 'quality' или None (ги надминува detektor и matcher)
+        minijatura (int): Големина на минијатурите за грубо-кон-фино регистрирање (0 = исклучено)
+        udel_na_preklop (float): Ширина на рабовите за детекција како дел од сликата (None = цела слика)
+        broj_rabotnici (int): Број на нишки за паралелна детекција (None = број на процесори)
+        privremen_direktorium (str): Директориум за memmap платната (None = платната се во RAM)
+        isecuvanje (str): 'opfat' (опфатот на сликите) или 'vnatresen' (правоаголник без празни пиксели)
+        statistika (Statistika): Каде се мерат етапите и бројачите (None = не се враќаат)
+        kes_direktorium (str): Директориум за кешот на клучни точки на диск (None = без кеш на диск)
+        kes_na_disk_maks_mb (int): Најголема големина на кешот на диск во MB
+        manifest (bool): Ажурирај го постоечкиот резултат според манифестот до него
+                         (види azuriraj_so_manifest) наместо да се креира нов _Result_N
+        model_na_dvizenje (str): 'auto' (поместување, сличност, па хомографија) или 'homografija'
     Returns:
         bool: Дали беше успешно
     """
@@ -92,6 +122,13 @@ def obraboti_panorama_folder(folder_patistina, pokazi_rezultat=False,
         print(f"Насока: {smer}")
     print(f"{'='*60}")
 
+    # Манифестот ги чува регистрациите на соседните парови, па работи само со globalen
+    if manifest and rezim not in (None, 'globalen'):
+        print(f"Грешка: --manifest работи само со --rezim globalen, не со {rezim}")
+        return False
+    if rezim is None:
+        rezim = 'globalen' if manifest else 'inkrementalen'
+
     # Провери дали папката постои
     if not os.path.exists(folder_patistina):
         print(f"Грешка: Папката {folder_patistina} не постои!")
@@ -109,29 +146,28 @@ def obraboti_panorama_folder(folder_patistina, pokazi_rezultat=False,
     for patistina in sliki_patisti:
         print(f" • {os.path.basename(patistina)}")
 
-    # Вчитај ги сликите
+    # Сликите се вчитуваат и намалуваат дури кога stitcher-от ќе стигне до нив
     print("\nВчитување на сликите...")
-    sliki = vcitaj_sliki(sliki_patisti)
+    if statistika is None:
+        statistika = Statistika()
+    sliki = TokNaSliki(sliki_patisti, maks_sirina, statistika=statistika)
 
     if len(sliki) < 2:
         print("Грешка: Неуспешно вчитување на доволно слики!")
         return False
 
-    # Промени големина на сликите
-    print("Промена на големина на сликите...")
-    sliki = promeni_golemina_na_slikite(sliki, maks_sirina)
-
     # Креирај панорама
     if smer == 'auto':
         print("Креирање на панорама (автоматска детекција на насока)...")
     else:
         print(f"Креирање на {smer} панорама...")
-    stitcher = PanoramaStitcher(smer=smer)
-    panorama = stitcher.napravi_panorama(sliki)
-
-    if panorama is None:
-        print("Неуспех при креирање на панорама!")
-        return False
+    stitcher = PanoramaStitcher(smer=smer, rezim=rezim, matcher=matcher, detektor=detektor, preset=preset,
+                                minijatura=minijatura, udel_na_preklop=udel_na_preklop,
+                                broj_rabotnici=broj_rabotnici, privremen_direktorium=privremen_direktorium,
+                                isecuvanje=isecuvanje, statistika=statistika,
+                                kes_direktorium=kes_direktorium,
+                                kes_na_disk_maks_bajti=kes_na_disk_maks_mb * 1024 * 1024,
+                                model_na_dvizenje=model_na_dvizenje)
 
     # Генерирај име за резултатот
     folder_ime = os.path.basename(folder_patistina)
@@ -151,11 +187,32 @@ def obraboti_panorama_folder(folder_patistina, pokazi_rezultat=False,
 
     patistina_na_rezultat = os.path.join(folder_patistina, ime_na_rezultat)
 
-    # Генерирај уникатно име ако фајлот веќе постои
-    patistina_na_rezultat = generiraj_unikatno_ime_za_slika(patistina_na_rezultat)
+    if manifest:
+        # Манифестот го памети резултатот, кој понатаму се ажурира на место
+        patistina_na_manifest = os.path.join(folder_patistina, ime_na_rezultat.replace('_Result', '_Manifest', 1))
+        patistina_na_manifest = os.path.splitext(patistina_na_manifest)[0] + '.json'
+        uspeh, panorama, patistina_na_rezultat = azuriraj_so_manifest(
+            stitcher, sliki, patistina_na_manifest, patistina_na_rezultat, maks_sirina, statistika
+        )
+        if not uspeh:
+            print("Неуспех при креирање на панорама!")
+            return False
+        # Непроменетиот резултат се декодира само ако треба да се прикаже
+        if panorama is None and pokazi_rezultat:
+            panorama = cv2.imread(patistina_na_rezultat)
+    else:
+        panorama = stitcher.napravi_panorama(sliki)
+
+        if panorama is None:
+            print("Неуспех при креирање на панорама!")
+            return False
+
+        # Генерирај уникатно име ако фајлот веќе постои
+        patistina_na_rezultat = generiraj_unikatno_ime_za_slika(patistina_na_rezultat)
 
-    # Зачувај го резултатот
-    zacuvaj_slika(panorama, patistina_na_rezultat)
+        # Зачувај го резултатот
+        with statistika.etapa('enkodiranje'):
+            zacuvaj_slika(panorama, patistina_na_rezultat)
 
     # Прикажи го резултатот ако е потребно
     if pokazi_rezultat:
@@ -167,6 +224,289 @@ def obraboti_panorama_folder(folder_patistina, pokazi_rezultat=False,
     print(f"✅ Успешно креирана панорама: {os.path.basename(patistina_na_rezultat)}")
     return True
 
+def azuriraj_so_manifest(stitcher, sliki, patistina_na_manifest, patistina_na_rezultat, maks_sirina, statistika):
+    """
+    Ажурирај го резултатот на папката користејќи го манифестот
+
+    Манифестот го содржи хешот на секој дел, неговата хомографија и каде е
+    резултатот во рамката. Ако ниту еден дел не е променет, резултатот останува
+    како што е; инаку се регистрираат само новите или променетите делови (види
+    PanoramaStitcher.azuriraj_panorama) и резултатот и манифестот се запишуваат одново.
+
+    До манифестот се чува и PNG копија од резултатот (без загуби). При додавање
+    делови се продолжува од неа, а не од JPEG резултатот, за старите пиксели да
+    не губат квалитет со секое ажурирање; ако ја нема, сите делови се компонираат одново.
+
+    Args:
+        patistina_na_rezultat (str): Име за резултатот ако сè уште нема важечки манифест
+                                     (како и без манифест, постоечки фајл не се пребришува)
+
+    Returns:
+        tuple: (uspeh, panorama, patistina_na_rezultat); panorama е None ако
+               резултатот е ажурен (тогаш не се декодира)
+    """
+    folder_patistina = os.path.dirname(patistina_na_manifest)
+    hesovi = [hesh_na_fajl(patistina) for patistina in sliki.patistina_sliki]
+
+    # Манифестот важи само ако резултатот што го опишува не е менуван
+    manifest = vcitaj_manifest(patistina_na_manifest)
+    if manifest is not None:
+        zapisan = os.path.join(folder_patistina, manifest['rezultat']['ime'])
+        if manifest.get('maks_sirina') == maks_sirina and os.path.exists(zapisan) and \
+                hesh_na_fajl(zapisan) == manifest['rezultat']['hesh']:
+            patistina_na_rezultat = zapisan
+        else:
+            print("Манифестот не одговара на резултатот. Сè се регистрира одново...")
+            manifest = None
+
+    patistina_na_kopija = os.path.splitext(patistina_na_manifest)[0] + '.png'
+
+    stara_panorama = None
+    if manifest is not None:
+        if [d['hesh'] for d in manifest['delovi']] == hesovi and \
+                manifest['parametri'] == stitcher.parametri_za_manifest():
+            print("✅ Нема нови или променети делови; резултатот е ажурен")
+            return True, None, patistina_na_rezultat
+        kopija = manifest['rezultat'].get('kopija')
+        if kopija is not None and os.path.exists(patistina_na_kopija) and \
+                hesh_na_fajl(patistina_na_kopija) == kopija['hesh']:
+            with statistika.etapa('dekodiranje'):
+                stara_panorama = cv2.imread(patistina_na_kopija)
+    else:
+        patistina_na_rezultat = generiraj_unikatno_ime_za_slika(patistina_na_rezultat)
+
+    panorama, nov_manifest = stitcher.azuriraj_panorama(hesovi, sliki.vcitaj, manifest, stara_panorama)
+    if panorama is None:
+        return False, None, patistina_na_rezultat
+
+    with statistika.etapa('enkodiranje'):
+        if not zacuvaj_slika(panorama, patistina_na_rezultat) or \
+                not zacuvaj_slika(panorama, patistina_na_kopija):
+            return False, None, patistina_na_rezultat
+
+    nov_manifest['maks_sirina'] = maks_sirina
+    nov_manifest['rezultat']['ime'] = os.path.basename(patistina_na_rezultat)
+    nov_manifest['rezultat']['hesh'] = hesh_na_fajl(patistina_na_rezultat)
+    nov_manifest['rezultat']['kopija'] = {
+        'ime': os.path.basename(patistina_na_kopija),
+        'hesh': hesh_na_fajl(patistina_na_kopija),
+    }
+    for del_, patistina in zip(nov_manifest['delovi'], sliki.patistina_sliki):
+        del_['ime'] = os.path.basename(patistina)
+    zacuvaj_manifest(patistina_na_manifest, nov_manifest)
+    print(f"Манифестот е зачуван како: {os.path.basename(patistina_na_manifest)}")
+
+    return True, panorama, patistina_na_rezultat
+
+def izmeri_obrabotka_na_folder(folder_patistina, parametri, tivko=False):
+    """
+    Обработи папка и измери колку трае
+
+    Args:
+        folder_patistina (str): Патека до папката
+        parametri (dict): Параметри за obraboti_panorama_folder
+        tivko (bool): Дали да се скрие излезот (при паралелна обработка)
+
+    Returns:
+        tuple: (folder_patistina, uspeh, vreme_vo_sekundi, greska, statistika), каде
+               statistika е извештајот од Statistika.izvestaj()
+    """
+    statistika = Statistika()
+    pocetok = time.perf_counter()
+    greska = None
+    try:
+        if tivko:
+            with contextlib.redirect_stdout(io.StringIO()):
+                uspeh = obraboti_panorama_folder(folder_patistina, statistika=statistika, **parametri)
+        else:
+            uspeh = obraboti_panorama_folder(folder_patistina, statistika=statistika, **parametri)
+    except Exception as e:
+        uspeh = False
+        greska = str(e)
+
+    return folder_patistina, uspeh, time.perf_counter() - pocetok, greska, statistika.izvestaj()
+
+def inicijaliziraj_rabotnik(niski_na_opencv):
+    """
+    Ограничи ги внатрешните нишки на OpenCV во процесот на работникот
+    """
+    cv2.setNumThreads(niski_na_opencv)
+
+def obraboti_vo_bazen(folderi, parametri, broj_procesi, niski_na_opencv, rezultati, vkupno):
+    """
+    Обработи ги папките во еден pool на процеси и запиши ги резултатите во rezultati
+
+    Ако некој работник падне (на пр. го убие оперативниот систем), pool-от е
+    неупотреблив и сите недовршени папки добиваат BrokenProcessPool; тие не се
+    запишуваат, туку се враќаат за повторна обработка.
+
+    Returns:
+        list: Папките што не се довршени поради паднат процес, по редоследот на folderi
+    """
+    prekinati = set()
+    with ProcessPoolExecutor(max_workers=broj_procesi, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=inicijaliziraj_rabotnik, initargs=(niski_na_opencv,)) as izvrsitel:
+        idni = {
+            izvrsitel.submit(izmeri_obrabotka_na_folder, folder_patistina, parametri, True): folder_patistina
+            for folder_patistina in folderi
+        }
+
+        for idno in as_completed(idni):
+            folder_patistina = idni[idno]
+            try:
+                rezultat = idno.result()
+            except BrokenProcessPool:
+                prekinati.add(folder_patistina)
+                continue
+            except Exception as e:
+                rezultat = (folder_patistina, False, 0.0, str(e), Statistika().izvestaj())
+
+            rezultati[folder_patistina] = rezultat
+            oznaka = '✅' if rezultat[1] else '❌'
+            print(f"{oznaka} [{len(rezultati)}/{vkupno}] {os.path.basename(folder_patistina)} "
+                  f"({rezultat[2]:.1f} s)")
+
+    return [folder_patistina for folder_patistina in folderi if folder_patistina in prekinati]
+
+def obraboti_folderi_paralelno(folderi, parametri, broj_procesi):
+    """
+    Обработи ги папките паралелно во посебни процеси
+
+    Процесите остануваат живи за целата серија и секој зема нова папка штом
+    ќе заврши претходната, па една бавна папка не ги задржува останатите.
+    Ако работник падне, недовршените папки се обработуваат повторно во нов
+    pool; ако и тогаш ниедна не се доврши, секоја оди во свој процес, за
+    падот да ја собори само папката што го предизвикува.
+
+    Args:
+        folderi (list): Патеки до папките
+        parametri (dict): Параметри за obraboti_panorama_folder
+        broj_procesi (int): Број на процеси
+
+    Returns:
+        list: (folder_patistina, uspeh, vreme_vo_sekundi, greska, statistika) по редоследот на folderi
+    """
+    # Процесорите се делат меѓу работниците, за OpenCV да не создава премногу нишки
+    niski_na_opencv = max(1, broj_na_procesori() // broj_procesi)
+    print(f"Паралелна обработка на {len(folderi)} папки во {broj_procesi} процеси "
+          f"({niski_na_opencv} OpenCV нишки по процес)...")
+
+    rezultati = {}
+    preostanati = list(folderi)
+    while preostanati:
+        prekinati = obraboti_vo_bazen(preostanati, parametri, broj_procesi, niski_na_opencv,
+                                      rezultati, len(folderi))
+        if not prekinati:
+            break
+
+        if len(prekinati) < len(preostanati):
+            print(f"⚠️  Процес на работник падна; {len(prekinati)} недовршени папки се обработуваат повторно...")
+            preostanati = prekinati
+            continue
+
+        # Ниедна папка не е довршена: секоја во свој процес
+        print(f"⚠️  Процес на работник падна; {len(prekinati)} папки се обработуваат одделно...")
+        for folder_patistina in prekinati:
+            if obraboti_vo_bazen([folder_patistina], parametri, 1, niski_na_opencv, rezultati, len(folderi)):
+                rezultati[folder_patistina] = (folder_patistina, False, 0.0,
+                                               "Процесот на работникот падна", Statistika().izvestaj())
+                print(f"❌ [{len(rezultati)}/{len(folderi)}] {os.path.basename(folder_patistina)} "
+                      f"(процесот падна)")
+        break
+
+    return [rezultati[folder_patistina] for folder_patistina in folderi]
+
+def pecati_rezime(rezultati, smer, vreme_vkupno):
+    """
+    Испечати резиме со успех и време за секоја папка
+    """
+    uspeshni = sum(1 for _, uspeh, _, _, _ in rezultati if uspeh)
+
+    print(f"\n{'='*60}")
+    print(f"РЕЗИМЕ: Успешно обработени {uspeshni} од {len(rezultati)} папки")
+    for folder_patistina, uspeh, vreme, greska, _ in rezultati:
+        oznaka = '✅' if uspeh else '❌'
+        opis = f" - {greska}" if greska else ""
+        print(f" {oznaka} {os.path.basename(os.path.normpath(folder_patistina))}: {vreme:.1f} s{opis}")
+    print(f"Вкупно време: {vreme_vkupno:.1f} s (збир по папки: {sum(r[2] for r in rezultati):.1f} s)")
+    if smer == 'auto':
+        print(f"Насока на панорами: автоматско детектирање")
+    else:
+        print(f"Насока на паноами: {smer}")
+    print(f"{'='*60}")
+
+def pecati_statistika_json(rezultati):
+    """
+    Испечати по една JSON линија за секоја папка: успех, вкупно време и мерењата по етапи
+
+    'vlez' е патеката до папката (или листата слики кога се спојуваат поединечни слики).
+    """
+    for folder_patistina, uspeh, vreme, greska, statistika in rezultati:
+        izvestaj = {
+            'vlez': folder_patistina,
+            'uspeh': bool(uspeh),
+            'vreme': round(vreme, 6),
+            'greska': greska,
+        }
+        izvestaj.update(statistika)
+        print(json.dumps(izvestaj, ensure_ascii=False), flush=True)
+
+def obraboti_poedinecni_sliki(args, statistika):
+    """
+    Спој ги сликите дадени во командната линија во една панорама (без --folder)
+
+    Args:
+        args (argparse.Namespace): Аргументите од командната линија
+        statistika (Statistika): Каде се мерат етапите и бројачите
+
+    Returns:
+        bool: Дали беше успешно
+    """
+    if args.smer == 'auto':
+        print("Креирање на панорама (автоматска детекција на насока)...")
+    else:
+        print(f"Креирање на {args.smer} панорама...")
+    print("Вчитување на сликите...")
+    sliki = TokNaSliki(args.vlez, args.maks_sirina, statistika=statistika)
+
+    if len(sliki) < 2:
+        print("Грешка: Неуспешно вчитување на доволно слики!")
+        return False
+
+    if args.smer == 'auto':
+        print("Креирање на панорама (автоматска детекција на насока)...")
+    else:
+        print(f"Креирање на {args.smer} панорама...")
+    stitcher = PanoramaStitcher(smer=args.smer, rezim=args.rezim, matcher=args.matcher,
+                                detektor=args.detektor, preset=args.preset,
+                                minijatura=args.minijatura, udel_na_preklop=args.udel_na_preklop,
+                                broj_rabotnici=args.rabotnici,
+                                privremen_direktorium=args.privremen_direktorium,
+                                isecuvanje=args.isecuvanje, statistika=statistika,
+                                kes_direktorium=args.kes_direktorium,
+                                kes_na_disk_maks_bajti=args.kes_na_disk_maks_mb * 1024 * 1024,
+                                model_na_dvizenje=args.model_na_dvizenje)
+    panorama = stitcher.napravi_panorama(sliki)
+
+    if panorama is None:
+        print("Неуспех при креирање на панорама!")
+        return False
+
+    # Генерирај уникатно име за излезната слика
+    izlez_patistina = generiraj_unikatno_ime_za_slika(args.izlez)
+
+    with statistika.etapa('enkodiranje'):
+        zacuvaj_slika(panorama, izlez_patistina)
+
+    if args.pokazi:
+        if args.smer == 'auto':
+            pokazi_slika(panorama, f"Панорама - Резултат ({os.path.basename(izlez_patistina)})")
+        else:
+            pokazi_slika(panorama, f"Панорама - Резултат ({args.smer}) ({os.path.basename(izlez_patistina)})")
+
+    print(f"✅ Панорамата е успешно зачувана како: {izlez_patistina}")
+    return True
+
 def glavna_funkcija():
     """
     Главна функција за креирање на панорама
@@ -215,25 +555,164 @@ def glavna_funkcija():
         help='Насока на спојување: auto за автоматска детекција (default), horizontal за хоризонтална панорама, vertical за вертикална панорама'
     )
 
+    parser.add_argument(
+        '--rezim',
+        choices=['inkrementalen', 'globalen', 'edno_do_drugo'],
+        default=None,
+        help='Режим на спојување: inkrementalen (default; со --manifest globalen) ја спојува секоја слика со панорамата досега, globalen ги регистрира соседните слики и ги компонира сите еднаш (побрзо за долги секвенци), edno_do_drugo ги нанижува сликите без преклоп во едно платно'
+    )
+
+    parser.add_argument(
+        '--matcher',
+        choices=['bf', 'flann', 'crosscheck'],
+        default='bf',
+        help='Начин на совпаѓање на дескриптори: bf исцрпно (default), flann приближно со KD-дрва (побрзо), crosscheck исцрпно со вкрстена проверка'
+    )
+
+    parser.add_argument(
+        '--detektor',
+        choices=['sift', 'orb', 'akaze'],
+        default='sift',
+        help='Детектор на клучни точки (default: sift). Нормата и прагот за совпаѓање се прилагодуваат автоматски'
+    )
+
+    parser.add_argument(
+        '--preset',
+        choices=['fast', 'balanced', 'quality'],
+        default=None,
+        help='Готова комбинација на детектор и matcher: fast (SIFT 1000 точки + FLANN, само рабовите), balanced (SIFT 2000 точки + FLANN), quality (SIFT 5000 точки + BF). Ги надминува --detektor и --matcher'
+    )
+
+    parser.add_argument(
+        '--minijatura',
+        type=int,
+        default=0,
+        help='Грубо-кон-фино регистрирање: хомографијата се проценува на минијатури со оваа најголема страна (на пр. 400), а се доточнува само во преклопот (default: 0, исклучено). Делува само со --rezim globalen'
+    )
+
+    parser.add_argument(
+        '--udel_na_preklop',
+        type=float,
+        default=None,
+        help='Детектирај клучни точки само во рабовите по насоката на панорамата, широки колку овој дел од сликата (на пр. 0.3). Ако нема доволно совпаѓања, рабовите автоматски се прошируваат (default: целата слика)'
+    )
+
+    parser.add_argument(
+        '--rabotnici',
+        type=int,
+        default=None,
+        help='Број на нишки што паралелно ги детектираат клучните точки на следните слики додека трае спојувањето (default: број на достапни процесори, 1 = без паралелна детекција)'
+    )
+
+    parser.add_argument(
+        '--privremen_direktorium',
+        default=None,
+        help='Чувај го платното на панорамата во np.memmap фајл во овој директориум наместо во RAM, за панорами поголеми од меморијата (default: во RAM)'
+    )
+
+    parser.add_argument(
+        '--isecuvanje',
+        choices=['opfat', 'vnatresen'],
+        default='opfat',
+        help='Исечување на резултатот: opfat (default) го зема опфатот на сликите, vnatresen најголемиот правоаголник без празни (црни) делови'
+    )
+
+    parser.add_argument(
+        '--model_na_dvizenje',
+        choices=['auto', 'homografija'],
+        default='auto',
+        help='Модел на движење помеѓу соседни слики: auto (default) пробува поместување, па сличност (ротација и скалирање), па хомографија и го зема првиот што ги објаснува совпаѓањата; homografija секогаш пресметува целосна хомографија'
+    )
+
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        help='Со --folder: обработи ги папките паралелно во N процеси (default: 1, една по една)'
+    )
+
+    parser.add_argument(
+        '--kes_direktorium', '--cache-dir',
+        default=None,
+        help='Чувај ги клучните точки и дескрипторите во .npz фајлови во овој директориум, за повторно извршување врз истите слики (на пр. со друго --isecuvanje) да не ги детектира одново (default: без кеш на диск)'
+    )
+
+    parser.add_argument(
+        '--kes_na_disk_maks_mb',
+        type=int,
+        default=1024,
+        help='Најголема големина на кешот на диск во MB; најдавно користените записи се бришат (default: 1024)'
+    )
+
+    parser.add_argument(
+        '--manifest',
+        action='store_true',
+        help='Со --folder: чувај манифест (хеш и хомографија на секој дел) до резултатот и при следното извршување регистрирај и додај ги само новите или променетите делови; резултатот се ажурира на место наместо да се креира _Result_N. Работи со --rezim globalen (default со --manifest)'
+    )
+
+    parser.add_argument(
+        '--stats',
+        choices=['json'],
+        default=None,
+        help='Испечати извештај со времињата по етапи (dekodiranje, detekcija, sovpagjanje, ransac, transformacija, ...) и бројачите (kliucevi, sovpadanja, inlieri, alocirani_bajti), по една JSON линија за секоја папка'
+    )
+
+    parser.add_argument(
+        '--log',
+        choices=['detalno', 'rezime', 'tivko'],
+        default='detalno',
+        help='Колку да се печати: detalno (default) сè, rezime само резимето на крајот, tivko ништо освен --stats извештајот'
+    )
+
     args = parser.parse_args()
 
+    # Манифестот ги чува регистрациите на соседните парови, па работи само со globalen
+    if args.manifest and args.rezim not in (None, 'globalen'):
+        parser.error(f"--manifest работи само со --rezim globalen, не со {args.rezim}")
+    if args.rezim is None:
+        args.rezim = 'globalen' if args.manifest else 'inkrementalen'
+
+    # Инкременталниот режим ја совпаѓа новата слика со складиштето на клучни точки
+    # на работна резолуција (минијатурите ги користи само резервната детекција на
+    # насока), а edno_do_drugo воопшто не регистрира
+    if args.minijatura and args.rezim in ('inkrementalen', 'edno_do_drugo'):
+        print(f"⚠️ --minijatura не ја забрзува регистрацијата во {args.rezim} режим; "
+              f"користете --rezim globalen")
+
+    # Со --log rezime/tivko пораките од обработката не се печатат
+    tivko = args.log != 'detalno'
+
     # Провери дали обработуваме папки или поединечни слики
     if args.folder:
         # Обработка на папки
-        uspeshni = 0
-        vkupno = len(args.vlez)
-
-        for folder_patistina in args.vlez:
-            if obraboti_panorama_folder(folder_patistina, args.pokazi, args.maks_sirina, args.smer):
-                uspeshni += 1
-
-        print(f"\n{'='*60}")
-        print(f"РЕЗИМЕ: Успешно обработени {uspeshni} од {vkupno} папки")
-        if args.smer == 'auto':
-            print(f"Насока на панорами: автоматско детектирање")
+        pocetok = time.perf_counter()
+        parametri = dict(
+            pokazi_rezultat=args.pokazi, maks_sirina=args.maks_sirina, smer=args.smer,
+            rezim=args.rezim, matcher=args.matcher, detektor=args.detektor, preset=args.preset,
+            minijatura=args.minijatura, udel_na_preklop=args.udel_na_preklop,
+            broj_rabotnici=args.rabotnici, privremen_direktorium=args.privremen_direktorium,
+            isecuvanje=args.isecuvanje, kes_direktorium=args.kes_direktorium,
+            kes_na_disk_maks_mb=args.kes_na_disk_maks_mb, manifest=args.manifest,
+            model_na_dvizenje=args.model_na_dvizenje
+        )
+
+        if args.jobs > 1 and len(args.vlez) > 1:
+            if args.pokazi:
+                print("⚠️ --pokazi не се поддржува со --jobs; резултатите само се зачувуваат")
+            parametri['pokazi_rezultat'] = False
+            # Паралелизмот е по папки, па секој процес детектира во една нишка
+            if args.rabotnici is None:
+                parametri['broj_rabotnici'] = 1
+            with bez_ispis() if args.log == 'tivko' else contextlib.nullcontext():
+                rezultati = obraboti_folderi_paralelno(args.vlez, parametri, min(args.jobs, len(args.vlez)))
         else:
-            print(f"Насока на паноами: {args.smer}")
-        print(f"{'='*60}")
+            rezultati = [izmeri_obrabotka_na_folder(folder_patistina, parametri, tivko)
+                         for folder_patistina in args.vlez]
+
+        if args.log != 'tivko':
+            pecati_rezime(rezultati, args.smer, time.perf_counter() - pocetok)
+        if args.stats == 'json':
+            pecati_statistika_json(rezultati)
 
     else:
         # Стариот начин: обработка на поединечни слики
@@ -244,43 +723,13 @@ def glavna_funkcija():
             print("Насока: python main.py слика1.jpg слика2.jpg --smer vertical")
             return
 
-        if args.smer == 'auto':
-            print("Креирање на панорама (автоматска детекција на насока)...")
-        else:
-            print(f"Креирање на {args.smer} панорама...")
-        print("Вчитување на сликите...")
-        sliki = vcitaj_sliki(args.vlez)
-
-        if len(sliki) < 2:
-            print("Грешка: Неуспешно вчитување на доволно слики!")
-            return
-
-        print("Промена на големина на сликите...")
-        sliki = promeni_golemina_na_slikite(sliki, args.maks_sirina)
-
-        if args.smer == 'auto':
-            print("Креирање на панорама (автоматска детекција на насока)...")
-        else:
-            print(f"Креирање на {args.smer} панорама...")
-        stitcher = PanoramaStitcher(smer=args.smer)
-        panorama = stitcher.napravi_panorama(sliki)
-
-        if panorama is None:
-            print("Неуспех при креирање на панорама!")
-            return
-
-        # Генерирај уникатно име за излезната слика
-        izlez_patistina = generiraj_unikatno_ime_za_slika(args.izlez)
-
-        zacuvaj_slika(panorama, izlez_patistina)
-
-        if args.pokazi:
-            if args.smer == 'auto':
-                pokazi_slika(panorama, f"Панорама - Резултат ({os.path.basename(izlez_patistina)})")
-            else:
-                pokazi_slika(panorama, f"Панорама - Резултат ({args.smer}) ({os.path.basename(izlez_patistina)})")
+        statistika = Statistika()
+        pocetok = time.perf_counter()
+        with bez_ispis() if tivko else contextlib.nullcontext():
+            uspeh = obraboti_poedinecni_sliki(args, statistika)
 
-        print(f"✅ Панорамата е успешно зачувана како: {izlez_patistina}")
+        if args.stats == 'json':
+            pecati_statistika_json([(args.vlez, uspeh, time.perf_counter() - pocetok, None, statistika.izvestaj())])
 
 if __name__ == "__main__":
     glavna_funkcija()
\ No newline at end of file
@@ -0,0 +1,263 @@
+import hashlib
+import os
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from src.features import Karakteristiki
+
+
+def presmetaj_kluc_na_slika(slika):
+    """
+    Пресметај клуч за слика според нејзината содржина
+
+    Args:
+        slika (numpy.ndarray): Слика (сива или во боја)
+
+    Returns:
+        str: Хеш од пикселите, обликот и типот на сликата
+    """
+    slika = np.ascontiguousarray(slika)
+    hesh = hashlib.blake2b(digest_size=16)
+    hesh.update(str((slika.shape, slika.dtype.str)).encode())
+    hesh.update(slika.data)
+    return hesh.hexdigest()
+
+
+class FeatureCache:
+    """
+    LRU кеш за Karakteristiki со ограничување по бајти
+
+    Се чуваат само клучните точки и дескрипторите, не и сликите, па кешот не
+    ги задржува декодираните слики од долга секвенца. Безбеден е за
+    користење од повеќе нишки (паралелна детекција).
+    """
+
+    def __init__(self, maks_bajti=256 * 1024 * 1024):
+        """
+        Иницијализирај го кешот
+
+        Args:
+            maks_bajti (int): Максимална вкупна големина на зачуваните записи во бајти
+        """
+        self.maks_bajti = maks_bajti
+        self.zafateni_bajti = 0
+        self.pogodoci = 0
+        self.promasuvanja = 0
+        self._zapisi = OrderedDict()
+        self._brava = threading.Lock()
+
+    def __len__(self):
+        return len(self._zapisi)
+
+    def __contains__(self, kluc):
+        return kluc in self._zapisi
+
+    @staticmethod
+    def golemina_na_zapis(karakteristiki):
+        """
+        Колку бајти зафаќа еден запис во кешот
+        """
+        return karakteristiki.nbytes
+
+    def zemi(self, kluc):
+        """
+        Врати ги Karakteristiki за клучот или None ако ги нема
+        """
+        with self._brava:
+            zapis = self._zapisi.get(kluc)
+            if zapis is None:
+                self.promasuvanja += 1
+                return None
+
+            self._zapisi.move_to_end(kluc)
+            self.pogodoci += 1
+            return zapis[0]
+
+    def stavi(self, kluc, karakteristiki):
+        """
+        Зачувај ги Karakteristiki и исфрли ги најстарите записи ако се надмине буџетот
+        """
+        golemina = self.golemina_na_zapis(karakteristiki)
+
+        # Запис поголем од целиот буџет не се чува
+        if golemina > self.maks_bajti:
+            return
+
+        with self._brava:
+            if kluc in self._zapisi:
+                self.zafateni_bajti -= self._zapisi.pop(kluc)[1]
+
+            self._zapisi[kluc] = (karakteristiki, golemina)
+            self.zafateni_bajti += golemina
+
+            while self.zafateni_bajti > self.maks_bajti:
+                _, star_zapis = self._zapisi.popitem(last=False)
+                self.zafateni_bajti -= star_zapis[1]
+
+    def isprazni(self):
+        """
+        Избриши ги сите записи од кешот
+        """
+        with self._brava:
+            self._zapisi.clear()
+            self.zafateni_bajti = 0
+
+
+class DiskFeatureCache:
+    """
+    Кеш за Karakteristiki во компресирани .npz фајлови во директориум
+
+    Записите остануваат помеѓу извршувањата, па повторното спојување на истите
+    слики (на пр. со други параметри за исечување) не ги детектира клучните
+    точки одново. Клучот е истиот како во FeatureCache (содржина и облик на
+    сликата, параметри на детекторот, регион), заедно со верзијата на OpenCV.
+    Кога директориумот ќе ја надмине maks_bajti, се бришат најдавно користените
+    фајлови. Фајловите се запишуваат атомски, па повеќе процеси (--jobs) можат
+    да го делат истиот директориум.
+    """
+
+    NASTAVKA = '.npz'
+
+    def __init__(self, direktorium, maks_bajti=1024 * 1024 * 1024):
+        """
+        Args:
+            direktorium (str): Директориум за фајловите (се креира ако не постои)
+            maks_bajti (int): Максимална вкупна големина на фајловите во бајти
+        """
+        self.direktorium = direktorium
+        self.maks_bajti = maks_bajti
+        self.pogodoci = 0
+        self.promasuvanja = 0
+        self._brava = threading.Lock()
+
+        os.makedirs(direktorium, exist_ok=True)
+        self.zafateni_bajti = sum(golemina for _, _, golemina in self._zapisi())
+
+    def _patistina(self, kluc):
+        hesh = hashlib.blake2b(repr((cv2.__version__, kluc)).encode(), digest_size=16)
+        return os.path.join(self.direktorium, hesh.hexdigest() + self.NASTAVKA)
+
+    def _zapisi(self):
+        """
+        (patistina, vreme_na_koristenje, golemina) за секој фајл во кешот
+        """
+        zapisi = []
+        for zapis in os.scandir(self.direktorium):
+            if not zapis.name.endswith(self.NASTAVKA):
+                continue
+            try:
+                stat = zapis.stat()
+            except FileNotFoundError:
+                continue  # друг процес го избришал
+            zapisi.append((zapis.path, stat.st_mtime, stat.st_size))
+        return zapisi
+
+    def zemi(self, kluc):
+        """
+        Врати ги Karakteristiki за клучот или None ако ги нема
+        """
+        patistina = self._patistina(kluc)
+        try:
+            with np.load(patistina) as podatoci:
+                karakteristiki = Karakteristiki(
+                    podatoci['xy'], podatoci['golemina'], podatoci['agol'], podatoci['odziv'],
+                    podatoci['oktava'], podatoci['deskriptori'] if 'deskriptori' in podatoci else None
+                )
+            # Времето на менување служи како време на последно користење
+            os.utime(patistina)
+        except FileNotFoundError:
+            with self._brava:
+                self.promasuvanja += 1
+            return None
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            # Оштетен фајл (на пр. скратен при пад на дискот): се брише и се пресметува одново
+            self._izbrisi(patistina)
+            with self._brava:
+                self.promasuvanja += 1
+            return None
+
+        with self._brava:
+            self.pogodoci += 1
+        return karakteristiki
+
+    def stavi(self, kluc, karakteristiki):
+        """
+        Запиши ги Karakteristiki на диск и исфрли ги најстарите фајлови ако се надмине буџетот
+        """
+        nizi = dict(
+            xy=karakteristiki.xy, golemina=karakteristiki.golemina, agol=karakteristiki.agol,
+            odziv=karakteristiki.odziv, oktava=karakteristiki.oktava
+        )
+        if karakteristiki.deskriptori is not None:
+            nizi['deskriptori'] = karakteristiki.deskriptori
+
+        patistina = self._patistina(kluc)
+        fajl = None
+        try:
+            # Прво во привремен фајл, па преименувај: читателите никогаш не гледаат половичен фајл
+            with tempfile.NamedTemporaryFile(dir=self.direktorium, suffix='.tmp', delete=False) as fajl:
+                np.savez_compressed(fajl, **nizi)
+            # Постоечкиот фајл за истиот клуч се заменува, па неговата големина не смее да се брои двапати
+            try:
+                stara_golemina = os.path.getsize(patistina)
+            except OSError:
+                stara_golemina = 0
+            os.replace(fajl.name, patistina)
+            golemina = os.path.getsize(patistina)
+        except OSError as e:
+            # Недовршениот привремен фајл не треба да остане во директориумот (на пр. кога дискот е полн)
+            if fajl is not None:
+                try:
+                    os.remove(fajl.name)
+                except OSError:
+                    pass
+            print(f"Предупредување: клучните точки не се зачувани во кешот на диск: {e}")
+            return
+
+        with self._brava:
+            self.zafateni_bajti = max(0, self.zafateni_bajti + golemina - stara_golemina)
+            if self.zafateni_bajti > self.maks_bajti:
+                self._isfrli()
+
+    def _izbrisi(self, patistina):
+        """
+        Избриши еден фајл од кешот и одземи ја неговата големина
+        """
+        try:
+            golemina = os.path.getsize(patistina)
+            os.remove(patistina)
+        except OSError:
+            return
+        with self._brava:
+            self.zafateni_bajti = max(0, self.zafateni_bajti - golemina)
+
+    def _isfrli(self):
+        # Големината се пресметува одново, бидејќи и други процеси пишуваат во директориумот
+        zapisi = sorted(self._zapisi(), key=lambda zapis: zapis[1])
+        self.zafateni_bajti = sum(golemina for _, _, golemina in zapisi)
+
+        for patistina, _, golemina in zapisi:
+            if self.zafateni_bajti <= self.maks_bajti:
+                break
+            try:
+                os.remove(patistina)
+            except FileNotFoundError:
+                pass
+            self.zafateni_bajti -= golemina
+
+    def isprazni(self):
+        """
+        Избриши ги сите фајлови од кешот
+        """
+        with self._brava:
+            for patistina, _, _ in self._zapisi():
+                try:
+                    os.remove(patistina)
+                except FileNotFoundError:
+                    pass
+            self.zafateni_bajti = 0
@@ -0,0 +1,172 @@
+import cv2
+import numpy as np
+
+
+class Karakteristiki:
+    """
+    Компактни клучни точки и дескриптори на една слика
+
+    Наместо листа од cv2.KeyPoint објекти, сите својства се чуваат во NumPy низи,
+    што е побрзо за обработка и поевтино за кеширање.
+    """
+
+    __slots__ = ('xy', 'golemina', 'agol', 'odziv', 'oktava', 'deskriptori')
+
+    def __init__(self, xy, golemina, agol, odziv, oktava, deskriptori):
+        """
+        Args:
+            xy (numpy.ndarray): Координати (N, 2) float32
+            golemina (numpy.ndarray): Дијаметар на клучната точка (N,)
+            agol (numpy.ndarray): Ориентација во степени (N,)
+            odziv (numpy.ndarray): Јачина на одзивот на детекторот (N,)
+            oktava (numpy.ndarray): Октава (N,) int32
+            deskriptori (numpy.ndarray): Дескриптори (N, D) или None
+        """
+        self.xy = xy
+        self.golemina = golemina
+        self.agol = agol
+        self.odziv = odziv
+        self.oktava = oktava
+        self.deskriptori = deskriptori
+
+    def __len__(self):
+        return len(self.xy)
+
+    @property
+    def nbytes(self):
+        golemina = sum(niza.nbytes for niza in (self.xy, self.golemina, self.agol, self.odziv, self.oktava))
+        if self.deskriptori is not None:
+            golemina += self.deskriptori.nbytes
+        return golemina
+
+    @classmethod
+    def prazni(cls):
+        return cls(
+            np.empty((0, 2), dtype=np.float32),
+            np.empty(0, dtype=np.float32),
+            np.empty(0, dtype=np.float32),
+            np.empty(0, dtype=np.float32),
+            np.empty(0, dtype=np.int32),
+            None
+        )
+
+    @classmethod
+    def od_kliucevi(cls, kliucevi, deskriptori):
+        """
+        Креирај Karakteristiki од резултатот на detectAndCompute
+        """
+        if not kliucevi:
+            return cls.prazni()
+
+        broj = len(kliucevi)
+        return cls(
+            cv2.KeyPoint_convert(kliucevi).reshape(-1, 2),
+            np.fromiter((k.size for k in kliucevi), dtype=np.float32, count=broj),
+            np.fromiter((k.angle for k in kliucevi), dtype=np.float32, count=broj),
+            np.fromiter((k.response for k in kliucevi), dtype=np.float32, count=broj),
+            np.fromiter((k.octave for k in kliucevi), dtype=np.int32, count=broj),
+            deskriptori
+        )
+
+    @classmethod
+    def nadovrzi(cls, delovi):
+        """
+        Спои ги клучните точки од повеќе делови на иста слика во еден сет
+        """
+        delovi = [d for d in delovi if len(d) > 0]
+        if not delovi:
+            return cls.prazni()
+        if len(delovi) == 1:
+            return delovi[0]
+
+        deskriptori = None
+        if all(d.deskriptori is not None for d in delovi):
+            deskriptori = np.concatenate([d.deskriptori for d in delovi], axis=0)
+
+        return cls(*(
+            np.concatenate([getattr(d, pole) for d in delovi], axis=0)
+            for pole in ('xy', 'golemina', 'agol', 'odziv', 'oktava')
+        ), deskriptori)
+
+    def kako_kliucevi(self):
+        """
+        Врати листа од cv2.KeyPoint (за компатибилност со постоечкиот API)
+        """
+        return [
+            cv2.KeyPoint(float(x), float(y), float(golemina), float(agol), float(odziv), int(oktava))
+            for (x, y), golemina, agol, odziv, oktava
+            in zip(self.xy, self.golemina, self.agol, self.odziv, self.oktava)
+        ]
+
+
+class Sovpadanja:
+    """
+    Совпаѓања помеѓу два сета клучни точки како низи од индекси
+
+    idx1[i] е индекс во првиот сет, idx2[i] во вториот, rastojanie[i] е растојанието
+    помеѓу дескрипторите.
+    """
+
+    __slots__ = ('idx1', 'idx2', 'rastojanie')
+
+    def __init__(self, idx1, idx2, rastojanie):
+        self.idx1 = np.asarray(idx1, dtype=np.int32)
+        self.idx2 = np.asarray(idx2, dtype=np.int32)
+        self.rastojanie = np.asarray(rastojanie, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.idx1)
+
+    @classmethod
+    def prazni(cls):
+        return cls(np.empty(0), np.empty(0), np.empty(0))
+
+    def zameni(self):
+        """
+        Врати ги истите совпаѓања со заменети страни
+        """
+        return Sovpadanja(self.idx2, self.idx1, self.rastojanie)
+
+    def podmnozestvo(self, maska):
+        """
+        Врати ги само совпаѓањата за кои маската е True
+        """
+        return Sovpadanja(self.idx1[maska], self.idx2[maska], self.rastojanie[maska])
+
+
+# Норма за совпаѓање и праг за тестот на односот според детекторот
+DETEKTORI = {
+    'sift': {'norma': cv2.NORM_L2, 'odnos': 0.7},
+    'orb': {'norma': cv2.NORM_HAMMING, 'odnos': 0.75},
+    'akaze': {'norma': cv2.NORM_HAMMING, 'odnos': 0.75},
+}
+
+# Именувани комбинации на детектор и matcher, од најбрза до најпрецизна. ORB и AKAZE
+# даваат погрешни панорами на Real_Life_examples (види benchmarks/PRESETI.md), па
+# побрзите пресети го задржуваат SIFT со помалку точки, FLANN и детекција во рабовите
+PRESETI = {
+    'fast': {'detektor': 'sift', 'broj_na_kliucevi': 1000, 'matcher': 'flann', 'udel_na_preklop': 0.3},
+    'balanced': {'detektor': 'sift', 'broj_na_kliucevi': 2000, 'matcher': 'flann'},
+    'quality': {'detektor': 'sift', 'broj_na_kliucevi': 5000, 'matcher': 'bf'},
+}
+
+
+def napravi_detektor(ime='sift', broj_na_kliucevi=5000):
+    """
+    Креирај детектор на клучни точки
+
+    Args:
+        ime (str): 'sift', 'orb' или 'akaze'
+        broj_na_kliucevi (int): Максимален број клучни точки (AKAZE нема ограничување)
+
+    Returns:
+        cv2.Feature2D: Детектор со метод detectAndCompute
+    """
+    if ime == 'sift':
+        return cv2.SIFT_create(nfeatures=broj_na_kliucevi)
+    if ime == 'orb':
+        return cv2.ORB_create(nfeatures=broj_na_kliucevi)
+    if ime == 'akaze':
+        return cv2.AKAZE_create()
+
+    raise ValueError(f"Непознат детектор: {ime}")
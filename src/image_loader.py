@@ -1,24 +1,133 @@
 import cv2
+import itertools
 import os
+import struct
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-def vcitaj_sliki(patistina_sliki):  # <-- CHANGED HERE
+from src.instrumentation import Statistika
+from src.utils import broj_na_procesori
+
+# Знаменца за cv2.imread според факторот на намалување при декодирање
+ZNAMENCA_ZA_NAMALUVANJE = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+def procitaj_dimenzii(patistina):
+    """
+    Прочитај ги димензиите од заглавието на JPEG или PNG фајл, без декодирање
+
+    Args:
+        patistina (str): Патека до сликата
+
+    Returns:
+        tuple: (sirina, visina) или None ако форматот не е препознаен
+    """
+    try:
+        with open(patistina, 'rb') as f:
+            pocetok = f.read(24)
+
+            if pocetok[:8] == b'\x89PNG\r\n\x1a\n':
+                sirina, visina = struct.unpack('>II', pocetok[16:24])
+                return sirina, visina
+
+            if pocetok[:2] != b'\xff\xd8':
+                return None
+
+            # Помини ги JPEG сегментите до SOF (Start Of Frame) маркерот
+            f.seek(2)
+            while True:
+                bajt = f.read(1)
+                while bajt and bajt != b'\xff':
+                    bajt = f.read(1)
+                while bajt == b'\xff':
+                    bajt = f.read(1)
+                if not bajt:
+                    return None
+
+                marker = bajt[0]
+                if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                    continue  # маркери без должина
+
+                dolzina = struct.unpack('>H', f.read(2))[0]
+                if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                    visina, sirina = struct.unpack('>xHH', f.read(5))
+                    return sirina, visina
+
+                f.seek(dolzina - 2, os.SEEK_CUR)
+
+    except (OSError, struct.error):
+        return None
+
+def izberi_faktor_na_namaluvanje(sirina, maksimalna_sirina):
+    """
+    Најголем фактор (8, 4, 2 или 1) за кој декодираната слика е сè уште барем maksimalna_sirina широка
+    """
+    for faktor in (8, 4, 2):
+        if sirina / faktor >= maksimalna_sirina:
+            return faktor
+    return 1
+
+def vcitaj_slika(patistina, maksimalna_sirina=None):
+    """
+    Вчитај една слика, намалена уште при JPEG декодирањето ако целната ширина го дозволува
+
+    Args:
+        patistina (str): Патека до сликата
+        maksimalna_sirina (int): Ширина на која сликата подоцна ќе се намали (None = полна резолуција)
+
+    Returns:
+        numpy.ndarray: Сликата или None при грешка
+    """
+    faktor = 1
+    if maksimalna_sirina:
+        dimenzii = procitaj_dimenzii(patistina)
+        if dimenzii is not None:
+            faktor = izberi_faktor_na_namaluvanje(dimenzii[0], maksimalna_sirina)
+
+    slika = cv2.imread(patistina, ZNAMENCA_ZA_NAMALUVANJE[faktor])
+
+    # EXIF ротацијата може да ги замени ширината и висината од заглавието
+    if slika is not None and faktor > 1 and slika.shape[1] < maksimalna_sirina:
+        slika = cv2.imread(patistina)
+
+    return slika
+
+def vcitaj_sliki(patistina_sliki, maksimalna_sirina=None, broj_rabotnici=None):  # <-- CHANGED HERE
     """
     Чита повеќе слики од дадена патека
 
+    Сликите се декодираат паралелно (cv2.imread го ослободува GIL), а
+    редоследот на резултатот е ист како редоследот на патеките.
+
     Args:
         patistina_sliki (list): Листа на патеки до сликите
+        maksimalna_sirina (int): Ширина на која сликите подоцна ќе се намалат; ако е дадена,
+                                 JPEG сликите се декодираат со IMREAD_REDUCED_COLOR_2/4/8
+        broj_rabotnici (int): Број на нишки за декодирање (None = број на процесори)
 
     Returns:
         list: Листа на прочитани слики
     """
-    sliki = []
-
+    postoecki = []
     for patistina in patistina_sliki:
         if not os.path.exists(patistina):
             print(f"Предупредување: Сликата {patistina} не постои!")
             continue
+        postoecki.append(patistina)
 
-        slika = cv2.imread(patistina)
+    if broj_rabotnici is None:
+        broj_rabotnici = broj_na_procesori()
+    broj_rabotnici = max(1, min(broj_rabotnici, len(postoecki)))
+
+    with ThreadPoolExecutor(max_workers=broj_rabotnici) as izvrsitel:
+        vcitani = list(izvrsitel.map(lambda p: vcitaj_slika(p, maksimalna_sirina), postoecki))
+
+    sliki = []
+    for patistina, slika in zip(postoecki, vcitani):
         if slika is not None:
             sliki.append(slika)
             print(f"Успешно вчитана слика: {patistina}")
@@ -27,6 +136,84 @@ def vcitaj_sliki(patistina_sliki):  # <-- CHANGED HERE
 
     return sliki
 
+class TokNaSliki:
+    """
+    Слики од листа на патеки, вчитани и намалени дури кога се потребни
+
+    Наместо сите слики да се вчитаат однапред, при поминувањето најмногу
+    prozorec слики се декодираат однапред во позадински нишки, па долга
+    секвенца никогаш не е цела во меморија. Може да се помине повеќе пати
+    (секое поминување ги чита фајловите одново).
+    """
+
+    def __init__(self, patistina_sliki, maksimalna_sirina=None, prozorec=2, statistika=None):
+        """
+        Args:
+            patistina_sliki (list): Листа на патеки до сликите
+            maksimalna_sirina (int): Максимална ширина на сликите (None = полна резолуција)
+            prozorec (int): Колку слики најмногу се вчитуваат однапред
+            statistika (Statistika): Ако е дадена, во неа се мерат етапите
+                                     'dekodiranje' и 'promena_na_golemina'
+        """
+        self.patistina_sliki = []
+        for patistina in patistina_sliki:
+            if not os.path.exists(patistina):
+                print(f"Предупредување: Сликата {patistina} не постои!")
+                continue
+            self.patistina_sliki.append(patistina)
+
+        self.maksimalna_sirina = maksimalna_sirina
+        self.prozorec = max(1, prozorec)
+        self.statistika = statistika if statistika is not None else Statistika()
+
+    def __len__(self):
+        return len(self.patistina_sliki)
+
+    def _vcitaj(self, patistina):
+        with self.statistika.etapa('dekodiranje'):
+            slika = vcitaj_slika(patistina, self.maksimalna_sirina)
+        if slika is not None and self.maksimalna_sirina:
+            with self.statistika.etapa('promena_na_golemina'):
+                slika = promeni_golemina_na_slikite([slika], self.maksimalna_sirina)[0]
+        return slika
+
+    def vcitaj(self, indeks):
+        """
+        Вчитај ја само сликата со даден индекс (на пр. нова слика при ажурирање на панорама)
+
+        Returns:
+            numpy.ndarray: Сликата или None при грешка
+        """
+        patistina = self.patistina_sliki[indeks]
+        slika = self._vcitaj(patistina)
+        if slika is None:
+            print(f"Грешка при вчитување на сликата: {patistina}")
+        else:
+            print(f"Успешно вчитана слика: {patistina}")
+        return slika
+
+    def __iter__(self):
+        patisti = iter(self.patistina_sliki)
+        with ThreadPoolExecutor(max_workers=self.prozorec) as izvrsitel:
+            vo_tek = deque(
+                (patistina, izvrsitel.submit(self._vcitaj, patistina))
+                for patistina in itertools.islice(patisti, self.prozorec)
+            )
+            while vo_tek:
+                patistina, idno = vo_tek.popleft()
+                slika = idno.result()
+
+                sledna = next(patisti, None)
+                if sledna is not None:
+                    vo_tek.append((sledna, izvrsitel.submit(self._vcitaj, sledna)))
+
+                if slika is None:
+                    print(f"Грешка при вчитување на сликата: {patistina}")
+                    continue
+
+                print(f"Успешно вчитана слика: {patistina}")
+                yield slika
+
 def promeni_golemina_na_slikite(sliki, maksimalna_sirina=800):
     """
     Промени големина на сликите за поеднаква обработка
@@ -51,4 +238,4 @@ def promeni_golemina_na_slikite(sliki, maksimalna_sirina=800):
 
         sliki_promeneti.append(slika)
 
-    return sliki_promeneti
\ No newline at end of file
+    return sliki_promeneti
@@ -5,7 +5,8 @@
 од повеќе влезни слики.
 """
 
-from .image_loader import vcitaj_sliki, promeni_golemina_na_slikite
+from .image_loader import vcitaj_sliki, promeni_golemina_na_slikite, TokNaSliki
+from .instrumentation import Statistika
 from .stitcher import PanoramaStitcher
 from .utils import pokazi_slika, zacuvaj_slika, pretvori_vo_sivo
 
@@ -14,7 +15,9 @@ __author__ = "Панорама Стиcher Тим"
 __all__ = [
     'vcitaj_sliki',
     'promeni_golemina_na_slikite',
+    'TokNaSliki',
     'PanoramaStitcher',
+    'Statistika',
     'pokazi_slika',
     'zacuvaj_slika',
     'pretvori_vo_sivo'
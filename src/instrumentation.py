@@ -0,0 +1,86 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Statistika:
+    """
+    Мерења на времето по етапи и бројачи за една обработка
+
+    Етапите (на пр. 'detekcija') го собираат времето од сите повици; кога
+    етапата се извршува паралелно во повеќе нишки, времињата се собираат.
+    Претплатниците добиваат секое мерење во моментот кога е направено:
+    funkcija(vid, ime, vrednost), каде vid е 'etapa' (vrednost = секунди)
+    или 'broj' (vrednost = зголемување на бројачот).
+    """
+
+    def __init__(self):
+        self.vreminja = {}
+        self.povici = {}
+        self.broevi = {}
+        self.pretplatnici = []
+        self._brava = threading.Lock()
+
+    def pretplati(self, funkcija):
+        """
+        Додади функција што ќе се повикува за секое мерење
+        """
+        self.pretplatnici.append(funkcija)
+        return funkcija
+
+    def _izvesti(self, vid, ime, vrednost):
+        for funkcija in self.pretplatnici:
+            funkcija(vid, ime, vrednost)
+
+    def zapisi_vreme(self, ime, sekundi):
+        """
+        Додади измерено време на етапа
+        """
+        with self._brava:
+            self.vreminja[ime] = self.vreminja.get(ime, 0.0) + sekundi
+            self.povici[ime] = self.povici.get(ime, 0) + 1
+        self._izvesti('etapa', ime, sekundi)
+
+    @contextmanager
+    def etapa(self, ime):
+        """
+        Измери го времето на блокот и запиши го под етапата ime
+        """
+        pocetok = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.zapisi_vreme(ime, time.perf_counter() - pocetok)
+
+    def dodadi(self, ime, vrednost=1):
+        """
+        Зголеми го бројачот ime
+        """
+        with self._brava:
+            self.broevi[ime] = self.broevi.get(ime, 0) + vrednost
+        self._izvesti('broj', ime, vrednost)
+
+    def resetiraj(self):
+        """
+        Избриши ги сите мерења (претплатниците остануваат)
+        """
+        with self._brava:
+            self.vreminja.clear()
+            self.povici.clear()
+            self.broevi.clear()
+
+    def izvestaj(self):
+        """
+        Мерењата како речник што може да се запише во JSON
+
+        Returns:
+            dict: {'etapi': {ime: {'vreme': секунди, 'povici': број}}, 'broevi': {ime: вредност}}
+        """
+        with self._brava:
+            return {
+                'etapi': {
+                    ime: {'vreme': round(vreme, 6), 'povici': self.povici[ime]}
+                    for ime, vreme in self.vreminja.items()
+                },
+                'broevi': dict(self.broevi),
+            }
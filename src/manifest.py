@@ -0,0 +1,54 @@
+import hashlib
+import json
+import os
+import tempfile
+
+# Верзија на форматот; манифест со друга верзија не се користи
+VERZIJA_NA_MANIFEST = 1
+
+
+def hesh_na_fajl(patistina, golemina_na_blok=1024 * 1024):
+    """
+    Хеш на содржината на фајл (blake2b), читан во блокови
+
+    Returns:
+        str: Хеш како хексадецимален текст
+    """
+    hesh = hashlib.blake2b(digest_size=16)
+    with open(patistina, 'rb') as f:
+        for blok in iter(lambda: f.read(golemina_na_blok), b''):
+            hesh.update(blok)
+    return hesh.hexdigest()
+
+
+def vcitaj_manifest(patistina):
+    """
+    Вчитај манифест за усогласување од JSON фајл
+
+    Returns:
+        dict: Манифестот или None ако не постои, е оштетен или е од друга верзија
+    """
+    try:
+        with open(patistina, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Предупредување: манифестот {patistina} не може да се прочита: {e}")
+        return None
+
+    if not isinstance(manifest, dict) or manifest.get('verzija') != VERZIJA_NA_MANIFEST:
+        return None
+    return manifest
+
+
+def zacuvaj_manifest(patistina, manifest):
+    """
+    Зачувај го манифестот атомски (преку привремен фајл), за прекинато
+    извршување да не остави половичен манифест
+    """
+    manifest = dict(manifest, verzija=VERZIJA_NA_MANIFEST)
+    direktorium = os.path.dirname(os.path.abspath(patistina))
+    with tempfile.NamedTemporaryFile('w', dir=direktorium, suffix='.tmp', delete=False, encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(f.name, patistina)
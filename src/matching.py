@@ -0,0 +1,188 @@
+import weakref
+
+import cv2
+import numpy as np
+
+from src.features import Sovpadanja
+
+
+def primeni_test_na_odnos(indeksi, rastojanija, odnos):
+    """
+    Векторизиран Lowe-ов тест на односот врз k=2 најблиски соседи
+
+    Args:
+        indeksi (numpy.ndarray): (N, 2) индекси на двата најблиски соседи во вториот сет
+        rastojanija (numpy.ndarray): (N, 2) растојанија до двата соседи
+        odnos (float): Праг на односот помеѓу првиот и вториот сосед
+
+    Returns:
+        Sovpadanja: Добри совпаѓања
+    """
+    maska = (indeksi[:, 0] >= 0) & (indeksi[:, 1] >= 0) & (rastojanija[:, 0] < odnos * rastojanija[:, 1])
+    idx1 = np.flatnonzero(maska)
+    return Sovpadanja(idx1, indeksi[idx1, 0], rastojanija[idx1, 0])
+
+
+def tip_na_rastojanie(norma):
+    # Hamming растојанијата се цели броеви, L2 се реални
+    return cv2.CV_32S if norma in (cv2.NORM_HAMMING, cv2.NORM_HAMMING2) else cv2.CV_32F
+
+
+class BruteForceMatcher:
+    """Исцрпно совпаѓање со k=2 и тест на односот"""
+
+    ime = 'bf'
+
+    def __init__(self, norma=cv2.NORM_L2):
+        self.norma = norma
+
+    def podgotvi(self, deskriptori):
+        """Исцрпното совпаѓање нема индекс што би се подготвил однапред"""
+
+    def sovpadni(self, deskriptori1, deskriptori2, odnos):
+        if len(deskriptori1) == 0 or len(deskriptori2) < 2:
+            return Sovpadanja.prazni()
+
+        # batchDistance ги враќа соседите директно како низи, без DMatch објекти
+        rastojanija, indeksi = cv2.batchDistance(
+            deskriptori1, deskriptori2, tip_na_rastojanie(self.norma), normType=self.norma, K=2
+        )
+        return primeni_test_na_odnos(indeksi, rastojanija.astype(np.float32), odnos)
+
+
+class CrossCheckMatcher:
+    """
+    Исцрпно совпаѓање со вкрстена проверка
+
+    Совпаѓањето се прифаќа само ако двете точки се меѓусебно најблиски,
+    па тестот на односот не се применува.
+    """
+
+    ime = 'crosscheck'
+
+    def __init__(self, norma=cv2.NORM_L2):
+        self.norma = norma
+
+    def podgotvi(self, deskriptori):
+        """Исцрпното совпаѓање нема индекс што би се подготвил однапред"""
+
+    def sovpadni(self, deskriptori1, deskriptori2, odnos):
+        if len(deskriptori1) == 0 or len(deskriptori2) == 0:
+            return Sovpadanja.prazni()
+
+        rastojanija, indeksi = cv2.batchDistance(
+            deskriptori1, deskriptori2, tip_na_rastojanie(self.norma),
+            normType=self.norma, K=1, crosscheck=True
+        )
+        indeksi = indeksi.ravel()
+        idx1 = np.flatnonzero(indeksi >= 0)
+        return Sovpadanja(idx1, indeksi[idx1], rastojanija.ravel()[idx1])
+
+
+class FlannMatcher:
+    """
+    Приближно совпаѓање со FLANN (KD-дрва, или LSH за бинарни дескриптори)
+
+    Индексот за даден сет на дескриптори се гради еднаш и се користи
+    повторно секогаш кога истиот сет се совпаѓа со нов кандидат.
+    """
+
+    ime = 'flann'
+
+    FLANN_INDEX_KDTREE = 1
+    FLANN_INDEX_LSH = 6
+
+    def __init__(self, drva=5, proverki=50, norma=cv2.NORM_L2):
+        """
+        Args:
+            drva (int): Број на KD-дрва во индексот
+            proverki (int): Број на проверки при пребарување (повеќе = попрецизно, побавно)
+            norma (int): cv2.NORM_L2 за SIFT, cv2.NORM_HAMMING за ORB/AKAZE
+        """
+        self.norma = norma
+        self.binarni = tip_na_rastojanie(norma) == cv2.CV_32S
+        self.drva = drva
+        self.proverki = proverki
+        self.broj_izgradeni_indeksi = 0
+        self._indeksi = {}
+
+    def _napravi_indeks(self, deskriptori):
+        if self.binarni:
+            return cv2.flann_Index(
+                np.ascontiguousarray(deskriptori),
+                dict(algorithm=self.FLANN_INDEX_LSH, table_number=6, key_size=12, multi_probe_level=1)
+            )
+        return cv2.flann_Index(
+            np.ascontiguousarray(deskriptori, dtype=np.float32),
+            dict(algorithm=self.FLANN_INDEX_KDTREE, trees=self.drva)
+        )
+
+    def _prasanje(self, deskriptori):
+        if self.binarni:
+            return np.ascontiguousarray(deskriptori)
+        return np.ascontiguousarray(deskriptori, dtype=np.float32)
+
+    def indeks_za(self, deskriptori):
+        """
+        Врати го (или изгради го) индексот за даден сет на дескриптори
+        """
+        kluc = id(deskriptori)
+        indeks = self._indeksi.get(kluc)
+        if indeks is None:
+            indeks = self._napravi_indeks(deskriptori)
+            self.broj_izgradeni_indeksi += 1
+            self._indeksi[kluc] = indeks
+            # Индексот се брише заедно со дескрипторите
+            weakref.finalize(deskriptori, self._indeksi.pop, kluc, None)
+        return indeks
+
+    def podgotvi(self, deskriptori):
+        """
+        Изгради го индексот за сет што ќе се совпаѓа со повеќе кандидати, за
+        sovpadni да пребарува во него наместо да гради индекс над секој кандидат
+        """
+        if deskriptori is not None and len(deskriptori) >= 2:
+            self.indeks_za(deskriptori)
+
+    def _prebaraj(self, deskriptori_indeks, deskriptori_prasanje, odnos):
+        indeksi, rastojanija = self.indeks_za(deskriptori_indeks).knnSearch(
+            self._prasanje(deskriptori_prasanje), 2, params=dict(checks=self.proverki)
+        )
+        rastojanija = rastojanija.astype(np.float32)
+        if not self.binarni:
+            # KD-дрвото враќа квадрати од L2 растојанијата
+            rastojanija = np.sqrt(rastojanija)
+        return primeni_test_na_odnos(indeksi, rastojanija, odnos)
+
+    def sovpadni(self, deskriptori1, deskriptori2, odnos):
+        if len(deskriptori1) < 2 or len(deskriptori2) < 2:
+            return Sovpadanja.prazni()
+
+        # Ако за првиот сет веќе постои индекс, пребарувај во него и замени ги страните
+        if id(deskriptori1) in self._indeksi and id(deskriptori2) not in self._indeksi:
+            return self._prebaraj(deskriptori1, deskriptori2, odnos).zameni()
+
+        return self._prebaraj(deskriptori2, deskriptori1, odnos)
+
+
+MATCHERI = {
+    BruteForceMatcher.ime: BruteForceMatcher,
+    FlannMatcher.ime: FlannMatcher,
+    CrossCheckMatcher.ime: CrossCheckMatcher,
+}
+
+
+def napravi_matcher(tip='bf', **parametri):
+    """
+    Креирај matcher според името
+
+    Args:
+        tip (str): 'bf', 'flann' или 'crosscheck'
+        **parametri: Дополнителни параметри за конкретниот matcher
+
+    Returns:
+        Објект со метод sovpadni(deskriptori1, deskriptori2, odnos)
+    """
+    if tip not in MATCHERI:
+        raise ValueError(f"Непознат matcher: {tip}")
+    return MATCHERI[tip](**parametri)
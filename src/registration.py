@@ -0,0 +1,560 @@
+import cv2
+import numpy as np
+
+from collections import deque
+
+
+class PairRegistration:
+    """
+    Резултат од регистрација на пар слики
+
+    Ги чува совпаѓањата, координатите на совпаднатите точки, хомографијата
+    и проценетиот преклоп, за да не се пресметуваат повеќе пати за ист пар.
+    """
+
+    def __init__(self, xy1, xy2, sovpadanja, broj_kliucevi1=None):
+        """
+        Args:
+            xy1 (numpy.ndarray): Координати (N, 2) на клучните точки од првата слика
+            xy2 (numpy.ndarray): Координати (M, 2) на клучните точки од втората слика
+            sovpadanja (Sovpadanja): Добри совпаѓања (idx1 -> прва, idx2 -> втора слика)
+            broj_kliucevi1 (float): Број на клучни точки по слика од прва страна за проценка
+                                    на преклопот (default: len(xy1))
+        """
+        self.xy1 = xy1
+        self.xy2 = xy2
+        self.sovpadanja = sovpadanja
+        self.broj_kliucevi1 = len(xy1) if broj_kliucevi1 is None else broj_kliucevi1
+        self.broj_kliucevi2 = len(xy2)
+
+        self.tocki1 = xy1[sovpadanja.idx1]
+        self.tocki2 = xy2[sovpadanja.idx2]
+
+        # Хомографијата се пресметува на барање (види PanoramaStitcher.presmetaj_homografija_za_par)
+        self.homografija = None
+        self.maska = None
+        self.homografija_presmetana = False
+
+        # Кој модел ја дал хомографијата: 'translacija', 'slicnost' или 'homografija'
+        self.model = None
+
+        # Дел од рабовите во кој е извршена детекцијата (None = цела слика)
+        self.udel_na_preklop = None
+
+    @property
+    def broj_sovpadanja(self):
+        return len(self.sovpadanja)
+
+    @property
+    def preklop_procent(self):
+        """
+        Груба проценка на преклопот базирана на број на совпаѓања (0-1)
+        """
+        if len(self.sovpadanja) == 0:
+            return 0.0
+
+        avg_matches_per_image = (self.broj_kliucevi1 + self.broj_kliucevi2) / 2
+        if avg_matches_per_image == 0:
+            return 0.0
+
+        return min(1.0, len(self.sovpadanja) / avg_matches_per_image * 2)
+
+    @property
+    def broj_inlieri(self):
+        if self.maska is None:
+            return 0
+        return int(self.maska.sum())
+
+
+def transformiraj_tocki(tocki, transformacija):
+    """
+    Примени 3x3 трансформација на низа од точки (N, 2)
+    """
+    if len(tocki) == 0:
+        return tocki
+    return cv2.perspectiveTransform(
+        tocki.reshape(-1, 1, 2).astype(np.float32), np.asarray(transformacija, dtype=np.float64)
+    ).reshape(-1, 2)
+
+
+class MosaicFeatureStore:
+    """
+    Клучни точки од веќе поставените слики, во координатите на панорамата
+
+    Наместо SIFT врз целата панорама, новата слика се совпаѓа само со
+    клучните точки од последните K поставени слики.
+    """
+
+    def __init__(self, posledni_k=2):
+        """
+        Args:
+            posledni_k (int): Колку последно поставени слики се чуваат за совпаѓање
+        """
+        self.posledni_k = posledni_k
+        self._xy = deque(maxlen=posledni_k)
+        self._deskriptori = deque(maxlen=posledni_k)
+
+        # Споените дескриптори се чуваат додека не се додаде нова слика, па
+        # matcher-от (FLANN) го користи истиот индекс за сите совпаѓања со нив
+        self._spoeni_deskriptori = None
+
+    def __len__(self):
+        return len(self._xy)
+
+    def dodadi(self, xy, deskriptori, transformacija):
+        """
+        Додади ги клучните точки од поставена слика
+
+        Args:
+            xy (numpy.ndarray): Координати во рамката на сликата
+            deskriptori (numpy.ndarray): Дескриптори на клучните точки
+            transformacija (numpy.ndarray): 3x3 трансформација од сликата во панорамата
+        """
+        if deskriptori is None or len(xy) == 0:
+            return
+
+        self._xy.append(transformiraj_tocki(xy, transformacija))
+        self._deskriptori.append(deskriptori)
+        self._spoeni_deskriptori = None
+
+    def transformiraj(self, transformacija):
+        """
+        Премести ги сите зачувани точки кога панорамата ќе се помести во новото платно
+        """
+        for i in range(len(self._xy)):
+            self._xy[i] = transformiraj_tocki(self._xy[i], transformacija)
+
+    def aktivni(self):
+        """
+        Врати (xy, deskriptori, просечен број точки по слика) за совпаѓање
+
+        Дескрипторите се истиот објект сè до следниот повик на dodadi.
+        """
+        if not self._xy:
+            return np.empty((0, 2), dtype=np.float32), None, 0
+
+        if self._spoeni_deskriptori is None:
+            self._spoeni_deskriptori = np.concatenate(self._deskriptori, axis=0)
+
+        xy = np.concatenate(self._xy, axis=0)
+        return xy, self._spoeni_deskriptori, len(xy) / len(self._xy)
+
+
+def nadovrzi_homografii(relativni_homografii, referentna=0):
+    """
+    Поврзи ги хомографиите помеѓу соседни слики во заеднички координатен систем
+
+    Args:
+        relativni_homografii (list): H[k] ја пресликува сликата k+1 во координатите на сликата k
+        referentna (int): Индекс на сликата чии координати се користат како референтни
+
+    Returns:
+        list: Хомографија за секоја слика кон референтната рамка
+    """
+    apsolutni = [np.eye(3)]
+    for homografija in relativni_homografii:
+        apsolutni.append(apsolutni[-1].dot(homografija))
+
+    inverzna_ref = np.linalg.inv(apsolutni[referentna])
+    return [inverzna_ref.dot(h) for h in apsolutni]
+
+
+def transformiraj_agli(visina, sirina, homografija):
+    """
+    Трансформирај ги четирите агли на слика со дадена хомографија
+    """
+    agli = np.array([
+        [0, 0],
+        [0, visina],
+        [sirina, visina],
+        [sirina, 0]
+    ], dtype=np.float32).reshape(-1, 1, 2)
+
+    return cv2.perspectiveTransform(agli, np.asarray(homografija, dtype=np.float64))
+
+
+def presmetaj_platno(dimenzii, homografii):
+    """
+    Пресметај ја големината на платното што ги содржи сите трансформирани слики
+
+    Args:
+        dimenzii (list): (visina, sirina) за секоја слика
+        homografii (list): Хомографија за секоја слика кон референтната рамка
+
+    Returns:
+        tuple: (translacija 3x3, nova_sirina, nova_visina)
+    """
+    site_tocki = np.concatenate([
+        transformiraj_agli(visina, sirina, homografija)
+        for (visina, sirina), homografija in zip(dimenzii, homografii)
+    ], axis=0)
+
+    [x_min, y_min] = np.int32(site_tocki.min(axis=0).ravel() - 0.5)
+    [x_max, y_max] = np.int32(site_tocki.max(axis=0).ravel() + 0.5)
+
+    translacija = np.array([
+        [1, 0, -x_min],
+        [0, 1, -y_min],
+        [0, 0, 1]
+    ], dtype=np.float64)
+
+    return translacija, int(x_max - x_min), int(y_max - y_min)
+
+
+def translaciona_matrica(tx, ty):
+    """
+    3x3 матрица за транслација за (tx, ty)
+    """
+    return np.array([[1, 0, tx], [0, 1, ty], [0, 0, 1]], dtype=np.float64)
+
+
+def namali_slika(slika, maks_golemina):
+    """
+    Намали ја сликата така што нејзината поголема страна е најмногу maks_golemina
+
+    Returns:
+        tuple: (минијатура, размер); размерот е 1.0 ако сликата е веќе доволно мала
+    """
+    visina, sirina = slika.shape[:2]
+    razmer = maks_golemina / max(visina, sirina)
+    if razmer >= 1.0:
+        return slika, 1.0
+
+    nova_golemina = (max(1, int(round(sirina * razmer))), max(1, int(round(visina * razmer))))
+    return cv2.resize(slika, nova_golemina, interpolation=cv2.INTER_AREA), razmer
+
+
+def proceni_pomestuvanje(slika1, slika2, maks_golemina=256):
+    """
+    Проценка на доминантното поместување помеѓу две слики со фазна корелација
+
+    Двете слики се намалуваат со ист размер (поголемата страна е најмногу
+    maks_golemina), се префрлаат во сиви тонови без средната вредност и се
+    дополнуваат со нули до иста големина. Корелацијата е циклична, па поместување
+    подолго од половина слика се враќа со спротивен знак; оската е точна.
+
+    Returns:
+        tuple: (dx, dy, odziv); поместувањето е во пиксели на оригиналните слики,
+               а odziv (0-1) е висината на врвот на корелацијата
+    """
+    razmer = min(1.0, maks_golemina / max(slika1.shape[:2] + slika2.shape[:2]))
+
+    minijaturi = []
+    for slika in (slika1, slika2):
+        if slika.ndim == 3:
+            slika = cv2.cvtColor(slika, cv2.COLOR_BGR2GRAY)
+        if razmer < 1.0:
+            slika = cv2.resize(slika, None, fx=razmer, fy=razmer, interpolation=cv2.INTER_AREA)
+        minijaturi.append(slika.astype(np.float32))
+
+    visina = max(m.shape[0] for m in minijaturi)
+    sirina = max(m.shape[1] for m in minijaturi)
+    poleta = []
+    for minijatura in minijaturi:
+        pole = np.zeros((visina, sirina), dtype=np.float32)
+        pole[:minijatura.shape[0], :minijatura.shape[1]] = minijatura - minijatura.mean()
+        poleta.append(pole)
+
+    # Без Hanning прозорец: преклопот е на рабовите, кои прозорецот би ги изгасил
+    (dx, dy), odziv = cv2.phaseCorrelate(poleta[0], poleta[1])
+    return dx / razmer, dy / razmer, float(odziv)
+
+
+def skaliraj_homografija(homografija, razmer1, razmer2):
+    """
+    Префрли хомографија пресметана на минијатури во координати на работната резолуција
+
+    Args:
+        homografija (numpy.ndarray): Ја пресликува минијатурата 2 во минијатурата 1
+        razmer1 (float): Размер на минијатурата 1 во однос на сликата 1
+        razmer2 (float): Размер на минијатурата 2 во однос на сликата 2
+    """
+    skaliranje1 = np.diag([1.0 / razmer1, 1.0 / razmer1, 1.0])
+    skaliranje2 = np.diag([razmer2, razmer2, 1.0])
+    return skaliranje1.dot(homografija).dot(skaliranje2)
+
+
+def presmetaj_regioni_na_preklop(dimenzii1, dimenzii2, homografija, margina=0):
+    """
+    Предвиди го преклопот на две слики од хомографија
+
+    Args:
+        dimenzii1 (tuple): (visina, sirina) на првата слика
+        dimenzii2 (tuple): (visina, sirina) на втората слика
+        homografija (numpy.ndarray): Ја пресликува втората слика во првата
+        margina (int): Колку пиксели да се прошири секој регион
+
+    Returns:
+        tuple: (x0, y0, x1, y1) во првата и во втората слика, или (None, None) ако нема преклоп
+    """
+    def region(agli, visina, sirina):
+        agli = agli.reshape(-1, 2)
+        if not np.all(np.isfinite(agli)):
+            return None
+        x0 = max(0, int(np.floor(agli[:, 0].min())) - margina)
+        y0 = max(0, int(np.floor(agli[:, 1].min())) - margina)
+        x1 = min(sirina, int(np.ceil(agli[:, 0].max())) + margina)
+        y1 = min(visina, int(np.ceil(agli[:, 1].max())) + margina)
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return x0, y0, x1, y1
+
+    try:
+        inverzna = np.linalg.inv(homografija)
+    except np.linalg.LinAlgError:
+        return None, None
+
+    region1 = region(transformiraj_agli(*dimenzii2, homografija), *dimenzii1)
+    region2 = region(transformiraj_agli(*dimenzii1, inverzna), *dimenzii2)
+    if region1 is None or region2 is None:
+        return None, None
+
+    return region1, region2
+
+
+def rasporedi_edno_do_drugo(dimenzii, smer='horizontal', na_vrv=None):
+    """
+    Распоред на слики без преклоп една до друга, ист како низа од spoji_edno_do_drugo
+
+    Ако попречните димензии (висина кај хоризонтална, ширина кај вертикална) на
+    панорамата досега и новата слика се разликуваат повеќе од 20 пиксели, двете
+    се сечат центрирано на помалата; инаку се порамнуваат на почетокот. Распоредот
+    зависи само од димензиите, па сите слики може да се запишат во едно платно.
+
+    Args:
+        dimenzii (list): (visina, sirina) за секоја слика
+        smer (str): 'horizontal' или 'vertical'
+        na_vrv (list): Кај вертикална насока, дали секоја слика оди над панорамата досега
+
+    Returns:
+        tuple: ((visina, sirina) на платното, листа од (izvor, cel) за секоја слика),
+               каде izvor = (y0, y1, x0, x1) е делот од сликата, а cel = (y, x) е
+               неговата позиција во платното
+    """
+    horizontalna = smer == 'horizontal'
+    if na_vrv is None:
+        na_vrv = [False] * len(dimenzii)
+
+    # (должина по насоката, попречна должина) на секоја слика
+    golemini = [(sirina, visina) if horizontalna else (visina, sirina) for visina, sirina in dimenzii]
+
+    # За секоја слика: [позиција по насоката, попречна позиција, попречен почеток во сликата, видлива попречна должина]
+    dolzina, popreko = golemini[0]
+    pozicii = [[0, 0, 0, popreko]]
+
+    for (nova_dolzina, novo_popreko), gore in zip(golemini[1:], na_vrv[1:]):
+        izvor = 0
+        vidlivo = novo_popreko
+
+        if abs(popreko - novo_popreko) > 20:
+            najmalo = min(popreko, novo_popreko)
+
+            # Центрирано сечење на панорамата досега ги сече и сите поставени слики
+            if popreko > najmalo:
+                pocetok = (popreko - najmalo) // 2
+                for pozicija in pozicii:
+                    od = max(pozicija[1], pocetok)
+                    do = min(pozicija[1] + pozicija[3], pocetok + najmalo)
+                    pozicija[2] += od - pozicija[1]
+                    pozicija[1] = od - pocetok
+                    pozicija[3] = max(0, do - od)
+
+            izvor = (novo_popreko - najmalo) // 2
+            vidlivo = najmalo
+            popreko = najmalo
+        else:
+            popreko = max(popreko, novo_popreko)
+
+        if gore and not horizontalna:
+            for pozicija in pozicii:
+                pozicija[0] += nova_dolzina
+            pozicii.append([0, 0, izvor, vidlivo])
+        else:
+            pozicii.append([dolzina, 0, izvor, vidlivo])
+        dolzina += nova_dolzina
+
+    rasporedi = []
+    for (visina, sirina), (po_nasoka, cel_popreko, izvor, vidlivo) in zip(dimenzii, pozicii):
+        if horizontalna:
+            rasporedi.append(((izvor, izvor + vidlivo, 0, sirina), (cel_popreko, po_nasoka)))
+        else:
+            rasporedi.append(((0, visina, izvor, izvor + vidlivo), (po_nasoka, cel_popreko)))
+
+    golemina_na_platno = (popreko, dolzina) if horizontalna else (dolzina, popreko)
+    return golemina_na_platno, rasporedi
+
+
+def poligon_na_slika(visina, sirina, transformacija=None):
+    """
+    Четириаголникот што го зафаќа слика (visina, sirina) по трансформацијата, (4, 2) float32
+
+    Пикселот (x, y) го покрива квадратот [x, x+1) x [y, y+1). warpPerspective
+    ги пресликува центрите на пикселите, па аглите се трансформираат во
+    координати на центри (поместени за половина пиксел).
+    """
+    agli = np.array([
+        [-0.5, -0.5], [-0.5, visina - 0.5], [sirina - 0.5, visina - 0.5], [sirina - 0.5, -0.5]
+    ], dtype=np.float64)
+
+    if transformacija is not None:
+        agli = cv2.perspectiveTransform(
+            agli.reshape(-1, 1, 2), np.asarray(transformacija, dtype=np.float64)
+        ).reshape(-1, 2)
+
+    return (agli + 0.5).astype(np.float32)
+
+
+def iseci_poligoni(poligoni, visina, sirina):
+    """
+    Исечи ги конвексните полигони на правоаголникот на платното
+
+    Трансформиран правоаголник е конвексен, а пресекот на два конвексни
+    полигони е конвексен, па полигоните остануваат конвексни. Полигоните
+    што се надвор од платното се отфрлаат.
+    """
+    platno = poligon_na_slika(visina, sirina)
+    iseceni = []
+    for poligon in poligoni:
+        povrsina, presek = cv2.intersectConvexConvex(np.asarray(poligon, dtype=np.float32), platno)
+        if povrsina > 0 and presek is not None:
+            iseceni.append(presek.reshape(-1, 2))
+    return iseceni
+
+
+def poligon_bez_pravoagolnik(poligon, pravoagolnik, visina, sirina):
+    """
+    Делот од конвексен полигон надвор од правоаголник, како листа конвексни делови
+
+    Платното без правоаголникот (x0, y0, x1, y1) се дели на четири правоаголници
+    (лево, десно, горе и долу), па пресекот на полигонот со секој од нив е конвексен.
+    """
+    x0, y0, x1, y1 = pravoagolnik
+    delovi = [
+        (0, 0, x0, visina),
+        (x1, 0, sirina, visina),
+        (max(0, x0), 0, min(sirina, x1), y0),
+        (max(0, x0), y1, min(sirina, x1), visina),
+    ]
+
+    rezultat = []
+    for dx0, dy0, dx1, dy1 in delovi:
+        if dx1 <= dx0 or dy1 <= dy0:
+            continue
+        del_ = poligon_na_slika(dy1 - dy0, dx1 - dx0, translaciona_matrica(dx0, dy0))
+        povrsina, presek = cv2.intersectConvexConvex(np.asarray(poligon, dtype=np.float32), del_)
+        if povrsina > 0 and presek is not None:
+            rezultat.append(presek.reshape(-1, 2))
+    return rezultat
+
+
+def opfat_na_poligoni(poligoni, visina, sirina):
+    """
+    Најмал правоаголник од пиксели чии центри се во некој од полигоните
+
+    Returns:
+        tuple: (x, y, sirina, visina) или None ако нема полигони
+    """
+    if not poligoni:
+        return None
+
+    # Центарот на пикселот i е на i + 0.5
+    tocki = np.concatenate(poligoni, axis=0).astype(np.float64) - 0.5
+    x0 = max(0, int(np.ceil(tocki[:, 0].min() - 1e-3)))
+    y0 = max(0, int(np.ceil(tocki[:, 1].min() - 1e-3)))
+    x1 = min(sirina, int(np.floor(tocki[:, 0].max() + 1e-3)) + 1)
+    y1 = min(visina, int(np.floor(tocki[:, 1].max() + 1e-3)) + 1)
+
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def najgolem_pravoagolnik_vo_maska(maska):
+    """
+    Најголем правоаголник од самите ненулти пиксели на маската
+
+    За секој ред се одржуваат висините на столбовите од ненулти пиксели,
+    а најголемиот правоаголник под тој хистограм се наоѓа со стек, O(visina * sirina).
+
+    Returns:
+        tuple: (x, y, sirina, visina) во пиксели на маската (0 површина ако маската е празна)
+    """
+    visina, sirina = maska.shape
+    visini = np.zeros(sirina, dtype=np.int32)
+    najdobar, najgolema = (0, 0, 0, 0), 0
+
+    for y in range(visina):
+        visini = np.where(maska[y] > 0, visini + 1, 0)
+        stek = []
+        for x, h in enumerate(visini.tolist() + [0]):
+            pocetok = x
+            while stek and stek[-1][1] >= h:
+                pocetok, h_vo_stek = stek.pop()
+                povrsina = h_vo_stek * (x - pocetok)
+                if povrsina > najgolema:
+                    najgolema = povrsina
+                    najdobar = (pocetok, y - h_vo_stek + 1, x - pocetok, h_vo_stek)
+            stek.append((pocetok, h))
+
+    return najdobar
+
+
+def najgolem_vnatresen_pravoagolnik(poligoni, visina, sirina, maks_golemina=400):
+    """
+    Најголем правоаголник во кој сите пиксели се покриени со некој полигон
+
+    Полигоните се цртаат на намалена маска (најголема страна maks_golemina), која
+    се еродира за еден пиксел за правоаголникот да не зафати празен раб, и
+    резултатот се враќа во координатите на платното (заокружен навнатре).
+
+    Returns:
+        tuple: (x, y, sirina, visina) или None ако нема полигони
+    """
+    if not poligoni:
+        return None
+
+    razmer = min(1.0, maks_golemina / max(visina, sirina))
+    maska = np.zeros((max(1, int(np.ceil(visina * razmer))), max(1, int(np.ceil(sirina * razmer)))), dtype=np.uint8)
+    for poligon in poligoni:
+        # Подпикселна прецизност: координатите се со 4 бита дропки
+        tocki = np.round(np.asarray(poligon, dtype=np.float64) * razmer * 16).astype(np.int32)
+        cv2.fillConvexPoly(maska, tocki, 255, lineType=cv2.LINE_8, shift=4)
+    maska = cv2.erode(maska, np.ones((3, 3), dtype=np.uint8), borderType=cv2.BORDER_CONSTANT, borderValue=0)
+
+    mx, my, mw, mh = najgolem_pravoagolnik_vo_maska(maska)
+    if mw == 0 or mh == 0:
+        return None
+
+    x0 = min(sirina, int(np.ceil(mx / razmer)))
+    y0 = min(visina, int(np.ceil(my / razmer)))
+    x1 = min(sirina, int(np.floor((mx + mw) / razmer)))
+    y1 = min(visina, int(np.floor((my + mh) / razmer)))
+
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def presmetaj_regioni_na_rabovi(visina, sirina, smer, udel):
+    """
+    Рабовите по кои сликата може да се преклопува со соседните слики во секвенцата
+
+    Args:
+        visina (int): Висина на сликата
+        sirina (int): Ширина на сликата
+        smer (str): 'horizontal' (лев и десен раб) или 'vertical' (горен и долен раб)
+        udel (float): Ширина на секој раб како дел од соодветната димензија
+
+    Returns:
+        list: Региони (x0, y0, x1, y1); еден регион (целата слика) ако рабовите се допираат
+    """
+    if smer == 'vertical':
+        rab = max(1, int(round(visina * udel)))
+        if 2 * rab >= visina:
+            return [(0, 0, sirina, visina)]
+        return [(0, 0, sirina, rab), (0, visina - rab, sirina, visina)]
+
+    rab = max(1, int(round(sirina * udel)))
+    if 2 * rab >= sirina:
+        return [(0, 0, sirina, visina)]
+    return [(0, 0, rab, visina), (sirina - rab, 0, sirina, visina)]
@@ -1,50 +1,260 @@
+import itertools
+import threading
+
 import cv2
 import numpy as np
 
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from src.feature_cache import DiskFeatureCache, FeatureCache, presmetaj_kluc_na_slika
+from src.features import DETEKTORI, PRESETI, Karakteristiki, Sovpadanja, napravi_detektor
+from src.instrumentation import Statistika
+from src.matching import napravi_matcher
+from src.registration import (
+    MosaicFeatureStore, PairRegistration, iseci_poligoni, najgolem_vnatresen_pravoagolnik, opfat_na_poligoni,
+    poligon_bez_pravoagolnik, poligon_na_slika, proceni_pomestuvanje,
+    namali_slika, nadovrzi_homografii, presmetaj_platno, presmetaj_regioni_na_preklop, presmetaj_regioni_na_rabovi,
+    rasporedi_edno_do_drugo, skaliraj_homografija, transformiraj_tocki, translaciona_matrica
+)
+from src.utils import broj_na_procesori
+from src.warping import iscrtaj_vo_plocki, napravi_platno, opfat_na_sodrzina
+
 class PanoramaStitcher:
-    def __init__(self, smer='auto'):
+    def __init__(self, smer='auto', kes_maks_bajti=256 * 1024 * 1024, rezim='inkrementalen',
+                 posledni_k_sliki=2, matcher='bf', flann_drva=5, flann_proverki=50,
+                 detektor='sift', preset=None, minijatura=0, udel_na_preklop=None, broj_rabotnici=None,
+                 golemina_na_plocka=1024, maks_megapikseli=250, privremen_direktorium=None,
+                 isecuvanje='opfat', statistika=None, kes_direktorium=None,
+                 kes_na_disk_maks_bajti=1024 * 1024 * 1024, model_na_dvizenje='auto'):
         """
         Иницијализирај го stitching алгоритмот
 
         Args:
             smer (str): 'auto' за автоматска детекција, 'horizontal' за хоризонтална, 'vertical' за вертикална
+            kes_maks_bajti (int): Буџет во бајти за кешот на клучни точки (0 го исклучува кешот)
+            rezim (str): 'inkrementalen' за спојување слика по слика во панорамата,
+                         'globalen' за регистрација на соседни слики и едно компонирање на крајот,
+                         'edno_do_drugo' за слики без преклоп, нанижани во едно платно без регистрација
+            posledni_k_sliki (int): Со колку последно поставени слики се совпаѓа новата слика
+                                    при инкрементално спојување (0 = SIFT врз целата панорама)
+            matcher (str): 'bf' за исцрпно совпаѓање, 'flann' за KD-дрва, 'crosscheck' за вкрстена проверка
+            flann_drva (int): Број на KD-дрва за FLANN
+            flann_proverki (int): Број на проверки при FLANN пребарување
+            detektor (str): 'sift', 'orb' или 'akaze'; нормата и прагот на односот го следат детекторот
+            preset (str): 'fast', 'balanced' или 'quality'; ги поставува детекторот, бројот
+                          на клучни точки и matcher-от (ги надминува detektor и matcher),
+                          а 'fast' и udel_na_preklop ако не е даден
+            minijatura (int): Најголема страна на минијатурите за грубо-кон-фино регистрирање
+                              на парови (на пр. 400); 0 = регистрација на работна резолуција
+            udel_na_preklop (float): Детектирај клучни точки само во рабовите по насоката на
+                                     панорамата, широки колку овој дел од сликата (на пр. 0.3);
+                                     при премалку совпаѓања рабовите автоматски се прошируваат.
+                                     None = детекција врз целата слика
+            broj_rabotnici (int): Колку нишки паралелно ги детектираат клучните точки на
+                                  следните слики и ги трансформираат плочките на платното
+                                  (None = број на процесори, 1 = без паралелизам)
+            golemina_na_plocka (int): Страна на плочките при трансформирање на сликите во платното
+            maks_megapikseli (float): Најголема површина на платното во мегапиксели; поголемо
+                                      платно значи дека хомографијата е погрешна
+            privremen_direktorium (str): Ако е даден, платната се np.memmap фајлови во овој
+                                         директориум наместо во RAM (за панорами поголеми од меморијата)
+            isecuvanje (str): 'opfat' го сече платното на опфатот на поставените слики,
+                              'vnatresen' на најголемиот правоаголник без празни пиксели
+            statistika (Statistika): Каде се мерат етапите и бројачите (None = нова Statistika)
+            kes_direktorium (str): Ако е даден, клучните точки се чуваат и во .npz фајлови
+                                   во овој директориум и се користат во следните извршувања
+            kes_na_disk_maks_bajti (int): Буџет во бајти за кешот на диск
+            model_na_dvizenje (str): 'auto' ги пробува по ред поместување, сличност и хомографија
+                                     и го зема првиот модел што ги објаснува совпаѓањата;
+                                     'homografija' секогаш пресметува целосна хомографија
         """
-        self.smer = smer
+        if rezim not in ('inkrementalen', 'globalen', 'edno_do_drugo'):
+            raise ValueError(f"Непознат режим: {rezim}")
+
+        if isecuvanje not in ('opfat', 'vnatresen'):
+            raise ValueError(f"Непознато исечување: {isecuvanje}")
+
+        if model_na_dvizenje not in ('auto', 'homografija'):
+            raise ValueError(f"Непознат модел на движење: {model_na_dvizenje}")
+
         self.broj_na_kliucevi = 5000
-        self.odnos_na_sovpadanje = 0.7
+        if preset is not None:
+            if preset not in PRESETI:
+                raise ValueError(f"Непознат пресет: {preset}")
+            detektor = PRESETI[preset]['detektor']
+            matcher = PRESETI[preset]['matcher']
+            self.broj_na_kliucevi = PRESETI[preset]['broj_na_kliucevi']
+            # Изречно дадената ширина на рабовите има предност пред пресетот
+            if udel_na_preklop is None:
+                udel_na_preklop = PRESETI[preset].get('udel_na_preklop')
+
+        if udel_na_preklop is not None and not 0 < udel_na_preklop < 1:
+            raise ValueError(f"Уделот на преклоп мора да биде помеѓу 0 и 1: {udel_na_preklop}")
+
+        if detektor not in DETEKTORI:
+            raise ValueError(f"Непознат детектор: {detektor}")
+
+        self.smer = smer
+        self.rezim = rezim
+        self.preset = preset
+        self.ime_na_detektor = detektor
+        self.ime_na_matcher = matcher
+        self.odnos_na_sovpadanje = DETEKTORI[detektor]['odnos']
         self.ransac_reproj_threshold = 5.0
         self.min_sovpadanja = 10
 
+        # Скала на модели: поместување -> сличност -> хомографија. Поедноставен модел
+        # се прифаќа ако барем min_udel_na_inlieri_za_model од совпаѓањата се во
+        # ransac_reproj_threshold и нивното RMS отстапување е најмногу prag_na_ostatok_za_model
+        self.model_na_dvizenje = model_na_dvizenje
+        self.min_udel_na_inlieri_za_model = 0.5
+        self.prag_na_ostatok_za_model = 1.0
+
         # Праг за дали сликите се преклопуваат
         self.min_preklop_za_spojuvanje = 0.1  # 10% минимален преклоп
 
-        self.detektor = cv2.SIFT_create(nfeatures=self.broj_na_kliucevi)
-        self.matcher = cv2.BFMatcher()
+        self.detektor = napravi_detektor(detektor, self.broj_na_kliucevi)
+        norma = DETEKTORI[detektor]['norma']
+        if matcher == 'flann':
+            self.matcher = napravi_matcher(matcher, drva=flann_drva, proverki=flann_proverki, norma=norma)
+        else:
+            self.matcher = napravi_matcher(matcher, norma=norma)
+
+        # Брза детекција на насока со фазна корелација на минијатури; под овој праг
+        # на доверба насоката се одредува од совпаѓањата на клучните точки, а во
+        # маргината над него клучните точки ја проверуваат брзата проценка
+        self.prag_na_doverba_za_smer = 0.15
+        self.margina_na_doverba_za_smer = 0.05
+        self.doverba_na_smer = None
 
         # Праг за детекција на вертикална насока при спојување без преклоп
         self.vertical_direction_threshold = 30  # пиксели
 
-    def odredi_smer_na_preklop(self, slika1, slika2):
+        # Кеш за клучни точки: детекторот се извршува само еднаш по слика
+        self.kes_na_karakteristiki = FeatureCache(kes_maks_bajti)
+        self.parametri_na_detektor = (detektor, self.broj_na_kliucevi)
+
+        # Кеш на диск, помеѓу извршувањата
+        self.kes_na_disk = None
+        if kes_direktorium is not None:
+            self.kes_na_disk = DiskFeatureCache(kes_direktorium, kes_na_disk_maks_bajti)
+
+        # Кеш за регистрации на парови (совпаѓања и хомографија)
+        self.kes_na_parovi = OrderedDict()
+        self.maks_parovi_vo_kes = 8
+
+        # Складиште на клучни точки од панорамата (инкрементален режим)
+        self.posledni_k_sliki = posledni_k_sliki
+
+        # Грубо-кон-фино: хомографија на минијатури, доточнување само во преклопот
+        self.minijatura = minijatura
+
+        # Детекција само во рабовите што може да се преклопуваат со соседите;
+        # насоката на рабовите се поставува откако ќе се одреди насоката на панорамата
+        self.udel_na_preklop = udel_na_preklop
+        self.smer_na_rabovi = None if smer == 'auto' else smer
+
+        # Паралелна детекција: секоја нишка има свој детектор
+        self.broj_rabotnici = broj_rabotnici if broj_rabotnici is not None else broj_na_procesori()
+        self._lokalno = threading.local()
+
+        # Сликите се трансформираат во платното плочка по плочка
+        self.golemina_na_plocka = golemina_na_plocka
+        self.maks_megapikseli = maks_megapikseli
+        self.privremen_direktorium = privremen_direktorium
+
+        # Регионот со слики се следи аналитички (полигони) додека се спојува
+        self.isecuvanje = isecuvanje
+
+        # Колку слики од последната панорама се споени без хомографија (едно до друго)
+        self.broj_ednostavni_spojuvanja = 0
+
+        # Времиња по етапи и бројачи (клучни точки, совпаѓања, инлиери, алоцирани бајти)
+        self.statistika = statistika if statistika is not None else Statistika()
+
+    def odredi_smer_brzo(self, slika1, slika2):
+        """
+        Одреди ја насоката на преклопот од фазна корелација на минијатури, без клучни точки
+
+        Поместување пократко од 2% од сликата е најчесто врвот на нула што го
+        даваат рабовите на сликите, а поместување без доминантна оска не
+        кажува ништо за насоката; во двата случаи довербата е 0.
+
+        Returns:
+            tuple: (smer, doverba); smer е 'horizontal', 'vertical' или 'unknown',
+                   doverba е висината на врвот на корелацијата (0-1)
+        """
+        with self.statistika.etapa('smer'):
+            dx, dy, odziv = proceni_pomestuvanje(slika1, slika2)
+
+        visina = max(slika1.shape[0], slika2.shape[0])
+        sirina = max(slika1.shape[1], slika2.shape[1])
+        udel_x = abs(dx) / sirina
+        udel_y = abs(dy) / visina
+
+        if max(udel_x, udel_y) < 0.02:
+            return 'unknown', 0.0
+        if udel_x >= 2 * udel_y:
+            return 'horizontal', odziv
+        if udel_y >= 2 * udel_x:
+            return 'vertical', odziv
+        return 'unknown', 0.0
+
+    def odredi_smer(self, slika1, slika2, par=None):
+        """
+        Одреди ја насоката на преклопот, прво брзо (фазна корелација), а со клучни
+        точки само кога довербата е под prag_na_doverba_za_smer
+
+        Доверба што го поминува прагот за помалку од margina_na_doverba_za_smer
+        не е сигурна, па и тогаш одлучуваат клучните точки; брзата проценка се
+        зема само ако тие не ја одредат насоката. Довербата на брзата проценка
+        се чува во self.doverba_na_smer.
+
+        Returns:
+            tuple: (smer, doverba); smer е 'horizontal', 'vertical' или 'unknown'
+        """
+        smer, doverba = self.odredi_smer_brzo(slika1, slika2)
+        self.doverba_na_smer = doverba
+
+        if doverba >= self.prag_na_doverba_za_smer + self.margina_na_doverba_za_smer:
+            print(f"⚡ Насока од фазна корелација: {smer} (доверба {doverba:.2f})")
+            return smer, doverba
+
+        blisku_do_prag = doverba >= self.prag_na_doverba_za_smer
+        if blisku_do_prag:
+            print(f"Довербата на фазната корелација ({doverba:.2f}) е блиску до прагот. "
+                  f"Проверувам со клучни точки...")
+        else:
+            print(f"Ниска доверба на фазната корелација ({doverba:.2f}). Користам клучни точки...")
+        if par is None:
+            # Детекцијата на насока ги користи клучните точки од двете слики
+            self.predpresmetaj_karakteristiki([slika1, slika2])
+
+        smer_od_tocki = self.odredi_smer_na_preklop(slika1, slika2, par)
+        if smer_od_tocki == 'unknown' and blisku_do_prag:
+            return smer, doverba
+        return smer_od_tocki, doverba
+
+    def odredi_smer_na_preklop(self, slika1, slika2, par=None):
         """
         Автоматски одреди дали преклопот е хоризонтален или вертикален
         Враќа: 'horizontal', 'vertical' или 'unknown'
         """
         try:
             # Најди клучни точки и совпаѓања
-            kliucevi1, deskriptori1 = self.najdi_kliucevi_i_deskriptori(slika1)
-            kliucevi2, deskriptori2 = self.najdi_kliucevi_i_deskriptori(slika2)
+            if par is None:
+                par = self.registriraj_par(slika1, slika2)
 
-            if deskriptori1 is None or deskriptori2 is None or len(kliucevi1) < 5 or len(kliucevi2) < 5:
+            if len(par.xy1) < 5 or len(par.xy2) < 5:
                 return 'unknown'
 
-            sovpadanja = self.najdi_sovpadanja(deskriptori1, deskriptori2)
-
-            if len(sovpadanja) < 10:  # Потребни се барем 10 совпаѓања за сигурна детекција
+            if par.broj_sovpadanja < 10:  # Потребни се барем 10 совпаѓања за сигурна детекција
                 return 'unknown'
 
             # Собери ги позициите на совпаѓањата
-            tocki1 = np.float32([kliucevi1[m.queryIdx].pt for m in sovpadanja])
-            tocki2 = np.float32([kliucevi2[m.trainIdx].pt for m in sovpadanja])
+            tocki1 = par.tocki1
+            tocki2 = par.tocki2
 
             # Пресметај релативни движења помеѓу совпаѓањата
             dx = tocki2[:, 0] - tocki1[:, 0]
@@ -87,123 +297,504 @@ class PanoramaStitcher:
             print(f"Грешка при детекција на насока: {e}")
             return 'unknown'
 
-    def proveri_dali_ima_preklop(self, slika1, slika2):
+    def proveri_dali_ima_preklop(self, slika1, slika2, par=None):
         """
         Провери дали две слики имаат преклоп
         Враќа процент на преклоп (0-1) и број на совпаѓања
         """
         try:
-            # Најди клучни точки
-            kliucevi1, deskriptori1 = self.najdi_kliucevi_i_deskriptori(slika1)
-            kliucevi2, deskriptori2 = self.najdi_kliucevi_i_deskriptori(slika2)
+            if par is None:
+                par = self.registriraj_par(slika1, slika2)
 
-            if deskriptori1 is None or deskriptori2 is None:
-                return 0.0, 0
+            # Процентот е груба проценка базирана на број на совпаѓања
+            return par.preklop_procent, par.broj_sovpadanja
 
-            sovpadanja = self.najdi_sovpadanja(deskriptori1, deskriptori2)
+        except Exception as e:
+            print(f"Грешка при проверка на преклоп: {e}")
+            return 0.0, 0
 
-            if len(sovpadanja) == 0:
-                return 0.0, 0
+    def registriraj_par(self, slika1, slika2):
+        """
+        Најди ги совпаѓањата помеѓу две слики еднаш и врати PairRegistration
 
-            # Пресметај процентуално колку од сликата преклопува
-            # (груба проценка базирана на број на совпаѓања)
-            avg_matches_per_image = (len(kliucevi1) + len(kliucevi2)) / 2
-            if avg_matches_per_image == 0:
-                return 0.0, len(sovpadanja)
+        Резултатот се чува во мал кеш, па проверката на преклоп, детекцијата
+        на насока и спојувањето со хомографија го делат истото совпаѓање.
+        """
+        kluc1 = presmetaj_kluc_na_slika(slika1)
+        kluc2 = presmetaj_kluc_na_slika(slika2)
+        kluc_na_par = (kluc1, kluc2, self.parametri_na_detektor, self.smer_na_rabovi)
 
-            preklop_procent = min(1.0, len(sovpadanja) / avg_matches_per_image * 2)
+        par = self.kes_na_parovi.get(kluc_na_par)
+        if par is not None:
+            self.kes_na_parovi.move_to_end(kluc_na_par)
+            return par
 
-            return preklop_procent, len(sovpadanja)
+        par = None
+        if self.minijatura:
+            par = self._registriraj_grubo_kon_fino(slika1, slika2, kluc1, kluc2)
 
-        except Exception as e:
-            print(f"Грешка при проверка на преклоп: {e}")
-            return 0.0, 0
+        if par is None:
+            for udel in self._udeli_na_preklop():
+                par = self._registriraj_par_vo_rabovi(slika1, slika2, kluc1, kluc2, udel)
+                if udel is None or self._ima_dovolno_inlieri(par):
+                    break
+                print(f"Премалку совпаѓања во рабовите ({udel:.0%}). Ги проширувам...")
+
+        self.kes_na_parovi[kluc_na_par] = par
+        while len(self.kes_na_parovi) > self.maks_parovi_vo_kes:
+            self.kes_na_parovi.popitem(last=False)
+
+        return par
+
+    def _udeli_na_preklop(self):
+        """
+        Ширини на рабовите за детекција, од најтесната до целата слика (None)
+
+        Додека насоката на панорамата не е позната, се користи целата слика.
+        """
+        udel = self.udel_na_preklop if self.smer_na_rabovi is not None else None
+        while udel is not None and udel < 0.5:
+            yield udel
+            udel *= 2
+        yield None
+
+    def _registriraj_par_vo_rabovi(self, slika1, slika2, kluc1, kluc2, udel):
+        """
+        Совпаѓај ги клучните точки од рабовите на двете слики (udel=None: цели слики)
+
+        Кај хоризонтална секвенца се совпаѓа само десниот раб на првата
+        со левиот раб на втората слика.
+        """
+        karakteristiki1 = self._najdi_karakteristiki_po_kluc(slika1, kluc1, udel=udel)
+        karakteristiki2 = self._najdi_karakteristiki_po_kluc(slika2, kluc2, udel=udel)
+
+        if udel is None or self.smer_na_rabovi != 'horizontal':
+            sovpadanja = self.najdi_sovpadanja(karakteristiki1.deskriptori, karakteristiki2.deskriptori)
+        elif karakteristiki1.deskriptori is None or karakteristiki2.deskriptori is None:
+            sovpadanja = Sovpadanja.prazni()
+        else:
+            izbrani1 = np.flatnonzero(karakteristiki1.xy[:, 0] >= slika1.shape[1] * (1 - udel) - 1)
+            izbrani2 = np.flatnonzero(karakteristiki2.xy[:, 0] <= slika2.shape[1] * udel + 1)
+            delumni = self.najdi_sovpadanja(
+                karakteristiki1.deskriptori[izbrani1], karakteristiki2.deskriptori[izbrani2]
+            )
+            sovpadanja = Sovpadanja(izbrani1[delumni.idx1], izbrani2[delumni.idx2], delumni.rastojanie)
+
+        par = PairRegistration(karakteristiki1.xy, karakteristiki2.xy, sovpadanja)
+        par.udel_na_preklop = udel
+        return par
+
+    def _registriraj_grubo_kon_fino(self, slika1, slika2, kluc1, kluc2):
+        """
+        Регистрирај го парот прво на минијатури, па доточни го на работна
+        резолуција само во преклопот предвиден од грубата хомографија
+
+        Враќа None ако грубата регистрација не успее; тогаш парот се
+        регистрира врз целите слики.
+        """
+        minijatura1, razmer1 = namali_slika(slika1, self.minijatura)
+        minijatura2, razmer2 = namali_slika(slika2, self.minijatura)
+        if razmer1 == 1.0 and razmer2 == 1.0:
+            return None
+
+        groba1 = self.najdi_karakteristiki(minijatura1)
+        groba2 = self.najdi_karakteristiki(minijatura2)
+        groba_par = PairRegistration(
+            groba1.xy, groba2.xy, self.najdi_sovpadanja(groba1.deskriptori, groba2.deskriptori)
+        )
+        groba_homografija, _ = self.presmetaj_homografija_za_par(groba_par)
+        if groba_homografija is None:
+            print("Грубата регистрација на минијатури не успеа. Користам цели слики...")
+            return None
+
+        homografija = skaliraj_homografija(groba_homografija, razmer1, razmer2)
+
+        # Грешката на минијатурата се зголемува со размерот
+        margina = int(np.ceil(self.ransac_reproj_threshold / min(razmer1, razmer2)))
+        region1, region2 = presmetaj_regioni_na_preklop(
+            slika1.shape[:2], slika2.shape[:2], homografija, 2 * margina
+        )
+        if region1 is None:
+            print("Грубата хомографија не предвидува преклоп. Користам цели слики...")
+            return None
+
+        karakteristiki1 = self._najdi_karakteristiki_po_kluc(slika1, kluc1, region1)
+        karakteristiki2 = self._najdi_karakteristiki_po_kluc(slika2, kluc2, region2)
+        sovpadanja = self.najdi_sovpadanja(karakteristiki1.deskriptori, karakteristiki2.deskriptori)
+
+        # Задржи ги само совпаѓањата што се согласуваат со грубата хомографија
+        if len(sovpadanja) > 0:
+            predvideni = transformiraj_tocki(karakteristiki2.xy[sovpadanja.idx2], homografija)
+            greska = np.linalg.norm(predvideni - karakteristiki1.xy[sovpadanja.idx1], axis=1)
+            sovpadanja = sovpadanja.podmnozestvo(greska < 2 * margina)
+
+        if len(sovpadanja) < self.min_sovpadanja:
+            print("Премалку совпаѓања во предвидениот преклоп. Користам цели слики...")
+            return None
+
+        print(f"Грубо-кон-фино: {groba_par.broj_sovpadanja} совпаѓања на минијатури, "
+              f"{len(sovpadanja)} во преклопот")
+        return PairRegistration(karakteristiki1.xy, karakteristiki2.xy, sovpadanja)
+
+    def registriraj_so_skladiste(self, skladiste, slika):
+        """
+        Совпаѓај ја новата слика со клучните точки од последните поставени слики
+
+        Координатите на првата страна од парот се во рамката на панорамата.
+        """
+        xy_panorama, deskriptori_panorama, broj_po_slika = skladiste.aktivni()
+
+        # Складиштето е исто за сите ширини на рабовите, па (кај FLANN) индексот
+        # се гради над него еднаш, а рабовите на новата слика се прашањата
+        self.matcher.podgotvi(deskriptori_panorama)
+
+        # Складиштето не се проширува, само рабовите на новата слика
+        for udel in self._udeli_na_preklop():
+            karakteristiki = self.najdi_karakteristiki(slika, udel)
+            sovpadanja = self.najdi_sovpadanja(deskriptori_panorama, karakteristiki.deskriptori)
+            par = PairRegistration(
+                xy_panorama, karakteristiki.xy, sovpadanja, broj_kliucevi1=broj_po_slika
+            )
+            par.udel_na_preklop = udel
+            if udel is None or self._ima_dovolno_inlieri(par):
+                break
+            print(f"Премалку совпаѓања во рабовите ({udel:.0%}). Ги проширувам...")
+
+        return par
+
+    def _ima_dovolno_inlieri(self, par):
+        """
+        Дали хомографијата на парот е поддржана од доволно RANSAC inlier-и
+        """
+        homografija, _ = self.presmetaj_homografija_za_par(par)
+        return homografija is not None and par.broj_inlieri >= self.min_sovpadanja
 
     def najdi_kliucevi_i_deskriptori(self, slika):
         """
         Најди клучеви точки и дескриптори на слика
+
+        Враќа листа од cv2.KeyPoint и дескриптори; внатрешно се користи najdi_karakteristiki.
         """
+        karakteristiki = self.najdi_karakteristiki(slika)
+        return karakteristiki.kako_kliucevi(), karakteristiki.deskriptori
+
+    def najdi_karakteristiki(self, slika, udel=None):
+        """
+        Најди ги клучните точки и дескрипторите на слика како Karakteristiki
+
+        Резултатот се чува во кешот, па повторен повик за иста слика
+        не го извршува SIFT повторно. Ако е даден udel, детекцијата е само
+        во рабовите по smer_na_rabovi (види presmetaj_regioni_na_rabovi).
+        """
+        return self._najdi_karakteristiki_po_kluc(slika, presmetaj_kluc_na_slika(slika), udel=udel)
+
+    def _najdi_karakteristiki_po_kluc(self, slika, kluc_na_slika, region=None, udel=None):
+        """
+        Ако е даден region (x0, y0, x1, y1) или udel (рабови по smer_na_rabovi),
+        детекцијата е само во тие делови, а координатите се враќаат во рамката
+        на целата слика.
+        """
+        rabovi = None
+        if udel is not None and self.smer_na_rabovi is not None:
+            rabovi = (self.smer_na_rabovi, udel)
+
+        kluc = (kluc_na_slika, self.parametri_na_detektor, region, rabovi)
+        karakteristiki = self.kes_na_karakteristiki.zemi(kluc)
+        if karakteristiki is not None:
+            return karakteristiki
+
+        if self.kes_na_disk is not None:
+            karakteristiki = self.kes_na_disk.zemi(kluc)
+            if karakteristiki is not None:
+                self.statistika.dodadi('pogodoci_vo_kes_na_disk')
+                self.kes_na_karakteristiki.stavi(kluc, karakteristiki)
+                return karakteristiki
+
         if len(slika.shape) == 3:
-            slika_siva = cv2.cvtColor(slika, cv2.COLOR_BGR2GRAY)
+            with self.statistika.etapa('sivo'):
+                slika_siva = cv2.cvtColor(slika, cv2.COLOR_BGR2GRAY)
         else:
             slika_siva = slika
 
+        if region is not None:
+            regioni = [region]
+        elif rabovi is not None:
+            # Секој раб се детектира посебно, за SIFT да не ја обработува средината
+            regioni = presmetaj_regioni_na_rabovi(slika_siva.shape[0], slika_siva.shape[1], *rabovi)
+        else:
+            regioni = [None]
+
         try:
-            kliucevi, deskriptori = self.detektor.detectAndCompute(slika_siva, None)
-            return kliucevi, deskriptori
+            karakteristiki = Karakteristiki.nadovrzi([self._detektiraj(slika_siva, r) for r in regioni])
         except Exception as e:
             print(f"Грешка при детекција на клучни точки: {e}")
-            return [], None
+            return Karakteristiki.prazni()
+
+        self.kes_na_karakteristiki.stavi(kluc, karakteristiki)
+        if self.kes_na_disk is not None:
+            self.kes_na_disk.stavi(kluc, karakteristiki)
+        return karakteristiki
+
+    def _detektiraj(self, slika_siva, region=None):
+        """
+        Изврши го детекторот врз целата сива слика или врз регион (x0, y0, x1, y1) од неа
+        """
+        x0, y0 = 0, 0
+        if region is not None:
+            x0, y0, x1, y1 = region
+            slika_siva = slika_siva[y0:y1, x0:x1]
+
+        detektor = getattr(self._lokalno, 'detektor', self.detektor)
+        with self.statistika.etapa('detekcija'):
+            kliucevi, deskriptori = detektor.detectAndCompute(slika_siva, None)
+        self.statistika.dodadi('kliucevi', len(kliucevi))
+
+        # Веднаш по детекцијата, cv2.KeyPoint објектите се претвораат во низи
+        karakteristiki = Karakteristiki.od_kliucevi(kliucevi, deskriptori)
+        if region is not None:
+            karakteristiki.xy += np.array([x0, y0], dtype=np.float32)
+        return karakteristiki
+
+    def _karakteristiki_za_registracija(self, slika, minijaturi=True):
+        """
+        Пресметај ги (во кешот) клучните точки што регистрацијата ќе ги побара за сликата
+        """
+        if minijaturi and self.minijatura:
+            minijatura, razmer = namali_slika(slika, self.minijatura)
+            if razmer < 1.0:
+                return self.najdi_karakteristiki(minijatura)
+
+        return self.najdi_karakteristiki(slika, next(self._udeli_na_preklop()))
+
+    def _inicijaliziraj_rabotnik(self):
+        # Истиот cv2.Feature2D објект не се користи од повеќе нишки истовремено
+        self._lokalno.detektor = napravi_detektor(self.ime_na_detektor, self.broj_na_kliucevi)
+
+    def predpresmetaj_karakteristiki(self, sliki, minijaturi=True):
+        """
+        Паралелно детектирај ги клучните точки на дадените слики (во кешот)
+
+        Args:
+            sliki (iterable): Слики чии клучни точки ќе се пресметаат
+            minijaturi (bool): Дали регистрацијата ќе ги користи минијатурите (види minijatura)
+        """
+        for _ in self.so_karakteristiki_odnapred(sliki, minijaturi):
+            pass
+
+    def so_karakteristiki_odnapred(self, sliki, minijaturi=True):
+        """
+        Врати ги сликите по ред, додека клучните точки на следните неколку
+        се детектираат паралелно однапред
+
+        detectAndCompute го ослободува GIL, па нишките работат истовремено.
+        Резултатите одат во кешот, од каде ги зема спојувањето. Однапред се
+        земаат најмногу broj_rabotnici слики, па и долга секвенца не мора да
+        биде цела во меморија. Додека се чека на детекцијата, внатрешните нишки
+        на OpenCV се делат меѓу работниците, за процесорот да не биде
+        преоптоварен; cv2.setNumThreads важи за целиот процес, па пред секоја
+        вратена слика се враќа полниот број, за спојувањето (RANSAC,
+        трансформација) да не работи во една нишка.
+
+        Args:
+            sliki (iterable): Слики (листа или генератор)
+            minijaturi (bool): Дали регистрацијата ќе ги користи минијатурите (види minijatura)
+        """
+        if self.broj_rabotnici <= 1:
+            yield from sliki
+            return
+
+        print(f"Паралелна детекција на клучни точки ({self.broj_rabotnici} нишки)...")
+
+        polni_niski = cv2.getNumThreads()
+        niski_po_rabotnik = max(1, polni_niski // self.broj_rabotnici)
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self.broj_rabotnici, initializer=self._inicijaliziraj_rabotnik
+            ) as izvrsitel:
+                cv2.setNumThreads(niski_po_rabotnik)
+                vo_tek = deque()
+                for slika in sliki:
+                    vo_tek.append((slika, izvrsitel.submit(self._karakteristiki_za_registracija, slika, minijaturi)))
+                    if len(vo_tek) > self.broj_rabotnici:
+                        slika, idno = vo_tek.popleft()
+                        idno.result()
+                        cv2.setNumThreads(polni_niski)
+                        yield slika
+                        cv2.setNumThreads(niski_po_rabotnik)
+
+                while vo_tek:
+                    slika, idno = vo_tek.popleft()
+                    idno.result()
+                    cv2.setNumThreads(polni_niski)
+                    yield slika
+                    cv2.setNumThreads(niski_po_rabotnik)
+        finally:
+            cv2.setNumThreads(polni_niski)
 
     def najdi_sovpadanja(self, deskriptori1, deskriptori2):
         """
         Најди совпаѓања помеѓу две сетови на дескриптори
+
+        Враќа Sovpadanja (низи од индекси), тестот на односот е векторизиран.
         """
         if deskriptori1 is None or deskriptori2 is None:
-            return []
+            return Sovpadanja.prazni()
 
         try:
-            sovpadanja_grubi = self.matcher.knnMatch(deskriptori1, deskriptori2, k=2)
-            dobri_sovpadanja = []
-
-            for m, n in sovpadanja_grubi:
-                if m.distance < self.odnos_na_sovpadanje * n.distance:
-                    dobri_sovpadanja.append(m)
-
-            return dobri_sovpadanja
+            with self.statistika.etapa('sovpagjanje'):
+                sovpadanja = self.matcher.sovpadni(deskriptori1, deskriptori2, self.odnos_na_sovpadanje)
+            self.statistika.dodadi('sovpadanja', len(sovpadanja))
+            return sovpadanja
         except Exception as e:
             print(f"Грешка при наоѓање совпаѓања: {e}")
-            return []
+            return Sovpadanja.prazni()
+
+    def presmetaj_homografija_za_par(self, par):
+        """
+        Пресметај ја хомографијата за пар еднаш и зачувај ја во него
+        """
+        if not par.homografija_presmetana:
+            if par.broj_sovpadanja < self.min_sovpadanja:
+                par.homografija, par.maska, par.model = None, None, None
+            else:
+                par.homografija, par.maska, par.model = self._presmetaj_model_od_tocki(par.tocki1, par.tocki2)
+            par.homografija_presmetana = True
+
+        return par.homografija, par.maska
 
-    def presmetaj_homografija(self, kliucevi1, kliucevi2, sovpadanja):
+    def presmetaj_homografija(self, karakteristiki1, karakteristiki2, sovpadanja):
         """
         Пресметај хомографиска трансформација
+
+        Args:
+            karakteristiki1 (Karakteristiki): Клучни точки на првата слика
+            karakteristiki2 (Karakteristiki): Клучни точки на втората слика
+            sovpadanja (Sovpadanja): Совпаѓања помеѓу нив
         """
         if len(sovpadanja) < self.min_sovpadanja:
             return None, None
 
-        try:
-            tocki1 = np.float32([kliucevi1[m.queryIdx].pt for m in sovpadanja]).reshape(-1, 1, 2)
-            tocki2 = np.float32([kliucevi2[m.trainIdx].pt for m in sovpadanja]).reshape(-1, 1, 2)
+        tocki1 = karakteristiki1.xy[sovpadanja.idx1]
+        tocki2 = karakteristiki2.xy[sovpadanja.idx2]
 
-            homografija, maska = cv2.findHomography(
-                tocki2, tocki1, cv2.RANSAC, self.ransac_reproj_threshold
-            )
+        homografija, maska, _ = self._presmetaj_model_od_tocki(tocki1, tocki2)
+        return homografija, maska
 
-            return homografija, maska
+    def _presmetaj_model_od_tocki(self, tocki1, tocki2):
+        """
+        Најдноставната трансформација од втората во првата слика што ги објаснува совпаѓањата
+
+        Returns:
+            tuple: (homografija, maska, model); model е 'translacija', 'slicnost' или 'homografija'
+        """
+        try:
+            with self.statistika.etapa('ransac'):
+                rezultat = None
+                if self.model_na_dvizenje == 'auto':
+                    rezultat = self._presmetaj_translacija(tocki1, tocki2)
+                    if rezultat is None:
+                        rezultat = self._presmetaj_slicnost(tocki1, tocki2)
+
+                if rezultat is None:
+                    homografija, maska = cv2.findHomography(
+                        tocki2.reshape(-1, 1, 2), tocki1.reshape(-1, 1, 2),
+                        cv2.RANSAC, self.ransac_reproj_threshold
+                    )
+                    rezultat = homografija, maska, 'homografija'
+
+            homografija, maska, model = rezultat
+            if maska is not None:
+                self.statistika.dodadi('inlieri', int(maska.sum()))
+            if homografija is not None:
+                self.statistika.dodadi(f'model_{model}')
+            return rezultat
         except Exception as e:
             print(f"Грешка при пресметка на хомографија: {e}")
-            return None, None
+            return None, None, None
+
+    def _prifati_model(self, homografija, tocki1, tocki2):
+        """
+        Маската на инлиери ако моделот е доволно добар (види min_udel_na_inlieri_za_model), инаку None
+        """
+        ostatoci = np.linalg.norm(transformiraj_tocki(tocki2, homografija) - tocki1, axis=1)
+        inlieri = ostatoci <= self.ransac_reproj_threshold
+        broj_inlieri = int(inlieri.sum())
+
+        if broj_inlieri < max(self.min_sovpadanja, self.min_udel_na_inlieri_za_model * len(tocki1)):
+            return None
+        if np.sqrt(np.mean(ostatoci[inlieri] ** 2)) > self.prag_na_ostatok_za_model:
+            return None
+        return inlieri.astype(np.uint8).reshape(-1, 1)
+
+    def _presmetaj_translacija(self, tocki1, tocki2):
+        """
+        Чисто поместување: медијана на разликите, доточнета како средина на инлиерите
+        """
+        razliki = tocki1 - tocki2
+        pomestuvanje = np.median(razliki, axis=0)
+        inlieri = np.linalg.norm(razliki - pomestuvanje, axis=1) <= self.ransac_reproj_threshold
+        if not inlieri.any():
+            return None
+
+        homografija = translaciona_matrica(*razliki[inlieri].mean(axis=0))
+        maska = self._prifati_model(homografija, tocki1, tocki2)
+        if maska is None:
+            return None
+        return homografija, maska, 'translacija'
+
+    def _presmetaj_slicnost(self, tocki1, tocki2):
+        """
+        Ротација, скалирање и поместување (estimateAffinePartial2D со RANSAC од по две точки)
+        """
+        afina, _ = cv2.estimateAffinePartial2D(
+            tocki2.reshape(-1, 1, 2), tocki1.reshape(-1, 1, 2),
+            method=cv2.RANSAC, ransacReprojThreshold=self.ransac_reproj_threshold
+        )
+        if afina is None:
+            return None
+
+        homografija = np.vstack([afina, [0, 0, 1]])
+        maska = self._prifati_model(homografija, tocki1, tocki2)
+        if maska is None:
+            return None
+        return homografija, maska, 'slicnost'
 
-    def spoji_so_homografija(self, slika1, slika2, smer='horizontal'):
+    def spoji_so_homografija(self, slika1, slika2, smer='horizontal', par=None):
         """
         Спој ги две слики со хомографија (само ако има преклоп)
         """
+        rezultat, _, _ = self._spoji_so_homografija(slika1, slika2, smer, par)
+        return rezultat
+
+    def _spoji_so_homografija(self, slika1, slika2, smer='horizontal', par=None):
+        """
+        Исто како spoji_so_homografija, но враќа и каде е поставена секоја слика:
+        (rezultat, transformacija_na_slika1, transformacija_na_slika2)
+        """
         print(f"Обид за спојување со хомографија ({smer})...")
 
-        # Најди клучни точки
-        kliucevi1, deskriptori1 = self.najdi_kliucevi_i_deskriptori(slika1)
-        kliucevi2, deskriptori2 = self.najdi_kliucevi_i_deskriptori(slika2)
+        # Најди клучни точки и совпаѓања (или искористи ги веќе пресметаните)
+        if par is None:
+            par = self.registriraj_par(slika1, slika2)
 
-        print(f"Пронајдени {len(kliucevi1)} клучни точки во првата слика")
-        print(f"Пронајдени {len(kliucevi2)} клучни точки во втората слика")
+        print(f"Пронајдени {len(par.xy1)} клучни точки во првата слика")
+        print(f"Пронајдени {len(par.xy2)} клучни точки во втората слика")
 
-        if len(kliucevi1) < 5 or len(kliucevi2) < 5:
+        if len(par.xy1) < 5 or len(par.xy2) < 5:
             print("Премалку клучни точки. Не можам да спојам со хомографија.")
-            return None
+            return None, None, None
 
-        sovpadanja = self.najdi_sovpadanja(deskriptori1, deskriptori2)
-        print(f"Пронајдени {len(sovpadanja)} совпаѓања")
+        print(f"Пронајдени {par.broj_sovpadanja} совпаѓања")
 
-        if len(sovpadanja) < self.min_sovpadanja:
-            print(f"Нема доволно совпаѓања ({len(sovpadanja)} < {self.min_sovpadanja})")
-            return None
+        if par.broj_sovpadanja < self.min_sovpadanja:
+            print(f"Нема доволно совпаѓања ({par.broj_sovpadanja} < {self.min_sovpadanja})")
+            return None, None, None
 
-        homografija, maska = self.presmetaj_homografija(kliucevi1, kliucevi2, sovpadanja)
+        homografija, maska = self.presmetaj_homografija_za_par(par)
 
         if homografija is None:
             print("Неуспех при пресметка на хомографија.")
-            return None
+            return None, None, None
 
         # Примени трансформација
         visina1, sirina1 = slika1.shape[:2]
@@ -233,23 +824,20 @@ class PanoramaStitcher:
             [1, 0, translacija[0]],
             [0, 1, translacija[1]],
             [0, 0, 1]
-        ])
+        ], dtype=np.float64)
 
         nova_sirina = x_max - x_min
         nova_visina = y_max - y_min
 
         # Провери дали резултатот е разумна големина
-        if nova_sirina > 10000 or nova_visina > 10000:
+        if self._platno_e_preveliko(nova_sirina, nova_visina):
             print("Резултатот би бил преголем.")
-            return None
-
-        slika2_transformirana = cv2.warpPerspective(
-            slika2, homografija_T.dot(homografija),
-            (nova_sirina, nova_visina)
-        )
+            return None, None, None
 
-        # Копирај ја првата слика
-        rezultat = slika2_transformirana.copy()
+        # Втората слика се трансформира директно во резултатот, само во опфатот
+        # на нејзините трансформирани агли; нема посебно платно ни копија од него
+        rezultat = self._napravi_platno((nova_visina, nova_sirina) + slika2.shape[2:], slika2.dtype)
+        self._iscrtaj_vo_platno(rezultat, slika2, homografija_T.dot(homografija))
 
         # Додади ја првата слика
         x1_start = translacija[0]
@@ -264,127 +852,107 @@ class PanoramaStitcher:
         y1_end = min(nova_visina, y1_end)
 
         if x1_end > x1_start and y1_end > y1_start:
-            rezultat[y1_start:y1_end, x1_start:x1_end] = slika1[
-                                                         :(y1_end - y1_start), :(x1_end - x1_start)
-                                                         ]
+            with self.statistika.etapa('kompozicija'):
+                rezultat[y1_start:y1_end, x1_start:x1_end] = slika1[
+                                                             :(y1_end - y1_start), :(x1_end - x1_start)
+                                                             ]
 
         print(f"✅ Успешно споени со хомографија ({smer})")
-        return rezultat
+        return rezultat, homografija_T, homografija_T.dot(homografija)
 
     def spoji_edno_do_drugo(self, slika1, slika2, smer='horizontal', stack_new_on_top=False):
         """
         Едноставно спојување: додај ја втората слика до крајот на првата
         За вертикални панорами: ако stack_new_on_top=True, додавај ја новата слика на врвот
         """
+        rezultat, _, _ = self._spoji_edno_do_drugo(slika1, slika2, smer, stack_new_on_top)
+        return rezultat
+
+    def _spoji_edno_do_drugo(self, slika1, slika2, smer='horizontal', stack_new_on_top=False):
+        """
+        Исто како spoji_edno_do_drugo, но враќа и каде е поставена секоја слика:
+        (rezultat, transformacija_na_slika1, transformacija_na_slika2)
+        """
         if smer == 'horizontal':
             print("Спојување едно до друго (хоризонтално)...")
-
-            visina1, sirina1 = slika1.shape[:2]
-            visina2, sirina2 = slika2.shape[:2]
-
-            # Најди заедничка висина (средна)
-            if abs(visina1 - visina2) > 20:
-                # Ако има голема разлика, користи ја помалата
-                min_visina = min(visina1, visina2)
-
-                # Центрирај ги сликите
-                if visina1 > min_visina:
-                    razlika = visina1 - min_visina
-                    slika1 = slika1[razlika//2:razlika//2 + min_visina, :]
-                    visina1 = min_visina
-
-                if visina2 > min_visina:
-                    razlika = visina2 - min_visina
-                    slika2 = slika2[razlika//2:razlika//2 + min_visina, :]
-                    visina2 = min_visina
-
-            zajednichka_visina = max(visina1, visina2)
-
-            # Креирај нова слика
-            nova_sirina = sirina1 + sirina2
-            rezultat = np.zeros((zajednichka_visina, nova_sirina, 3), dtype=np.uint8)
-
-            # Постави ја првата слика лево
-            rezultat[0:visina1, 0:sirina1] = slika1
-
-            # Постави ја втората слика десно
-            rezultat[0:visina2, sirina1:sirina1 + sirina2] = slika2
-
-        else:  # vertical
+        else:
             print("Спојување едно до друго (вертикално)...")
+            if stack_new_on_top:
+                # Новата слика (slika2) оди на врвот, тековната панорама (slika1) оди долу
+                print("  Додавање на нова слика на врвот на панорамата")
+            else:
+                # Стандарден режим: тековната панорама (slika1) горе, новата слика (slika2) долу
+                print("  Додавање на нова слика на дното на панорамата")
 
-            visina1, sirina1 = slika1.shape[:2]
-            visina2, sirina2 = slika2.shape[:2]
+        rezultat, (transformacija1, transformacija2), _ = self._spoji_site_edno_do_drugo(
+            [slika1, slika2], smer, [False, stack_new_on_top]
+        )
+        return rezultat, transformacija1, transformacija2
 
-            # Најди заедничка ширина (средна)
-            if abs(sirina1 - sirina2) > 20:
-                # Ако има голема разлика, користи ја помалата
-                min_sirina = min(sirina1, sirina2)
+    def spoji_site_edno_do_drugo(self, sliki, smer='horizontal', na_vrv=None, dimenzii=None):
+        """
+        Спој ги сите слики една до друга во едно платно, алоцирано само еднаш
 
-                # Центрирај ги сликите
-                if sirina1 > min_sirina:
-                    razlika = sirina1 - min_sirina
-                    slika1 = slika1[:, razlika//2:razlika//2 + min_sirina]
-                    sirina1 = min_sirina
+        Резултатот е ист како низа од spoji_edno_do_drugo, но наместо секое
+        спојување да ја копира целата панорама во ново платно, распоредот се
+        пресметува однапред од димензиите и секоја слика се копира еднаш.
 
-                if sirina2 > min_sirina:
-                    razlika = sirina2 - min_sirina
-                    slika2 = slika2[:, razlika//2:razlika//2 + min_sirina]
-                    sirina2 = min_sirina
+        Args:
+            sliki (iterable): Слики по редослед
+            smer (str): 'horizontal' или 'vertical'
+            na_vrv (list): Кај вертикална насока, дали секоја слика оди над панорамата досега
+            dimenzii (list): (visina, sirina) на сликите; ако се дадени, sliki
+                             се поминува само еднаш (може да биде генератор)
+        """
+        rezultat, _, _ = self._spoji_site_edno_do_drugo(sliki, smer, na_vrv, dimenzii)
+        return rezultat
 
-            zajednichka_sirina = max(sirina1, sirina2)
+    def _spoji_site_edno_do_drugo(self, sliki, smer='horizontal', na_vrv=None, dimenzii=None):
+        """
+        Исто како spoji_site_edno_do_drugo, но враќа и транслација за секоја слика
+        и полигоните (правоаголниците) што сликите ги зафаќаат во платното
+        """
+        if dimenzii is None:
+            sliki = list(sliki)
+            dimenzii = [slika.shape[:2] for slika in sliki]
 
-            # Креирај нова слика
-            nova_visina = visina1 + visina2
-            rezultat = np.zeros((nova_visina, zajednichka_sirina, 3), dtype=np.uint8)
+        (visina, sirina), rasporedi = rasporedi_edno_do_drugo(dimenzii, smer, na_vrv)
+        rezultat = self._napravi_platno((visina, sirina, 3))
 
-            # За вертикално спојување: провери дали треба да додадеме нова слика на врвот
-            if stack_new_on_top:
-                print("  Додавање на нова слика на врвот на панорамата")
-                # Новата слика (slika2) оди на врвот, тековната панорама (slika1) оди долу
-                rezultat[0:visina2, 0:sirina2] = slika2  # Нова слика горе
-                rezultat[visina2:visina2+visina1, 0:sirina1] = slika1  # Тековна панорама долу
-            else:
-                print("  Додавање на нова слика на дното на панорамата")
-                # Стандарден режим: тековната панорама (slika1) горе, новата слика (slika2) долу
-                rezultat[0:visina1, 0:sirina1] = slika1  # Тековна панорама горе
-                rezultat[visina1:visina1+visina2, 0:sirina2] = slika2  # Нова слика долу
+        transformacii = []
+        poligoni = []
+        for slika, ((y0, y1, x0, x1), (y, x)) in zip(sliki, rasporedi):
+            with self.statistika.etapa('kompozicija'):
+                rezultat[y:y + y1 - y0, x:x + x1 - x0] = slika[y0:y1, x0:x1]
+            transformacii.append(translaciona_matrica(x - x0, y - y0))
+            if y1 > y0 and x1 > x0:
+                poligoni.append(poligon_na_slika(y1 - y0, x1 - x0, translaciona_matrica(x, y)))
 
-        return rezultat
+        return rezultat, transformacii, poligoni
 
-    def odredi_vertikalna_nasoka(self, panorama, nova_slika):
+    def odredi_vertikalna_nasoka(self, panorama, nova_slika, par=None):
         """
         Одреди дали новата слика треба да се додаде на врвот или на дното
         Враќа True ако новата слика треба да се додаде на врвот
         """
         try:
             # Прво провери дали има некакви совпаѓања
-            preklop_procent, broj_sovpadanja = self.proveri_dali_ima_preklop(panorama, nova_slika)
-
-            if broj_sovpadanja > 0:
-                # Ако има некои совпаѓања, пробај да ги анализираш
-                kliucevi1, deskriptori1 = self.najdi_kliucevi_i_deskriptori(panorama)
-                kliucevi2, deskriptori2 = self.najdi_kliucevi_i_deskriptori(nova_slika)
-
-                if deskriptori1 is not None and deskriptori2 is not None:
-                    sovpadanja = self.najdi_sovpadanja(deskriptori1, deskriptori2)
-
-                    if len(sovpadanja) > 5:  # Има доволно совпаѓања за анализа
-                        tocki1 = np.float32([kliucevi1[m.queryIdx].pt for m in sovpadanja])
-                        tocki2 = np.float32([kliucevi2[m.trainIdx].pt for m in sovpadanja])
+            if par is None:
+                par = self.registriraj_par(panorama, nova_slika)
 
-                        # Пресметај просечна y разлика
-                        avg_y_diff = np.mean(tocki2[:, 1] - tocki1[:, 1])
+            if par.broj_sovpadanja > 5:  # Има доволно совпаѓања за анализа
+                # Пресметај просечна y разлика
+                avg_y_diff = np.mean(par.tocki2[:, 1] - par.tocki1[:, 1])
 
-                        print(f"  Просечна y-разлика: {avg_y_diff:.1f} пиксели")
+                print(f"  Просечна y-разлика: {avg_y_diff:.1f} пиксели")
 
-                        # Ако просечната y разлика е негативна, втората слика е повисоко (на врвот)
-                        if avg_y_diff < -10:
-                            print(f"  ✅ Детектирано: новата слика е повисоко (на врвот)")
-                            return True
-                        elif avg_y_diff > 10:
-                            print(f"  ✅ Детектирано: новата слика е подолу (на дното)")
-                            return False
+                # Ако просечната y разлика е негативна, втората слика е повисоко (на врвот)
+                if avg_y_diff < -10:
+                    print(f"  ✅ Детектирано: новата слика е повисоко (на врвот)")
+                    return True
+                elif avg_y_diff > 10:
+                    print(f"  ✅ Детектирано: новата слика е подолу (на дното)")
+                    return False
 
             # Ако не може да се одреди од совпаѓањата, претпостави дека сликите се дадени во редослед
             # од долу кон горе (прва слика е најдолна, последна слика е најгорна)
@@ -403,9 +971,12 @@ class PanoramaStitcher:
         """
         print("="*40)
 
+        # Совпаѓањата за парот се пресметуваат еднаш и се користат во сите чекори
+        par = self.registriraj_par(slika1, slika2)
+
         # Одреди ја насоката ако е 'auto'
         if smer == 'auto':
-            detected_smer = self.odredi_smer_na_preklop(slika1, slika2)
+            detected_smer, _ = self.odredi_smer(slika1, slika2, par)
             if detected_smer == 'unknown':
                 # Ако не може да се детектира, пробај да се пресмета од димензиите
                 h1, w1 = slika1.shape[:2]
@@ -423,7 +994,7 @@ class PanoramaStitcher:
         print(f"Анализа на сликите ({smer})...")
 
         # Прво провери дали сликите имаат преклоп
-        preklop_procent, broj_sovpadanja = self.proveri_dali_ima_preklop(slika1, slika2)
+        preklop_procent, broj_sovpadanja = self.proveri_dali_ima_preklop(slika1, slika2, par)
 
         print(f"Пронајдени {broj_sovpadanja} совпаѓања")
         print(f"Проценет преклоп: {preklop_procent:.1%}")
@@ -431,7 +1002,7 @@ class PanoramaStitcher:
         # Ако има доволно преклоп, пробај со хомографија
         if preklop_procent >= self.min_preklop_za_spojuvanje and broj_sovpadanja >= self.min_sovpadanja:
             print(f"Сликите имаат преклоп. Обид за спојување со хомографија ({smer})...")
-            rezultat = self.spoji_so_homografija(slika1, slika2, smer)
+            rezultat = self.spoji_so_homografija(slika1, slika2, smer, par)
 
             if rezultat is not None:
                 return rezultat
@@ -443,7 +1014,7 @@ class PanoramaStitcher:
 
         # За вертикални панорами, пробај да одредиш дали новата слика треба да биде на врвот
         if smer == 'vertical':
-            stack_new_on_top = self.odredi_vertikalna_nasoka(slika1, slika2)
+            stack_new_on_top = self.odredi_vertikalna_nasoka(slika1, slika2, par)
             return self.spoji_edno_do_drugo(slika1, slika2, smer, stack_new_on_top)
         else:
             return self.spoji_edno_do_drugo(slika1, slika2, smer)
@@ -451,32 +1022,55 @@ class PanoramaStitcher:
     def iseci_crna_ramka(self, slika, prag=10):
         """
         Исечи ја црната рамка од сликата
-        """
-        if len(slika.shape) == 3:
-            siva = cv2.cvtColor(slika, cv2.COLOR_BGR2GRAY)
-        else:
-            siva = slika
 
-        nenulti = cv2.findNonZero((siva > prag).astype(np.uint8))
+        Се враќа поглед (view) во сликата, без копија, па и memmap платно
+        останува на дискот.
+        """
+        with self.statistika.etapa('isecuvanje'):
+            opfat = opfat_na_sodrzina(slika, prag)
 
-        if nenulti is None or len(nenulti) == 0:
+        if opfat is None:
             return slika
 
-        x, y, w, h = cv2.boundingRect(nenulti)
+        x, y, w, h = opfat
         return slika[y:y+h, x:x+w]
 
-    def napravi_panorama(self, sliki):
+    def iseci_validen_region(self, panorama, poligoni):
         """
-        Направи панорама од повеќе слики
+        Исечи ја панорамата на регионот покриен со слики
+
+        Регионот се пресметува од полигоните на поставените слики, без скенирање
+        на пикселите, па темната содржина во сликите не се сече како рамка.
+        Кај isecuvanje='vnatresen' се зема најголемиот правоаголник без празни
+        пиксели, пресметан на намалена маска.
+
+        Args:
+            panorama (numpy.ndarray): Платното
+            poligoni (list): Полигоните (N, 2) на сликите во координатите на платното
         """
-        if len(sliki) < 2:
-            print("Потребни се најмалку 2 слики за панорама")
-            return None
+        pravoagolnik = self._pravoagolnik_za_isecuvanje(poligoni, *panorama.shape[:2])
+        if pravoagolnik is None:
+            return panorama
 
-        # Автоматско детектирање на насоката од првите две слики
+        x, y, w, h = pravoagolnik
+        return panorama[y:y+h, x:x+w]
+
+    def _pravoagolnik_za_isecuvanje(self, poligoni, visina, sirina):
+        """
+        Правоаголникот (x, y, sirina, visina) на кој iseci_validen_region го сече платното
+        """
+        with self.statistika.etapa('isecuvanje'):
+            if self.isecuvanje == 'vnatresen':
+                return najgolem_vnatresen_pravoagolnik(poligoni, visina, sirina)
+            return opfat_na_poligoni(poligoni, visina, sirina)
+
+    def _odredi_smer_na_panorama(self, sliki):
+        """
+        Одреди ја насоката на целата панорама (автоматски од првите две слики)
+        """
         if self.smer == 'auto':
             print("Автоматско детектирање на насока на панорамата...")
-            detected_smer = self.odredi_smer_na_preklop(sliki[0], sliki[1])
+            detected_smer, _ = self.odredi_smer(sliki[0], sliki[1])
             if detected_smer == 'unknown':
                 # Ако не може да се детектира, пробај да се пресмета од димензиите
                 h1, w1 = sliki[0].shape[:2]
@@ -494,51 +1088,433 @@ class PanoramaStitcher:
         else:
             panorama_smer = self.smer
 
-        print(f"Започнувам креирање на {panorama_smer} панорама од {len(sliki)} слики...")
+        return panorama_smer
+
+    def napravi_panorama(self, sliki):
+        """
+        Направи панорама од повеќе слики
+
+        sliki може да биде листа или кој било iterable (на пр. TokNaSliki).
+        Инкременталното спојување ги влече сликите една по една, па во
+        меморијата се само панорамата и мал прозорец од слики. Глобалната
+        регистрација ги поминува сликите двапати, па еднократен итератор
+        (генератор) прво се зачувува во листа.
+        """
+        iterator = iter(sliki)
+        prvi_dve = list(itertools.islice(iterator, 2))
+        if len(prvi_dve) < 2:
+            print("Потребни се најмалку 2 слики за панорама")
+            return None
+
+        # Автоматско детектирање на насоката од првите две слики
+        self.broj_ednostavni_spojuvanja = 0
+        self.smer_na_rabovi = None if self.smer == 'auto' else self.smer
+        panorama_smer = self._odredi_smer_na_panorama(prvi_dve)
+        self.smer_na_rabovi = panorama_smer
+
+        if self.rezim in ('globalen', 'edno_do_drugo'):
+            if iterator is sliki:
+                sliki = prvi_dve + list(iterator)
+            if self.rezim == 'edno_do_drugo':
+                return self.napravi_panorama_edno_do_drugo(sliki, panorama_smer)
+            return self.napravi_panorama_globalno(sliki, panorama_smer)
+
+        broj_sliki = len(sliki) if hasattr(sliki, '__len__') else None
+        return self.napravi_panorama_inkrementalno(
+            itertools.chain(prvi_dve, iterator), panorama_smer, broj_sliki
+        )
+
+    def napravi_panorama_inkrementalno(self, sliki, panorama_smer, broj_sliki=None):
+        """
+        Инкрементално спојување: секоја нова слика се спојува со панорамата досега
+
+        Args:
+            sliki (iterable): Слики по редослед (се поминуваат само еднаш)
+            panorama_smer (str): 'horizontal' или 'vertical'
+            broj_sliki (int): Вкупен број слики за приказ на напредокот (ако е познат)
+        """
+        if broj_sliki is None and hasattr(sliki, '__len__'):
+            broj_sliki = len(sliki)
+        od_vkupno = f"/{broj_sliki}" if broj_sliki else ""
+
+        print(f"Започнувам креирање на {panorama_smer} панорама"
+              + (f" од {broj_sliki} слики..." if broj_sliki else "..."))
+
+        # Клучните точки на следните слики се детектираат однапред;
+        # складиштето не ги користи минијатурите
+        sliki = self.so_karakteristiki_odnapred(sliki, minijaturi=not self.posledni_k_sliki)
 
         # Започни со првата слика
-        panorama = sliki[0]
+        panorama = next(sliki)
+
+        # Деловите од платното покриени со слики, како конвексни полигони
+        poligoni = [poligon_na_slika(*panorama.shape[:2])]
+
+        # Клучните точки од поставените слики се чуваат во координатите на панорамата,
+        # па новата слика не бара SIFT врз целата панорама
+        skladiste = None
+        if self.posledni_k_sliki:
+            skladiste = MosaicFeatureStore(self.posledni_k_sliki)
+            karakteristiki = self.najdi_karakteristiki(panorama, self.udel_na_preklop)
+            skladiste.dodadi(karakteristiki.xy, karakteristiki.deskriptori, np.eye(3))
 
         # Додавај ги останатите слики
-        for i in range(1, len(sliki)):
+        for i, slika in enumerate(sliki, start=1):
             print(f"\n{'='*60}")
-            print(f"СПОЈУВАЊЕ НА СЛИКА {i+1}/{len(sliki)}")
+            print(f"СПОЈУВАЊЕ НА СЛИКА {i+1}{od_vkupno}")
             print(f"{'='*60}")
 
             # Провери дали следната слика преклопува со тековната панорама
-            preklop_procent, broj_sovpadanja = self.proveri_dali_ima_preklop(panorama, sliki[i])
+            if skladiste is not None:
+                par = self.registriraj_so_skladiste(skladiste, slika)
+            else:
+                par = self.registriraj_par(panorama, slika)
+            preklop_procent, broj_sovpadanja = self.proveri_dali_ima_preklop(panorama, slika, par)
 
             print(f"Преклоп со панорамата: {preklop_procent:.1%} ({broj_sovpadanja} совпаѓања)")
 
+            nov_panorama = None
             if preklop_procent >= self.min_preklop_za_spojuvanje and broj_sovpadanja >= self.min_sovpadanja:
                 print(f"Има преклоп. Обид за спојување со хомографија ({panorama_smer})...")
-                nov_panorama = self.spoji_so_homografija(panorama, sliki[i], panorama_smer)
+                nov_panorama, transformacija_panorama, transformacija_nova = self._spoji_so_homografija(
+                    panorama, slika, panorama_smer, par
+                )
 
                 if nov_panorama is not None:
-                    panorama = nov_panorama
                     print(f"✅ Успешно споена слика {i+1} со хомографија ({panorama_smer})")
                 else:
                     print(f"❌ Хомографија не успеа за слика {i+1}. Користам едноставно спојување ({panorama_smer})...")
-                    # ЗА ВЕРТИКАЛНИ ПАНОРАМИ: Одреди дали новата слика треба да биде на врвот
-                    if panorama_smer == 'vertical':
-                        stack_new_on_top = self.odredi_vertikalna_nasoka(panorama, sliki[i])
-                        panorama = self.spoji_edno_do_drugo(panorama, sliki[i], panorama_smer, stack_new_on_top)
-                    else:
-                        panorama = self.spoji_edno_do_drugo(panorama, sliki[i], panorama_smer)
             else:
                 print(f"⚠️ Нема доволно преклоп за слика {i+1}. Користам едноставно спојување ({panorama_smer})...")
+
+            if nov_panorama is None:
+                self.broj_ednostavni_spojuvanja += 1
                 # ЗА ВЕРТИКАЛНИ ПАНОРАМИ: Одреди дали новата слика треба да биде на врвот
+                stack_new_on_top = False
                 if panorama_smer == 'vertical':
-                    stack_new_on_top = self.odredi_vertikalna_nasoka(panorama, sliki[i])
-                    panorama = self.spoji_edno_do_drugo(panorama, sliki[i], panorama_smer, stack_new_on_top)
-                else:
-                    panorama = self.spoji_edno_do_drugo(panorama, sliki[i], panorama_smer)
+                    stack_new_on_top = self.odredi_vertikalna_nasoka(panorama, slika, par)
+                nov_panorama, transformacija_panorama, transformacija_nova = self._spoji_edno_do_drugo(
+                    panorama, slika, panorama_smer, stack_new_on_top
+                )
+
+            # Полигоните се поместуваат заедно со панорамата; сечењето на платното
+            # (при спојување едно до друго) ги сече и нив. Панорамата се запишува
+            # преку новата слика, па од неа останува само делот надвор од
+            # правоаголникот на панорамата
+            visina, sirina = nov_panorama.shape[:2]
+            x, y = transformacija_panorama[0, 2], transformacija_panorama[1, 2]
+            pravoagolnik = (x, y, x + panorama.shape[1], y + panorama.shape[0])
+            poligoni = iseci_poligoni(
+                [transformiraj_tocki(poligon, transformacija_panorama) for poligon in poligoni], visina, sirina
+            ) + poligon_bez_pravoagolnik(
+                poligon_na_slika(*slika.shape[:2], transformacija_nova), pravoagolnik, visina, sirina
+            )
+
+            panorama = nov_panorama
+
+            if skladiste is not None:
+                skladiste.transformiraj(transformacija_panorama)
+                # Истите клучни точки (со истата ширина на рабовите) како при регистрацијата
+                karakteristiki = self.najdi_karakteristiki(slika, par.udel_na_preklop)
+                skladiste.dodadi(karakteristiki.xy, karakteristiki.deskriptori, transformacija_nova)
 
         # Исечи ја црната рамка
-        panorama = self.iseci_crna_ramka(panorama)
+        panorama = self.iseci_validen_region(panorama, poligoni)
 
         print("\n" + "="*60)
         print(f"✅ {panorama_smer.upper()} ПАНОРАМАТА Е УСПЕШНО КРЕИРАНА!")
         print("="*60)
 
-        return panorama
\ No newline at end of file
+        return panorama
+
+    def napravi_panorama_edno_do_drugo(self, sliki, panorama_smer):
+        """
+        Слики без преклоп: нанижи ги една до друга во едно платно, без регистрација
+
+        Првото поминување ги собира само димензиите, второто ја копира секоја
+        слика директно на нејзиното место во платното.
+        """
+        print(f"Спојување на сликите една до друга ({panorama_smer}), без регистрација...")
+
+        dimenzii = [slika.shape[:2] for slika in sliki]
+        panorama, _, poligoni = self._spoji_site_edno_do_drugo(sliki, panorama_smer, dimenzii=dimenzii)
+        self.broj_ednostavni_spojuvanja = len(dimenzii) - 1
+
+        panorama = self.iseci_validen_region(panorama, poligoni)
+
+        print("\n" + "="*60)
+        print(f"✅ {panorama_smer.upper()} ПАНОРАМАТА Е УСПЕШНО КРЕИРАНА (една до друга)!")
+        print("="*60)
+
+        return panorama
+
+    def presmetaj_relativna_homografija(self, slika1, slika2, smer):
+        """
+        Хомографија што ја пресликува slika2 во координатите на slika1
+
+        Ако нема доволно преклоп или хомографијата не успее, се користи
+        транслација што ги става сликите една до друга.
+        """
+        par = self.registriraj_par(slika1, slika2)
+        preklop_procent, broj_sovpadanja = self.proveri_dali_ima_preklop(slika1, slika2, par)
+
+        print(f"Преклоп: {preklop_procent:.1%} ({broj_sovpadanja} совпаѓања)")
+
+        if preklop_procent >= self.min_preklop_za_spojuvanje and broj_sovpadanja >= self.min_sovpadanja:
+            homografija, _ = self.presmetaj_homografija_za_par(par)
+            if homografija is not None:
+                return homografija
+
+            print(f"Хомографија не успеа. Користам едноставно спојување ({smer})...")
+
+        self.broj_ednostavni_spojuvanja += 1
+
+        visina1, sirina1 = slika1.shape[:2]
+        visina2, sirina2 = slika2.shape[:2]
+
+        if smer == 'vertical':
+            na_vrv = self.odredi_vertikalna_nasoka(slika1, slika2, par)
+            tx = (sirina1 - sirina2) / 2
+            ty = -visina2 if na_vrv else visina1
+        else:
+            tx = sirina1
+            ty = (visina1 - visina2) / 2
+
+        return translaciona_matrica(tx, ty)
+
+    def napravi_panorama_globalno(self, sliki, panorama_smer):
+        """
+        Глобална регистрација: секоја слика се регистрира со соседната,
+        хомографиите се поврзуваат во заеднички координатен систем
+        и сите слики се компонираат еднаш на крајот
+        """
+        print(f"Започнувам глобална регистрација на {panorama_smer} панорама...")
+
+        # Прво поминување: регистрација на соседните слики. sliki е веќе листа
+        # (види napravi_panorama), бидејќи второто поминување ги црта истите слики
+        relativni = []
+        dimenzii = []
+        prethodna = None
+        for i, slika in enumerate(self.so_karakteristiki_odnapred(sliki)):
+            dimenzii.append(slika.shape[:2])
+            if prethodna is not None:
+                print(f"\nРегистрација на слика {i+1} со слика {i}")
+                relativni.append(self.presmetaj_relativna_homografija(prethodna, slika, panorama_smer))
+            prethodna = slika
+        prethodna = None
+
+        # Средната слика е референтна за да се намали перспективното развлекување
+        referentna = len(dimenzii) // 2
+        homografii = nadovrzi_homografii(relativni, referentna)
+
+        translacija, nova_sirina, nova_visina = presmetaj_platno(dimenzii, homografii)
+
+        if self._platno_e_preveliko(nova_sirina, nova_visina):
+            print("Резултатот би бил преголем. Користам инкрементално спојување...")
+            # Инкременталното спојување ги брои своите прости спојувања одново
+            self.broj_ednostavni_spojuvanja = 0
+            return self.napravi_panorama_inkrementalno(sliki, panorama_smer)
+
+        print(f"Компонирање на {len(dimenzii)} слики во платно {nova_sirina}x{nova_visina}...")
+        panorama = self._napravi_platno((nova_visina, nova_sirina, 3))
+
+        # Второ поминување: поранешните слики остануваат над подоцнежните, исто како
+        # кај инкременталното спојување, затоа секоја слика се црта само каде
+        # што платното е уште празно
+        pokrienost = self._napravi_platno((nova_visina, nova_sirina), bool)
+        for slika, homografija in zip(sliki, homografii):
+            self._iscrtaj_vo_platno(panorama, slika, translacija.dot(homografija), pokrienost)
+
+        poligoni = iseci_poligoni([
+            poligon_na_slika(visina, sirina, translacija.dot(homografija))
+            for (visina, sirina), homografija in zip(dimenzii, homografii)
+        ], nova_visina, nova_sirina)
+        panorama = self.iseci_validen_region(panorama, poligoni)
+
+        print("\n" + "="*60)
+        print(f"✅ {panorama_smer.upper()} ПАНОРАМАТА Е УСПЕШНО КРЕИРАНА (глобална регистрација)!")
+        print("="*60)
+
+        return panorama
+
+    def parametri_za_manifest(self):
+        """
+        Параметрите од кои зависат регистрацијата и исечувањето; манифест направен
+        со други параметри не смее повторно да се користи
+        """
+        return {
+            'detektor': self.ime_na_detektor,
+            'broj_na_kliucevi': self.broj_na_kliucevi,
+            'matcher': self.ime_na_matcher,
+            'minijatura': self.minijatura,
+            'udel_na_preklop': self.udel_na_preklop,
+            'smer': self.smer,
+            'isecuvanje': self.isecuvanje,
+            'model_na_dvizenje': self.model_na_dvizenje,
+        }
+
+    def azuriraj_panorama(self, hesovi, vcitaj, manifest=None, stara_panorama=None):
+        """
+        Глобална регистрација што ги користи регистрациите од претходно извршување
+
+        Релативната хомографија на секој пар соседни слики се зема од манифестот ако
+        истиот пар (по хеш) веќе бил регистриран, па повторно се регистрираат само
+        паровите со нова или променета слика. Референтната слика од манифестот се
+        задржува, за старите слики да останат на истото место. Ако новите слики се
+        само додадени на крајот, stara_panorama (претходниот резултат) се копира во
+        поголемото платно и се трансформираат само новите слики; инаку се компонираат
+        сите. Сликите се вчитуваат само кога се потребни.
+
+        Args:
+            hesovi (list): Хеш на секоја слика, по редослед
+            vcitaj (callable): vcitaj(i) ја враќа сликата i на работна резолуција
+            manifest (dict): Манифестот од претходното извршување (или None)
+            stara_panorama (numpy.ndarray): Резултатот опишан во манифестот (или None)
+
+        Returns:
+            tuple: (panorama, nov_manifest); (None, None) ако платното е преголемо
+        """
+        if len(hesovi) < 2:
+            print("Потребни се најмалку 2 слики за панорама")
+            return None, None
+
+        if manifest is not None and manifest.get('parametri') != self.parametri_za_manifest():
+            print("Параметрите се променети од претходното извршување. Регистрирам сè одново...")
+            manifest = None
+
+        stari = manifest['delovi'] if manifest is not None else []
+        stari_hesovi = [d['hesh'] for d in stari]
+        stari_parovi = {
+            (stari_hesovi[i - 1], stari_hesovi[i]): np.array(stari[i]['relativna'])
+            for i in range(1, len(stari))
+        }
+        dimenzii_po_hesh = {d['hesh']: tuple(d['oblik']) for d in stari}
+
+        # Последните вчитани слики, за сликата да не се декодира за секој пар посебно
+        vcitani = OrderedDict()
+
+        def zemi(i):
+            if i not in vcitani:
+                slika = vcitaj(i)
+                if slika is None:
+                    raise ValueError(f"Сликата {i + 1} не може да се вчита")
+                vcitani[i] = slika
+                dimenzii_po_hesh[hesovi[i]] = slika.shape[:2]
+                while len(vcitani) > 2:
+                    vcitani.popitem(last=False)
+            return vcitani[i]
+
+        self.broj_ednostavni_spojuvanja = 0
+        if stari_hesovi[:2] == hesovi[:2]:
+            panorama_smer = manifest['smer']
+        else:
+            self.smer_na_rabovi = None if self.smer == 'auto' else self.smer
+            prvi_dve = [zemi(0), zemi(1)]
+            panorama_smer = self._odredi_smer_na_panorama(prvi_dve)
+        self.smer_na_rabovi = panorama_smer
+
+        relativni = []
+        for i in range(1, len(hesovi)):
+            par = (hesovi[i - 1], hesovi[i])
+            if par in stari_parovi:
+                relativni.append(stari_parovi[par])
+                self.statistika.dodadi('povtorno_iskoristeni_parovi')
+                continue
+            print(f"\nРегистрација на слика {i+1} со слика {i}")
+            relativni.append(self.presmetaj_relativna_homografija(zemi(i - 1), zemi(i), panorama_smer))
+        dimenzii = [dimenzii_po_hesh[hesh] for hesh in hesovi]
+
+        # Старата референтна слика останува референтна, инаку средната
+        referentna = len(hesovi) // 2
+        if manifest is not None and manifest['referentna'] < len(stari_hesovi) and \
+                stari_hesovi[manifest['referentna']] in hesovi:
+            referentna = hesovi.index(stari_hesovi[manifest['referentna']])
+        homografii = nadovrzi_homografii(relativni, referentna)
+
+        translacija, nova_sirina, nova_visina = presmetaj_platno(dimenzii, homografii)
+        if self._platno_e_preveliko(nova_sirina, nova_visina):
+            print("Резултатот би бил преголем.")
+            return None, None
+
+        panorama = self._napravi_platno((nova_visina, nova_sirina, 3))
+        pokrienost = self._napravi_platno((nova_visina, nova_sirina), bool)
+        poligoni = [
+            poligon_na_slika(visina, sirina, translacija.dot(homografija))
+            for (visina, sirina), homografija in zip(dimenzii, homografii)
+        ]
+
+        # Само додадени слики: старите се на истото место во рамката, па стариот
+        # резултат се копира, а се цртаат само новите (под старите, како во napravi_panorama_globalno)
+        prvi_nov = 0
+        if stara_panorama is not None and stari and hesovi[:len(stari)] == stari_hesovi and \
+                self.isecuvanje == 'opfat' and list(stara_panorama.shape[:2]) == manifest['rezultat']['oblik']:
+            fx, fy = manifest['rezultat']['pocetok']
+            x0, y0 = int(fx + translacija[0, 2]), int(fy + translacija[1, 2])
+            x1, y1 = min(nova_sirina, x0 + stara_panorama.shape[1]), min(nova_visina, y0 + stara_panorama.shape[0])
+            x0c, y0c = max(0, x0), max(0, y0)
+            with self.statistika.etapa('kompozicija'):
+                panorama[y0c:y1, x0c:x1] = stara_panorama[y0c - y0:y1 - y0, x0c - x0:x1 - x0]
+
+                maska = self._napravi_platno((nova_visina, nova_sirina))
+                for poligon in poligoni[:len(stari)]:
+                    cv2.fillConvexPoly(maska, np.round(poligon).astype(np.int32), 1)
+                pokrienost[y0c:y1, x0c:x1] = maska[y0c:y1, x0c:x1] > 0
+            prvi_nov = len(stari)
+            print(f"Претходната панорама е зачувана; се додаваат {len(hesovi) - prvi_nov} нови слики")
+
+        for i in range(prvi_nov, len(hesovi)):
+            self._iscrtaj_vo_platno(panorama, zemi(i), translacija.dot(homografii[i]), pokrienost)
+
+        poligoni = iseci_poligoni(poligoni, nova_visina, nova_sirina)
+        pravoagolnik = self._pravoagolnik_za_isecuvanje(poligoni, nova_visina, nova_sirina) \
+            or (0, 0, nova_sirina, nova_visina)
+        x, y, w, h = pravoagolnik
+        panorama = panorama[y:y+h, x:x+w]
+
+        nov_manifest = {
+            'parametri': self.parametri_za_manifest(),
+            'smer': panorama_smer,
+            'referentna': referentna,
+            'delovi': [
+                {
+                    'hesh': hesh,
+                    'oblik': list(oblik),
+                    'relativna': relativni[i - 1].tolist() if i > 0 else None,
+                    'homografija': homografija.tolist(),
+                }
+                for i, (hesh, oblik, homografija) in enumerate(zip(hesovi, dimenzii, homografii))
+            ],
+            # Координатите во референтната рамка на горниот лев пиксел од резултатот
+            'rezultat': {
+                'oblik': [h, w],
+                'pocetok': [int(x - translacija[0, 2]), int(y - translacija[1, 2])],
+            },
+        }
+        return panorama, nov_manifest
+
+    def _iscrtaj_vo_platno(self, platno, slika, homografija, pokrienost=None):
+        """
+        Трансформирај ја сликата во платното плочка по плочка (види iscrtaj_vo_plocki)
+
+        Ако е дадена pokrienost (bool маска на платното), се запишуваат само
+        празните пиксели и маската се ажурира.
+        """
+        with self.statistika.etapa('transformacija'):
+            iscrtaj_vo_plocki(
+                platno, slika, homografija, pokrienost,
+                golemina_na_plocka=self.golemina_na_plocka, broj_rabotnici=self.broj_rabotnici
+            )
+
+    def _napravi_platno(self, oblik, dtype=np.uint8):
+        """
+        Празно платно, во RAM или во privremen_direktorium (види napravi_platno)
+        """
+        platno = napravi_platno(oblik, dtype, self.privremen_direktorium)
+        self.statistika.dodadi('alocirani_bajti', platno.nbytes)
+        return platno
+
+    def _platno_e_preveliko(self, sirina, visina):
+        """
+        Дали платното ја надминува дозволената површина (maks_megapikseli)
+        """
+        return sirina * visina > self.maks_megapikseli * 1e6
@@ -1,6 +1,7 @@
 import cv2
 import numpy as np
 import os
+from contextlib import contextmanager, redirect_stdout
 
 def pokazi_slika(slika, naslov='Слика'):
     """
@@ -13,9 +14,14 @@ def pokazi_slika(slika, naslov='Слика'):
 def zacuvaj_slika(slika, patistina):
     """
     Зачувај слика на дадена патека
+
+    Сликата (и np.memmap платно или исечок од него) се предава директно на
+    енкодерот, без копија во RAM.
     """
     try:
-        cv2.imwrite(patistina, slika)
+        if not cv2.imwrite(patistina, slika):
+            print(f"❌ Грешка при зачувување на сликата {patistina}: енкодерот не успеа")
+            return False
         print(f"✅ Сликата е зачувана како: {patistina}")
         return True
     except Exception as e:
@@ -26,4 +32,34 @@ def pretvori_vo_sivo(slika):
     """
     Претвори слика во сива боја
     """
-    return cv2.cvtColor(slika, cv2.COLOR_BGR2GRAY)
\ No newline at end of file
+    return cv2.cvtColor(slika, cv2.COLOR_BGR2GRAY)
+
+def broj_na_procesori():
+    """
+    Колку процесори се достапни за овој процес (ги почитува ограничувањата на контејнерот)
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+@contextmanager
+def ogranici_niski_na_opencv(broj_niski):
+    """
+    Привремено ограничи го бројот на внатрешни нишки на OpenCV
+
+    cv2.setNumThreads важи за целиот процес, па претходната вредност се враќа на крајот.
+    """
+    prethodni = cv2.getNumThreads()
+    cv2.setNumThreads(max(1, broj_niski))
+    try:
+        yield
+    finally:
+        cv2.setNumThreads(prethodni)
+
+@contextmanager
+def bez_ispis():
+    """
+    Привремено фрли го сè што се печати (print) во os.devnull
+    """
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        yield
@@ -0,0 +1,243 @@
+import math
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from src.registration import transformiraj_agli, translaciona_matrica
+from src.utils import ogranici_niski_na_opencv
+
+# Колку пиксели од изворната слика се земаат повеќе околу секоја плочка,
+# за интерполацијата на рабовите на плочката да ги има соседите
+MARGINA_NA_IZVOR = 2
+
+
+def napravi_platno(oblik, dtype=np.uint8, direktorium=None):
+    """
+    Празно (нулто) платно во RAM или, ако е даден direktorium, во np.memmap фајл таму
+
+    Фајлот е без име (TemporaryFile) и оперативниот систем го брише кога платното
+    ќе се ослободи. Содржината на memmap платното ја чува оперативниот систем
+    на дискот, па панорамата може да биде поголема од RAM меморијата.
+
+    Args:
+        oblik (tuple): Облик на платното, на пр. (visina, sirina, 3)
+        dtype: Тип на пикселите
+        direktorium (str): Директориум за привремениот фајл (None = во RAM)
+    """
+    if direktorium is None:
+        return np.zeros(oblik, dtype=dtype)
+
+    with tempfile.TemporaryFile(dir=direktorium) as fajl:
+        # mmap го задржува мапирањето и откако фајлот ќе се затвори
+        return np.memmap(fajl, dtype=dtype, mode='w+', shape=oblik)
+
+
+def opfat_na_sodrzina(slika, prag=10, visina_na_pojas=1024):
+    """
+    Најмал правоаголник што ги содржи сите пиксели посветли од прагот
+
+    Сликата се минува во хоризонтални појаси, па во меморијата е само еден
+    појас во сиви тонови, а не цела копија од (можеби memmap) платното.
+
+    Returns:
+        tuple: (x, y, sirina, visina) или None ако нема таков пиксел
+    """
+    visina, sirina = slika.shape[:2]
+    redovi = np.zeros(visina, dtype=bool)
+    koloni = np.zeros(sirina, dtype=bool)
+
+    for y in range(0, visina, visina_na_pojas):
+        pojas = slika[y:y + visina_na_pojas]
+        if pojas.ndim == 3:
+            pojas = cv2.cvtColor(pojas, cv2.COLOR_BGR2GRAY)
+        svetli = pojas > prag
+        redovi[y:y + visina_na_pojas] = svetli.any(axis=1)
+        koloni |= svetli.any(axis=0)
+
+    if not redovi.any():
+        return None
+
+    y0, y1 = np.flatnonzero(redovi)[[0, -1]]
+    x0, x1 = np.flatnonzero(koloni)[[0, -1]]
+    return int(x0), int(y0), int(x1 - x0 + 1), int(y1 - y0 + 1)
+
+
+def podeli_na_plocki(x0, y0, x1, y1, golemina):
+    """
+    Подели го правоаголникот [x0, x1) x [y0, y1) на плочки со најголема страна golemina
+
+    Returns:
+        list: Плочки (x0, y0, x1, y1)
+    """
+    return [
+        (tx, ty, min(tx + golemina, x1), min(ty + golemina, y1))
+        for ty in range(y0, y1, golemina)
+        for tx in range(x0, x1, golemina)
+    ]
+
+
+def izvoren_region_za_plocka(plocka, inverzna, visina, sirina):
+    """
+    Кој дел од изворната слика паѓа во дадена плочка од платното
+
+    Аглите на плочката се враќаат во изворната слика со инверзната хомографија;
+    проективното пресликување на правоаголник е конвексен четириаголник, па неговиот
+    опфат ги содржи сите пиксели на плочката.
+
+    Returns:
+        tuple: (x0, y0, x1, y1) во изворната слика или None ако плочката не ја допира сликата
+    """
+    x0, y0, x1, y1 = plocka
+    agli = np.array([[x0, y0, 1], [x1, y0, 1], [x1, y1, 1], [x0, y1, 1]], dtype=np.float64)
+    homogeni = agli.dot(inverzna.T)
+
+    # Плочката ја сече линијата на бесконечност: земи ја целата слика
+    if np.any(homogeni[:, 2] <= 1e-12):
+        return 0, 0, sirina, visina
+
+    tocki = homogeni[:, :2] / homogeni[:, 2:]
+    sx0 = max(0, int(math.floor(tocki[:, 0].min())) - MARGINA_NA_IZVOR)
+    sy0 = max(0, int(math.floor(tocki[:, 1].min())) - MARGINA_NA_IZVOR)
+    sx1 = min(sirina, int(math.ceil(tocki[:, 0].max())) + MARGINA_NA_IZVOR + 1)
+    sy1 = min(visina, int(math.ceil(tocki[:, 1].max())) + MARGINA_NA_IZVOR + 1)
+
+    if sx1 <= sx0 or sy1 <= sy0:
+        return None
+    return sx0, sy0, sx1, sy1
+
+
+def iscrtaj_plocka(platno, slika, homografija, inverzna, plocka, pokrienost=None):
+    """
+    Трансформирај го само делот од сликата што паѓа во плочката и запиши го во платното
+
+    Плочките не се преклопуваат, па повеќе плочки може да се цртаат истовремено.
+    Без pokrienost плочката се запишува цела, исто како warpPerspective врз
+    празно платно (и делумно покриените пиксели на работ на сликата).
+    """
+    visina, sirina = slika.shape[:2]
+    izvor = izvoren_region_za_plocka(plocka, inverzna, visina, sirina)
+    if izvor is None:
+        return
+
+    x0, y0, x1, y1 = plocka
+    sx0, sy0, sx1, sy1 = izvor
+    lokalna = translaciona_matrica(-x0, -y0).dot(homografija).dot(translaciona_matrica(sx0, sy0))
+    golemina = (x1 - x0, y1 - y0)
+
+    isecok = slika[sy0:sy1, sx0:sx1]
+    region = platno[y0:y1, x0:x1]
+
+    if pokrienost is None:
+        region[...] = cv2.warpPerspective(isecok, lokalna, golemina)
+        return
+
+    transformirana = cv2.warpPerspective(isecok, lokalna, golemina)
+    maska = cv2.warpPerspective(
+        np.full(isecok.shape[:2], 255, dtype=np.uint8), lokalna, golemina, flags=cv2.INTER_NEAREST
+    )
+
+    nova = maska > 0
+    region_pokrienost = pokrienost[y0:y1, x0:x1]
+    nova &= ~region_pokrienost
+    region_pokrienost |= nova
+
+    region[nova] = transformirana[nova]
+
+
+def cisto_pomestuvanje(homografija, tolerancija=1e-9):
+    """
+    (tx, ty) ако хомографијата е само поместување, инаку None
+    """
+    homografija = np.asarray(homografija, dtype=np.float64)
+    if np.abs(homografija[:2, :2] - np.eye(2)).max() > tolerancija:
+        return None
+    if np.abs(homografija[2] - [0, 0, 1]).max() > tolerancija:
+        return None
+    return homografija[0, 2], homografija[1, 2]
+
+
+def postavi_so_pomestuvanje(platno, slika, tx, ty, pokrienost=None):
+    """
+    Запиши ја сликата во платното поместена за (tx, ty), само со сечење на низите
+
+    Поместувањето се заокружува на цел пиксел, па нема интерполација (ни
+    замачкување) и сликата се копира директно, без warpPerspective.
+    Со pokrienost се пишува само во празните пиксели и маската се ажурира.
+    """
+    x0, y0 = int(round(tx)), int(round(ty))
+    visina, sirina = slika.shape[:2]
+
+    px0, py0 = max(0, x0), max(0, y0)
+    px1, py1 = min(platno.shape[1], x0 + sirina), min(platno.shape[0], y0 + visina)
+    if px1 <= px0 or py1 <= py0:
+        return
+
+    isecok = slika[py0 - y0:py1 - y0, px0 - x0:px1 - x0]
+    region = platno[py0:py1, px0:px1]
+
+    if pokrienost is None:
+        region[...] = isecok
+        return
+
+    # copyto со where е многукратно побрзо од индексирање со bool маска
+    region_pokrienost = pokrienost[py0:py1, px0:px1]
+    nova = ~region_pokrienost
+    if isecok.ndim == 3:
+        nova = nova[..., None]
+    np.copyto(region, isecok, where=nova)
+    region_pokrienost[...] = True
+
+
+def iscrtaj_vo_plocki(platno, slika, homografija, pokrienost=None, golemina_na_plocka=1024, broj_rabotnici=1):
+    """
+    Трансформирај ја сликата во платното плочка по плочка
+
+    Се обработуваат само плочките во опфатот на трансформираните агли, а за секоја
+    плочка само изворните пиксели што паѓаат во неа, па привремената меморија е
+    една плочка по нишка, без разлика колку е големо платното. warpPerspective го
+    ослободува GIL, па плочките се цртаат паралелно. Чисто поместување
+    се запишува со postavi_so_pomestuvanje, без плочки.
+
+    Args:
+        platno (numpy.ndarray): Излезно платно (се менува на место)
+        slika (numpy.ndarray): Изворна слика
+        homografija (numpy.ndarray): 3x3 трансформација од сликата во платното
+        pokrienost (numpy.ndarray): bool маска на платното; ако е дадена, се пишува
+                                    само во празните пиксели и маската се ажурира
+        golemina_na_plocka (int): Страна на плочката во пиксели
+        broj_rabotnici (int): Број на нишки (1 = по ред)
+    """
+    pomestuvanje = cisto_pomestuvanje(homografija)
+    if pomestuvanje is not None:
+        postavi_so_pomestuvanje(platno, slika, *pomestuvanje, pokrienost)
+        return
+
+    visina, sirina = slika.shape[:2]
+    agli = transformiraj_agli(visina, sirina, homografija).reshape(-1, 2)
+
+    x0 = max(0, int(math.floor(agli[:, 0].min())))
+    y0 = max(0, int(math.floor(agli[:, 1].min())))
+    x1 = min(platno.shape[1], int(math.ceil(agli[:, 0].max())))
+    y1 = min(platno.shape[0], int(math.ceil(agli[:, 1].max())))
+
+    if x1 <= x0 or y1 <= y0:
+        return
+
+    inverzna = np.linalg.inv(homografija)
+    plocki = podeli_na_plocki(x0, y0, x1, y1, golemina_na_plocka)
+
+    if broj_rabotnici <= 1 or len(plocki) == 1:
+        for plocka in plocki:
+            iscrtaj_plocka(platno, slika, homografija, inverzna, plocka, pokrienost)
+        return
+
+    broj_rabotnici = min(broj_rabotnici, len(plocki))
+    with ogranici_niski_na_opencv(cv2.getNumThreads() // broj_rabotnici), \
+            ThreadPoolExecutor(max_workers=broj_rabotnici) as izvrsitel:
+        # list() ги пренесува исклучоците од нишките
+        list(izvrsitel.map(
+            lambda plocka: iscrtaj_plocka(platno, slika, homografija, inverzna, plocka, pokrienost),
+            plocki
+        ))
@@ -2,12 +2,48 @@ import unittest
 import numpy as np
 import cv2
 import tempfile
+import tracemalloc
 import os
+import json
 
 # Импортирај ги модулите за тестирање
-from src.image_loader import vcitaj_sliki, promeni_golemina_na_slikite  # <-- CHANGED HERE
+from src.image_loader import vcitaj_sliki, promeni_golemina_na_slikite, procitaj_dimenzii, TokNaSliki  # <-- CHANGED HERE
 from src.stitcher import PanoramaStitcher
-from src.utils import zacuvaj_slika
+from src.utils import ogranici_niski_na_opencv, zacuvaj_slika
+from main import obraboti_folderi_paralelno, obraboti_panorama_folder
+from examples.create_example import sozdadi_sekvenca
+from benchmarks.merenje_na_performansi import (
+    SINTETICKI_PREKLOP, napravi_slucai, razliki_vo_podesuvanjata, slicnost, sporedi_so_osnova
+)
+from benchmarks.sporedba_na_preseti import razumna_golemina
+from src.feature_cache import DiskFeatureCache, FeatureCache, presmetaj_kluc_na_slika
+from src.instrumentation import Statistika
+from src.features import DETEKTORI, PRESETI, Karakteristiki
+from src.matching import napravi_matcher, primeni_test_na_odnos
+from src.warping import (
+    cisto_pomestuvanje, iscrtaj_vo_plocki, napravi_platno, opfat_na_sodrzina, podeli_na_plocki, postavi_so_pomestuvanje
+)
+from src.registration import (
+    MosaicFeatureStore, nadovrzi_homografii, namali_slika, presmetaj_regioni_na_preklop,
+    presmetaj_regioni_na_rabovi, rasporedi_edno_do_drugo, skaliraj_homografija, transformiraj_agli, translaciona_matrica,
+    iseci_poligoni, najgolem_pravoagolnik_vo_maska, opfat_na_poligoni, poligon_bez_pravoagolnik, poligon_na_slika,
+    proceni_pomestuvanje
+)
+
+def napravi_teksturirani_delovi(broj_delovi=3, sirina_na_del=200, pomestuvanje=120, visina=150, zrno=1):
+    """Исечи хоризонтални делови со преклоп од една текстурирана слика"""
+    rng = np.random.RandomState(7)
+    sirina = sirina_na_del + pomestuvanje * (broj_delovi - 1)
+    if zrno > 1:
+        # Покрупна текстура што ги задржува деталите и на минијатури
+        golema_slika = rng.randint(0, 255, (visina // zrno, sirina // zrno, 3)).astype(np.uint8)
+        golema_slika = cv2.resize(golema_slika, (sirina, visina), interpolation=cv2.INTER_CUBIC)
+    else:
+        golema_slika = rng.randint(0, 255, (visina, sirina, 3)).astype(np.uint8)
+        golema_slika = cv2.GaussianBlur(golema_slika, (5, 5), 0)
+
+    return [golema_slika[:, i * pomestuvanje:i * pomestuvanje + sirina_na_del].copy()
+            for i in range(broj_delovi)]
 
 class TestPanoramaStitcher(unittest.TestCase):
     """Тестови за PanoramaStitcher класата"""
@@ -58,6 +94,1213 @@ class TestPanoramaStitcher(unittest.TestCase):
         isecena = self.stitcher.iseci_crna_ramka(slika)
         self.assertEqual(isecena.shape, (100, 100, 3))
 
+class TestPairRegistration(unittest.TestCase):
+    """Тестови за регистрацијата на парови слики"""
+
+    def test_sovpagjanje_ednash_po_par(self):
+        """Тестирај дека совпаѓањата за пар се пресметуваат само еднаш"""
+        slika1, slika2 = napravi_teksturirani_delovi(broj_delovi=2)
+        stitcher = PanoramaStitcher()
+
+        povici = []
+        originalna = stitcher.najdi_sovpadanja
+        stitcher.najdi_sovpadanja = lambda d1, d2: povici.append(1) or originalna(d1, d2)
+
+        rezultat = stitcher.spoji_dve_sliki(slika1, slika2)
+
+        self.assertIsNotNone(rezultat)
+        self.assertEqual(len(povici), 1)
+
+    def test_homografija_se_chuva_vo_parot(self):
+        """Тестирај дека хомографијата се пресметува еднаш и се чува"""
+        slika1, slika2 = napravi_teksturirani_delovi(broj_delovi=2)
+        stitcher = PanoramaStitcher()
+
+        par = stitcher.registriraj_par(slika1, slika2)
+        self.assertIs(par, stitcher.registriraj_par(slika1, slika2))
+
+        homografija, _ = stitcher.presmetaj_homografija_za_par(par)
+        self.assertIsNotNone(homografija)
+        self.assertGreater(par.broj_inlieri, 0)
+        # Втората слика е поместена 120 пиксели надесно
+        self.assertAlmostEqual(homografija[0, 2], 120, delta=2)
+
+class TestGlobalnaRegistracija(unittest.TestCase):
+    """Тестови за глобалниот режим на регистрација"""
+
+    def test_nadovrzi_homografii(self):
+        """Тестирај поврзување на релативни транслации во заедничка рамка"""
+        pomestuvanje = np.array([[1, 0, 100], [0, 1, 0], [0, 0, 1]], dtype=np.float64)
+        homografii = nadovrzi_homografii([pomestuvanje, pomestuvanje], referentna=1)
+
+        self.assertAlmostEqual(homografii[0][0, 2], -100)
+        self.assertAlmostEqual(homografii[1][0, 2], 0)
+        self.assertAlmostEqual(homografii[2][0, 2], 100)
+
+    def test_globalna_panorama(self):
+        """Тестирај глобална панорама од три слики со преклоп"""
+        sliki = napravi_teksturirani_delovi(broj_delovi=3)
+        stitcher = PanoramaStitcher(smer='horizontal', rezim='globalen')
+
+        panorama = stitcher.napravi_panorama(sliki)
+
+        self.assertIsNotNone(panorama)
+        # 200 пиксели прва слика + 2 x 120 пиксели поместување
+        self.assertAlmostEqual(panorama.shape[1], 440, delta=6)
+
+    def test_preveliko_platno_ne_gi_broi_prostite_spojuvanja_dvapati(self):
+        """Тестирај дека при преминот во инкрементално спојување бројачот почнува од нула"""
+        rng = np.random.default_rng(0)
+        sliki = [rng.integers(0, 255, (150, 200, 3), dtype=np.uint8) for _ in range(3)]
+
+        # Сликите без преклоп се спојуваат една до друга; платното 600x150 е над 0.05 MP
+        stitcher = PanoramaStitcher(smer='horizontal', rezim='globalen', broj_rabotnici=1, maks_megapikseli=0.05)
+        panorama = stitcher.napravi_panorama(sliki)
+
+        self.assertEqual(panorama.shape[:2], (150, 600))
+        self.assertEqual(stitcher.broj_ednostavni_spojuvanja, 2)
+
+    def test_nepoznat_rezim(self):
+        """Тестирај дека непознат режим фрла грешка"""
+        with self.assertRaises(ValueError):
+            PanoramaStitcher(rezim='nepoznat')
+
+class TestGruboKonFino(unittest.TestCase):
+    """Тестови за регистрација на минијатури и доточнување во преклопот"""
+
+    def setUp(self):
+        """Подготви поголеми делови со преклоп од 240 пиксели"""
+        self.delovi = napravi_teksturirani_delovi(
+            broj_delovi=2, sirina_na_del=600, pomestuvanje=360, visina=450, zrno=4
+        )
+
+    def test_skaliraj_homografija(self):
+        """Тестирај дека транслација на минијатури се префрла во полна резолуција"""
+        slika = np.zeros((450, 600, 3), dtype=np.uint8)
+        minijatura, razmer = namali_slika(slika, 200)
+        self.assertEqual(max(minijatura.shape[:2]), 200)
+
+        homografija = skaliraj_homografija(translaciona_matrica(120, 0), razmer, razmer)
+        np.testing.assert_allclose(homografija, translaciona_matrica(360, 0), atol=1e-9)
+
+    def test_regioni_na_preklop(self):
+        """Тестирај го предвидениот преклоп за позната транслација"""
+        region1, region2 = presmetaj_regioni_na_preklop((450, 600), (450, 600), translaciona_matrica(360, 0))
+        self.assertEqual(region1, (360, 0, 600, 450))
+        self.assertEqual(region2, (0, 0, 240, 450))
+
+        self.assertEqual(
+            presmetaj_regioni_na_preklop((450, 600), (450, 600), translaciona_matrica(900, 0)), (None, None)
+        )
+
+    def test_detekcija_samo_vo_preklopot(self):
+        """Тестирај дека доточнувањето ги бара клучните точки само во преклопот"""
+        stitcher = PanoramaStitcher(smer='horizontal', minijatura=200)
+        par = stitcher.registriraj_par(*self.delovi)
+        homografija, _ = stitcher.presmetaj_homografija_za_par(par)
+
+        margina = 2 * int(np.ceil(stitcher.ransac_reproj_threshold * 3))
+        self.assertGreaterEqual(par.xy1[:, 0].min(), 360 - margina)
+        self.assertLessEqual(par.xy2[:, 0].max(), 240 + margina)
+        np.testing.assert_allclose(homografija[:2, 2], [360, 0], atol=1.0)
+
+    def test_ist_rezultat_kako_polna_rezolucija(self):
+        """Тестирај дека панорамата е иста со и без минијатури"""
+        obicna = PanoramaStitcher(smer='horizontal').napravi_panorama(self.delovi)
+        groba = PanoramaStitcher(smer='horizontal', minijatura=200).napravi_panorama(self.delovi)
+        self.assertEqual(obicna.shape, groba.shape)
+
+class TestDetekcijaVoRabovi(unittest.TestCase):
+    """Тестови за детекција само во рабовите што се преклопуваат"""
+
+    def setUp(self):
+        """Подготви делови широки 200 пиксели со преклоп од 80 пиксели"""
+        self.delovi = napravi_teksturirani_delovi()
+
+    def test_regioni_na_rabovi(self):
+        """Тестирај ги регионите на рабовите по насоката"""
+        self.assertEqual(presmetaj_regioni_na_rabovi(150, 200, 'horizontal', 0.3),
+                         [(0, 0, 60, 150), (140, 0, 200, 150)])
+        self.assertEqual(presmetaj_regioni_na_rabovi(150, 200, 'vertical', 0.2),
+                         [(0, 0, 200, 30), (0, 120, 200, 150)])
+        self.assertEqual(presmetaj_regioni_na_rabovi(150, 200, 'horizontal', 0.5), [(0, 0, 200, 150)])
+
+    def test_kliucevi_samo_vo_rabovite(self):
+        """Тестирај дека клучните точки се само во рабовите и совпаѓањата се десен-лев раб"""
+        stitcher = PanoramaStitcher(smer='horizontal', udel_na_preklop=0.45)
+        par = stitcher.registriraj_par(self.delovi[0], self.delovi[1])
+
+        x = stitcher.najdi_karakteristiki(self.delovi[0], 0.45).xy[:, 0]
+        self.assertFalse(np.any((x > 91) & (x < 109)))
+        self.assertEqual(par.udel_na_preklop, 0.45)
+        self.assertTrue(np.all(par.tocki1[:, 0] >= 109))
+        self.assertTrue(np.all(par.tocki2[:, 0] <= 91))
+
+        homografija, _ = stitcher.presmetaj_homografija_za_par(par)
+        np.testing.assert_allclose(homografija[:2, 2], [120, 0], atol=1.0)
+
+    def test_avtomatsko_prosiruvanje(self):
+        """Тестирај дека тесните рабови се прошируваат кога нема доволно совпаѓања"""
+        stitcher = PanoramaStitcher(smer='horizontal', udel_na_preklop=0.1)
+        par = stitcher.registriraj_par(self.delovi[0], self.delovi[1])
+
+        self.assertEqual(par.udel_na_preklop, 0.4)
+        self.assertGreaterEqual(par.broj_inlieri, stitcher.min_sovpadanja)
+
+    def test_panorama_so_rabovi(self):
+        """Тестирај дека панорамата е иста како со детекција врз цели слики"""
+        for rezim in ('inkrementalen', 'globalen'):
+            stitcher = PanoramaStitcher(smer='horizontal', rezim=rezim, udel_na_preklop=0.45)
+            panorama = stitcher.napravi_panorama(self.delovi)
+            self.assertAlmostEqual(panorama.shape[1], 440, delta=3)
+            self.assertEqual(stitcher.broj_ednostavni_spojuvanja, 0)
+
+    def test_nevaliden_udel(self):
+        """Тестирај дека уделот мора да биде помеѓу 0 и 1"""
+        with self.assertRaises(ValueError):
+            PanoramaStitcher(udel_na_preklop=1.5)
+
+class TestDetekcijaNaSmer(unittest.TestCase):
+    """Тестови за брзата детекција на насока со фазна корелација"""
+
+    def test_fazna_korelacija_go_naogja_pomestuvanjeto(self):
+        """Тестирај дека поместувањето е по вистинската оска и со вистинска должина"""
+        delovi, homografii, _ = sozdadi_sekvenca(1200, 450, 3, 0.3, seme=1)
+        dx, dy, odziv = proceni_pomestuvanje(delovi[0], delovi[1])
+
+        # Корелацијата е циклична: поместувањето t се добива како t или t - sirina
+        sirina = delovi[0].shape[1]
+        vistinsko = homografii[1][0, 2] - homografii[0][0, 2]
+        self.assertLess(min(abs(abs(dx) - vistinsko), abs(abs(dx) - (sirina - vistinsko))), 3)
+        self.assertLess(abs(dy), 3)
+        self.assertGreater(odziv, 0.1)
+
+    def test_brza_detekcija_bez_klucni_tocki(self):
+        """Тестирај дека насоката се наоѓа во двете оски без детекција на клучни точки"""
+        for smer in ('horizontal', 'vertical'):
+            with self.subTest(smer=smer):
+                sirina, visina = (1200, 450) if smer == 'horizontal' else (450, 1200)
+                delovi, _, _ = sozdadi_sekvenca(sirina, visina, 3, 0.3, smer, seme=2)
+                stitcher = PanoramaStitcher(broj_rabotnici=1)
+
+                self.assertEqual(stitcher.odredi_smer(delovi[0], delovi[1]), (smer, stitcher.doverba_na_smer))
+                self.assertGreaterEqual(stitcher.doverba_na_smer, stitcher.prag_na_doverba_za_smer)
+                self.assertEqual(len(stitcher.kes_na_karakteristiki), 0)
+                self.assertIn('smer', stitcher.statistika.izvestaj()['etapi'])
+
+    def test_niska_doverba_koristi_klucni_tocki(self):
+        """Тестирај дека без доминантно поместување се користат клучните точки"""
+        delovi = napravi_teksturirani_delovi()
+        stitcher = PanoramaStitcher(broj_rabotnici=1)
+
+        self.assertEqual(stitcher.odredi_smer_brzo(delovi[0], delovi[0]), ('unknown', 0.0))
+
+        stitcher.prag_na_doverba_za_smer = 1.1
+        smer, doverba = stitcher.odredi_smer(delovi[0], delovi[1])
+        self.assertLess(doverba, 1.1)
+        self.assertEqual(smer, stitcher.odredi_smer_na_preklop(delovi[0], delovi[1]))
+        self.assertGreater(len(stitcher.kes_na_karakteristiki), 0)
+
+    def test_doverba_blisku_do_pragot_se_proveruva(self):
+        """Тестирај дека доверба малку над прагот ја проверуваат клучните точки"""
+        delovi, _, _ = sozdadi_sekvenca(1200, 450, 3, 0.3, seme=2)
+        stitcher = PanoramaStitcher(broj_rabotnici=1)
+        _, doverba = stitcher.odredi_smer_brzo(delovi[0], delovi[1])
+
+        # Довербата е точно на прагот, како кај DutchHouses
+        stitcher.prag_na_doverba_za_smer = doverba
+        odgovori = iter(['vertical', 'unknown'])
+        stitcher.odredi_smer_na_preklop = lambda slika1, slika2, par=None: next(odgovori)
+
+        # Клучните точки имаат предност пред брзата проценка
+        self.assertEqual(stitcher.odredi_smer(delovi[0], delovi[1]), ('vertical', doverba))
+
+        # Без одговор од клучните точки останува брзата проценка
+        self.assertEqual(stitcher.odredi_smer(delovi[0], delovi[1]), ('horizontal', doverba))
+
+        # Над маргината клучните точки не се користат
+        stitcher.prag_na_doverba_za_smer = doverba - stitcher.margina_na_doverba_za_smer - 0.01
+        stitcher.odredi_smer_na_preklop = lambda slika1, slika2, par=None: self.fail("клучни точки")
+        self.assertEqual(stitcher.odredi_smer(delovi[0], delovi[1]), ('horizontal', doverba))
+
+class TestModelNaDvizenje(unittest.TestCase):
+    """Тестови за скалата поместување -> сличност -> хомографија"""
+
+    def registriraj(self, slika1, slika2, **parametri):
+        stitcher = PanoramaStitcher(smer='horizontal', broj_rabotnici=1, **parametri)
+        par = stitcher.registriraj_par(slika1, slika2)
+        homografija, _ = stitcher.presmetaj_homografija_za_par(par)
+        return stitcher, par, homografija
+
+    def test_cisto_pomestuvanje(self):
+        """Тестирај дека поместените делови се регистрираат само со поместување"""
+        delovi = napravi_teksturirani_delovi()
+        stitcher, par, homografija = self.registriraj(delovi[0], delovi[1])
+
+        self.assertEqual(par.model, 'translacija')
+        self.assertEqual(cisto_pomestuvanje(homografija), (homografija[0, 2], homografija[1, 2]))
+        np.testing.assert_allclose(homografija[:2, 2], [120, 0], atol=0.5)
+        self.assertEqual(stitcher.statistika.izvestaj()['broevi']['model_translacija'], 1)
+
+    def test_rotacija_e_slicnost(self):
+        """Тестирај дека ротираните делови се регистрираат со сличност, точно до пиксел"""
+        delovi, homografii, _ = sozdadi_sekvenca(1200, 450, 3, 0.45, tresenje=4, rotacija=2, seme=3)
+        _, par, homografija = self.registriraj(delovi[0], delovi[1])
+
+        self.assertEqual(par.model, 'slicnost')
+        vistinska = np.linalg.inv(homografii[0]).dot(homografii[1])
+        h, w = delovi[1].shape[:2]
+        np.testing.assert_allclose(
+            transformiraj_agli(h, w, homografija), transformiraj_agli(h, w, vistinska), atol=1.0
+        )
+
+    def test_perspektiva_e_homografija(self):
+        """Тестирај дека перспективата ескалира до целосна хомографија"""
+        slika = napravi_teksturirani_delovi(broj_delovi=1, sirina_na_del=500, visina=400, zrno=4)[0]
+        perspektiva = np.array([[1.0, 0.02, -150], [0.01, 1.0, 5], [4e-4, 1e-4, 1.0]])
+        slika2 = cv2.warpPerspective(slika, np.linalg.inv(perspektiva), (500, 400))
+
+        _, par, homografija = self.registriraj(slika, slika2)
+        self.assertEqual(par.model, 'homografija')
+
+        _, par, _ = self.registriraj(napravi_teksturirani_delovi()[0], napravi_teksturirani_delovi()[1],
+                                      model_na_dvizenje='homografija')
+        self.assertEqual(par.model, 'homografija')
+
+        with self.assertRaises(ValueError):
+            PanoramaStitcher(model_na_dvizenje='afina')
+
+    def test_postavi_so_pomestuvanje(self):
+        """Тестирај дека сечењето дава исти пиксели и покриеност како warpPerspective"""
+        slika = napravi_teksturirani_delovi(broj_delovi=1, sirina_na_del=120, visina=90)[0]
+        for tx, ty in ((30, 20), (-25, 60), (170, -40)):
+            with self.subTest(tx=tx, ty=ty):
+                homografija = translaciona_matrica(tx, ty)
+                ocekuvan = cv2.warpPerspective(slika, homografija, (250, 140))
+                maska = cv2.warpPerspective(
+                    np.full(slika.shape[:2], 255, dtype=np.uint8), homografija, (250, 140), flags=cv2.INTER_NEAREST
+                ) > 0
+
+                platno = np.zeros_like(ocekuvan)
+                pokrienost = np.zeros(platno.shape[:2], dtype=bool)
+                pokrienost[:10] = True
+                iscrtaj_vo_plocki(platno, slika, homografija, pokrienost)
+
+                np.testing.assert_array_equal(pokrienost, maska | (np.arange(140) < 10)[:, None])
+                np.testing.assert_array_equal(platno[10:], ocekuvan[10:])
+                self.assertFalse(platno[:10].any())
+
+        # Потпикселното поместување се заокружува
+        platno = np.zeros((100, 150, 3), dtype=np.uint8)
+        postavi_so_pomestuvanje(platno, slika, 10.4, 4.6)
+        np.testing.assert_array_equal(platno[5:95, 10:130], slika[:90, :120])
+        self.assertIsNone(cisto_pomestuvanje(np.array([[1, 0.01, 3], [0, 1, 4], [0, 0, 1]])))
+
+class TestMosaicFeatureStore(unittest.TestCase):
+    """Тестови за складиштето на клучни точки од панорамата"""
+
+    def test_chuva_samo_posledni_k(self):
+        """Тестирај дека се чуваат само последните K слики"""
+        skladiste = MosaicFeatureStore(posledni_k=2)
+        deskriptori = np.zeros((1, 128), dtype=np.float32)
+
+        for x in (0, 10, 20):
+            skladiste.dodadi(np.float32([[x, 0]]), deskriptori, np.eye(3))
+
+        xy, _, broj_po_slika = skladiste.aktivni()
+        np.testing.assert_allclose(xy[:, 0], [10, 20])
+        self.assertEqual(broj_po_slika, 1)
+
+    def test_transformacija_pri_postavuvanje(self):
+        """Тестирај дека точките се пренесуваат во координатите на панорамата"""
+        skladiste = MosaicFeatureStore(posledni_k=2)
+        deskriptori = np.zeros((1, 128), dtype=np.float32)
+
+        skladiste.dodadi(np.float32([[5, 5]]), deskriptori, translaciona_matrica(100, 0))
+        skladiste.transformiraj(translaciona_matrica(0, 7))
+
+        xy, _, _ = skladiste.aktivni()
+        np.testing.assert_allclose(xy, [[105, 12]])
+
+    def test_inkrementalna_panorama_so_skladiste(self):
+        """Тестирај инкрементална панорама без SIFT врз целата панорама"""
+        sliki = napravi_teksturirani_delovi(broj_delovi=3)
+        stitcher = PanoramaStitcher(smer='horizontal', posledni_k_sliki=1)
+
+        panorama = stitcher.napravi_panorama(sliki)
+
+        self.assertAlmostEqual(panorama.shape[1], 440, delta=6)
+        # SIFT се извршил само врз трите влезни слики
+        self.assertEqual(stitcher.kes_na_karakteristiki.promasuvanja, 3)
+
+    def test_flann_indeks_nad_skladisteto(self):
+        """Тестирај дека FLANN индексот над складиштето се гради еднаш за сите ширини на рабовите"""
+        sliki = napravi_teksturirani_delovi(broj_delovi=3)
+        stitcher = PanoramaStitcher(smer='horizontal', matcher='flann', udel_na_preklop=0.1, broj_rabotnici=1)
+        skladiste = MosaicFeatureStore(posledni_k=2)
+        for slika, x in zip(sliki[:2], (0, 120)):
+            karakteristiki = stitcher.najdi_karakteristiki(slika, 0.1)
+            skladiste.dodadi(karakteristiki.xy, karakteristiki.deskriptori, translaciona_matrica(x, 0))
+
+        # Истите споени дескриптори сè до следниот dodadi
+        self.assertIs(skladiste.aktivni()[1], skladiste.aktivni()[1])
+
+        par = stitcher.registriraj_so_skladiste(skladiste, sliki[2])
+        self.assertEqual(par.udel_na_preklop, 0.4)
+        self.assertEqual(stitcher.matcher.broj_izgradeni_indeksi, 1)
+
+        # Повторна регистрација врз непроменето складиште не гради нов индекс
+        stitcher.registriraj_so_skladiste(skladiste, sliki[2])
+        self.assertEqual(stitcher.matcher.broj_izgradeni_indeksi, 1)
+
+        stari = skladiste.aktivni()[1]
+        karakteristiki = stitcher.najdi_karakteristiki(sliki[2], 0.4)
+        skladiste.dodadi(karakteristiki.xy, karakteristiki.deskriptori, translaciona_matrica(240, 0))
+        self.assertIsNot(skladiste.aktivni()[1], stari)
+
+class TestKarakteristiki(unittest.TestCase):
+    """Тестови за компактното претставување на клучни точки"""
+
+    def test_od_kliucevi_i_nazad(self):
+        """Тестирај претворање од cv2.KeyPoint во низи и назад"""
+        kliucevi = [cv2.KeyPoint(1.5, 2.5, 3.0, 45.0, 0.25, 1), cv2.KeyPoint(10, 20, 4, 90, 0.5, 2)]
+        deskriptori = np.ones((2, 128), dtype=np.float32)
+
+        karakteristiki = Karakteristiki.od_kliucevi(kliucevi, deskriptori)
+
+        self.assertEqual(len(karakteristiki), 2)
+        np.testing.assert_allclose(karakteristiki.xy, [[1.5, 2.5], [10, 20]])
+        np.testing.assert_allclose(karakteristiki.agol, [45, 90])
+
+        nazad = karakteristiki.kako_kliucevi()
+        self.assertEqual(nazad[1].pt, (10, 20))
+        self.assertEqual(nazad[0].octave, 1)
+
+    def test_prazni(self):
+        """Тестирај празни Karakteristiki"""
+        karakteristiki = Karakteristiki.od_kliucevi([], None)
+        self.assertEqual(len(karakteristiki), 0)
+        self.assertIsNone(karakteristiki.deskriptori)
+
+    def test_nadovrzi(self):
+        """Тестирај спојување на клучни точки од повеќе региони"""
+        prv = Karakteristiki.od_kliucevi([cv2.KeyPoint(1, 2, 3)], np.zeros((1, 128), dtype=np.float32))
+        vtor = Karakteristiki.od_kliucevi([cv2.KeyPoint(5, 6, 3)], np.ones((1, 128), dtype=np.float32))
+
+        spoeni = Karakteristiki.nadovrzi([prv, Karakteristiki.prazni(), vtor])
+
+        self.assertEqual(len(spoeni), 2)
+        np.testing.assert_allclose(spoeni.xy, [[1, 2], [5, 6]])
+        np.testing.assert_allclose(spoeni.deskriptori[:, 0], [0, 1])
+
+class TestMatching(unittest.TestCase):
+    """Тестови за различните начини на совпаѓање"""
+
+    def setUp(self):
+        """Подготви дескриптори од две слики со преклоп"""
+        slika1, slika2 = napravi_teksturirani_delovi(broj_delovi=2)
+        stitcher = PanoramaStitcher()
+        _, self.deskriptori1 = stitcher.najdi_kliucevi_i_deskriptori(slika1)
+        _, self.deskriptori2 = stitcher.najdi_kliucevi_i_deskriptori(slika2)
+
+    def test_site_matcheri_naogjaat_sovpagjanja(self):
+        """Тестирај дека секој matcher наоѓа совпаѓања"""
+        for tip in ('bf', 'flann', 'crosscheck'):
+            matcher = napravi_matcher(tip)
+            sovpadanja = matcher.sovpadni(self.deskriptori1, self.deskriptori2, 0.7)
+            self.assertGreater(len(sovpadanja), 10, tip)
+
+    def test_flann_indeks_se_gradi_ednash(self):
+        """Тестирај дека FLANN индексот се користи повторно за ист сет дескриптори"""
+        matcher = napravi_matcher('flann', drva=4, proverki=32)
+
+        matcher.sovpadni(self.deskriptori1, self.deskriptori2, 0.7)
+        obratni = matcher.sovpadni(self.deskriptori2, self.deskriptori1.copy(), 0.7)
+
+        self.assertEqual(matcher.broj_izgradeni_indeksi, 1)
+        # Индексите мора да одговараат на редоследот на аргументите
+        self.assertGreater(len(obratni), 0)
+        self.assertLess(obratni.idx1.max(), len(self.deskriptori2))
+        self.assertLess(obratni.idx2.max(), len(self.deskriptori1))
+
+    def test_vektoriziran_test_na_odnos(self):
+        """Тестирај го векторизираниот тест на односот"""
+        indeksi = np.array([[3, 1], [0, 2], [-1, -1]])
+        rastojanija = np.array([[1.0, 10.0], [5.0, 6.0], [1.0, 1.0]], dtype=np.float32)
+
+        sovpadanja = primeni_test_na_odnos(indeksi, rastojanija, 0.7)
+
+        np.testing.assert_array_equal(sovpadanja.idx1, [0])
+        np.testing.assert_array_equal(sovpadanja.idx2, [3])
+
+    def test_bf_se_sovpagja_so_bfmatcher(self):
+        """Тестирај дека исцрпното совпаѓање дава ист резултат како cv2.BFMatcher"""
+        ochekuvani = set()
+        for m, n in cv2.BFMatcher().knnMatch(self.deskriptori1, self.deskriptori2, k=2):
+            if m.distance < 0.7 * n.distance:
+                ochekuvani.add((m.queryIdx, m.trainIdx))
+
+        sovpadanja = napravi_matcher('bf').sovpadni(self.deskriptori1, self.deskriptori2, 0.7)
+
+        self.assertEqual(set(zip(sovpadanja.idx1.tolist(), sovpadanja.idx2.tolist())), ochekuvani)
+
+    def test_nepoznat_matcher(self):
+        """Тестирај дека непознат matcher фрла грешка"""
+        with self.assertRaises(ValueError):
+            napravi_matcher('nepoznat')
+
+class TestDetektori(unittest.TestCase):
+    """Тестови за избор на детектор и пресети"""
+
+    def setUp(self):
+        """Подготви делови со преклоп"""
+        self.delovi = napravi_teksturirani_delovi()
+
+    def test_site_detektori_spojuvaat(self):
+        """Тестирај дека секој детектор дава панорама"""
+        for detektor in DETEKTORI:
+            stitcher = PanoramaStitcher(smer='horizontal', detektor=detektor)
+            panorama = stitcher.napravi_panorama(self.delovi)
+            self.assertIsNotNone(panorama, detektor)
+
+            # AKAZE наоѓа премалку точки на малите синтетички слики
+            if detektor != 'akaze':
+                self.assertEqual(stitcher.broj_ednostavni_spojuvanja, 0, detektor)
+
+    def test_binarni_deskriptori_so_hamming(self):
+        """Тестирај дека ORB и AKAZE се совпаѓаат со Hamming норма"""
+        for detektor in ('orb', 'akaze'):
+            stitcher = PanoramaStitcher(detektor=detektor, matcher='flann')
+            self.assertEqual(stitcher.matcher.norma, cv2.NORM_HAMMING)
+            self.assertTrue(stitcher.matcher.binarni)
+
+        _, deskriptori = PanoramaStitcher(detektor='orb').najdi_kliucevi_i_deskriptori(self.delovi[0])
+        self.assertEqual(deskriptori.dtype, np.uint8)
+
+    def test_preset_gi_nadminuva_parametrite(self):
+        """Тестирај дека пресетот ги поставува детекторот и matcher-от"""
+        for ime, preset in PRESETI.items():
+            stitcher = PanoramaStitcher(preset=ime, detektor='sift', matcher='crosscheck')
+            self.assertEqual(stitcher.ime_na_detektor, preset['detektor'])
+            self.assertEqual(stitcher.matcher.ime, preset['matcher'])
+            self.assertEqual(stitcher.broj_na_kliucevi, preset['broj_na_kliucevi'])
+            self.assertEqual(stitcher.udel_na_preklop, preset.get('udel_na_preklop'))
+
+    def test_izrecen_udel_na_preklop_ima_prednost_pred_presetot(self):
+        """Тестирај дека даден udel_na_preklop не се заменува со оној од пресетот"""
+        stitcher = PanoramaStitcher(preset='fast', udel_na_preklop=0.45)
+        self.assertEqual(stitcher.udel_na_preklop, 0.45)
+
+    def test_preseti_ne_davaat_pogresno_platno(self):
+        """Тестирај дека секој пресет дава панорама со разумна големина и без прости спојувања"""
+        sliki, _, _ = sozdadi_sekvenca(1200, 450, 3, 0.4, seme=4)
+        for ime in PRESETI:
+            stitcher = PanoramaStitcher(preset=ime)
+            panorama = stitcher.napravi_panorama(sliki)
+            self.assertIsNotNone(panorama, ime)
+            self.assertEqual(stitcher.broj_ednostavni_spojuvanja, 0, ime)
+            self.assertTrue(razumna_golemina(panorama, sliki), ime)
+
+    def test_nepoznat_detektor_i_preset(self):
+        """Тестирај дека непознат детектор или пресет фрла грешка"""
+        with self.assertRaises(ValueError):
+            PanoramaStitcher(detektor='surf')
+        with self.assertRaises(ValueError):
+            PanoramaStitcher(preset='nepoznat')
+
+class TestFeatureCache(unittest.TestCase):
+    """Тестови за кешот на клучни точки"""
+
+    def test_kluc_zavisi_od_sodrzina(self):
+        """Тестирај дека клучот зависи од содржината, а не од објектот"""
+        slika = np.zeros((50, 50, 3), dtype=np.uint8)
+        self.assertEqual(presmetaj_kluc_na_slika(slika), presmetaj_kluc_na_slika(slika.copy()))
+
+        druga = slika.copy()
+        druga[0, 0] = 1
+        self.assertNotEqual(presmetaj_kluc_na_slika(slika), presmetaj_kluc_na_slika(druga))
+
+    def test_lru_isfrluvanje_po_bajti(self):
+        """Тестирај исфрлување на најстариот запис кога ќе се надмине буџетот"""
+        karakteristiki = Karakteristiki.prazni()
+        karakteristiki.deskriptori = np.zeros((1, 100), dtype=np.uint8)  # 100 бајти
+        kes = FeatureCache(maks_bajti=250)
+
+        kes.stavi('a', karakteristiki)
+        kes.stavi('b', karakteristiki)
+        kes.zemi('a')  # 'a' станува најново користен
+        kes.stavi('c', karakteristiki)
+
+        self.assertIn('a', kes)
+        self.assertNotIn('b', kes)
+        self.assertIn('c', kes)
+        self.assertLessEqual(kes.zafateni_bajti, 250)
+
+    def test_kes_ne_gi_cuva_slikite(self):
+        """Тестирај дека кешот ги брои само клучните точки, без сивата слика"""
+        stitcher = PanoramaStitcher(broj_rabotnici=1)
+        slika = napravi_teksturirani_delovi(broj_delovi=1)[0]
+        karakteristiki = stitcher.najdi_karakteristiki(slika)
+
+        self.assertEqual(stitcher.kes_na_karakteristiki.zafateni_bajti, karakteristiki.nbytes)
+        self.assertIs(stitcher.najdi_karakteristiki(slika), karakteristiki)
+
+    def test_stitcher_koristi_kes(self):
+        """Тестирај дека SIFT се извршува само еднаш за иста слика"""
+        stitcher = PanoramaStitcher()
+        slika = np.random.RandomState(0).randint(0, 255, (120, 120, 3)).astype(np.uint8)
+
+        stitcher.najdi_kliucevi_i_deskriptori(slika)
+        stitcher.najdi_kliucevi_i_deskriptori(slika.copy())
+
+        self.assertEqual(stitcher.kes_na_karakteristiki.promasuvanja, 1)
+        self.assertEqual(stitcher.kes_na_karakteristiki.pogodoci, 1)
+
+    def test_kes_na_disk_pomegju_izvrsuvanja(self):
+        """Тестирај дека второ извршување со истиот директориум не детектира ништо"""
+        delovi = napravi_teksturirani_delovi()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            prv = PanoramaStitcher(smer='horizontal', broj_rabotnici=1, kes_direktorium=temp_dir)
+            ocekuvana = prv.napravi_panorama(delovi)
+
+            vtor = PanoramaStitcher(smer='horizontal', broj_rabotnici=1, kes_direktorium=temp_dir,
+                                    isecuvanje='vnatresen')
+            panorama = vtor.napravi_panorama(delovi)
+
+            izvestaj = vtor.statistika.izvestaj()
+            self.assertNotIn('detekcija', izvestaj['etapi'])
+            self.assertGreater(izvestaj['broevi']['pogodoci_vo_kes_na_disk'], 0)
+            self.assertEqual(izvestaj['broevi']['inlieri'], prv.statistika.izvestaj()['broevi']['inlieri'])
+            # Различното исечување е само друг правоаголник од истата панорама
+            self.assertTrue(all(a <= b for a, b in zip(panorama.shape, ocekuvana.shape)))
+
+    def test_kes_na_disk_isfrluvanje(self):
+        """Тестирај дека кешот на диск ги брише најдавно користените фајлови"""
+        karakteristiki = Karakteristiki.od_kliucevi(*cv2.SIFT_create().detectAndCompute(
+            napravi_teksturirani_delovi(broj_delovi=1)[0], None
+        ))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            kes = DiskFeatureCache(temp_dir)
+            kes.stavi('a', karakteristiki)
+            golemina = kes.zafateni_bajti
+            np.testing.assert_array_equal(kes.zemi('a').deskriptori, karakteristiki.deskriptori)
+            self.assertIsNone(kes.zemi('nema'))
+
+            kes.maks_bajti = int(golemina * 2.5)
+            kes.stavi('b', karakteristiki)
+            os.utime(kes._patistina('a'), (0, 0))  # 'a' е најдавно користен
+            kes.stavi('c', karakteristiki)
+
+            self.assertIsNone(kes.zemi('a'))
+            self.assertIsNotNone(kes.zemi('b'))
+            self.assertIsNotNone(kes.zemi('c'))
+            self.assertLessEqual(kes.zafateni_bajti, kes.maks_bajti)
+
+    def test_kes_na_disk_osteten_fajl(self):
+        """Тестирај дека скратен или оштетен фајл е промашување и се брише"""
+        karakteristiki = Karakteristiki.od_kliucevi(*cv2.SIFT_create().detectAndCompute(
+            napravi_teksturirani_delovi(broj_delovi=1)[0], None
+        ))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            kes = DiskFeatureCache(temp_dir)
+            for kluc, sodrzina in (('skraten', None), ('ne_e_zip', b'PK\x03\x04 ova ne e zip')):
+                with self.subTest(kluc=kluc):
+                    kes.stavi(kluc, karakteristiki)
+                    patistina = kes._patistina(kluc)
+                    with open(patistina, 'r+b') as f:
+                        if sodrzina is None:
+                            f.truncate(os.path.getsize(patistina) // 2)
+                        else:
+                            f.truncate(0)
+                            f.write(sodrzina)
+
+                    self.assertIsNone(kes.zemi(kluc))
+                    self.assertFalse(os.path.exists(patistina))
+
+    def test_kes_na_disk_neuspesno_zapisuvanje(self):
+        """Тестирај дека при грешка во запишувањето не останува привремен фајл"""
+        karakteristiki = Karakteristiki.od_kliucevi(*cv2.SIFT_create().detectAndCompute(
+            napravi_teksturirani_delovi(broj_delovi=1)[0], None
+        ))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            kes = DiskFeatureCache(temp_dir)
+            # Директориум на местото на фајлот: os.replace фрла OSError
+            os.makedirs(kes._patistina('a'))
+            kes.stavi('a', karakteristiki)
+
+            self.assertEqual([ime for ime in os.listdir(temp_dir) if ime.endswith('.tmp')], [])
+            self.assertEqual(kes.zafateni_bajti, 0)
+
+    def test_kes_na_disk_prezapisuvanje(self):
+        """Тестирај дека повторното запишување на истиот клуч не ја брои големината двапати"""
+        karakteristiki = Karakteristiki.od_kliucevi(*cv2.SIFT_create().detectAndCompute(
+            napravi_teksturirani_delovi(broj_delovi=1)[0], None
+        ))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            kes = DiskFeatureCache(temp_dir)
+            kes.stavi('a', karakteristiki)
+            kes.stavi('a', karakteristiki)
+
+            self.assertEqual(kes.zafateni_bajti, os.path.getsize(kes._patistina('a')))
+
+class TestParalelnaDetekcija(unittest.TestCase):
+    """Тестови за паралелната детекција на клучни точки"""
+
+    def setUp(self):
+        """Подготви делови со преклоп"""
+        self.delovi = napravi_teksturirani_delovi(broj_delovi=4)
+
+    def test_predpresmetka_go_polni_kesot(self):
+        """Тестирај дека спојувањето ги зема клучните точки пресметани паралелно"""
+        stitcher = PanoramaStitcher(smer='horizontal', broj_rabotnici=3)
+        stitcher.predpresmetaj_karakteristiki(self.delovi)
+        self.assertEqual(stitcher.kes_na_karakteristiki.promasuvanja, 4)
+
+        stitcher.napravi_panorama(self.delovi)
+        self.assertEqual(stitcher.kes_na_karakteristiki.promasuvanja, 4)
+
+    def test_potrosuvacot_gi_ima_site_niski(self):
+        """Тестирај дека ограничувањето на нишките на OpenCV не важи додека се спојува вратената слика"""
+        prethodni = cv2.getNumThreads()
+        cv2.setNumThreads(8)
+        try:
+            stitcher = PanoramaStitcher(smer='horizontal', broj_rabotnici=4)
+            niski = [cv2.getNumThreads() for _ in stitcher.so_karakteristiki_odnapred(self.delovi)]
+            self.assertEqual(niski, [8] * len(self.delovi))
+            self.assertEqual(cv2.getNumThreads(), 8)
+
+            # И прекинат генератор го враќа бројот на нишки
+            generator = stitcher.so_karakteristiki_odnapred(self.delovi * 3)
+            next(generator)
+            generator.close()
+            self.assertEqual(cv2.getNumThreads(), 8)
+        finally:
+            cv2.setNumThreads(prethodni)
+
+    def test_ist_rezultat_kako_sekvencijalno(self):
+        """Тестирај дека паралелната детекција дава исти клучни точки и панорама"""
+        sekvencijalen = PanoramaStitcher(smer='horizontal', broj_rabotnici=1)
+        paralelen = PanoramaStitcher(smer='horizontal', broj_rabotnici=4)
+
+        np.testing.assert_array_equal(
+            sekvencijalen.napravi_panorama(self.delovi), paralelen.napravi_panorama(self.delovi)
+        )
+        for del_ in self.delovi:
+            np.testing.assert_array_equal(
+                sekvencijalen.najdi_karakteristiki(del_).xy, paralelen.najdi_karakteristiki(del_).xy
+            )
+
+class TestStrimuvanje(unittest.TestCase):
+    """Тестови за спојување на слики од генератор"""
+
+    def setUp(self):
+        """Подготви делови со преклоп"""
+        self.delovi = napravi_teksturirani_delovi(broj_delovi=4)
+
+    def test_generator_kako_lista(self):
+        """Тестирај дека генератор дава иста панорама како листа, во двата режими"""
+        for rezim in ('inkrementalen', 'globalen'):
+            with self.subTest(rezim=rezim):
+                od_lista = PanoramaStitcher(smer='horizontal', rezim=rezim).napravi_panorama(self.delovi)
+                od_generator = PanoramaStitcher(smer='horizontal', rezim=rezim).napravi_panorama(
+                    del_ for del_ in self.delovi
+                )
+                np.testing.assert_array_equal(od_lista, od_generator)
+
+    def test_premalku_sliki_od_generator(self):
+        """Тестирај дека генератор со една слика не дава панорама"""
+        stitcher = PanoramaStitcher()
+        self.assertIsNone(stitcher.napravi_panorama(iter(self.delovi[:1])))
+
+class TestPlocki(unittest.TestCase):
+    """Тестови за трансформирање на сликите во платното плочка по плочка"""
+
+    def test_podeli_na_plocki(self):
+        """Тестирај дека плочките го покриваат правоаголникот без преклоп"""
+        plocki = podeli_na_plocki(10, 20, 1010, 520, 300)
+        self.assertEqual(len(plocki), 4 * 2)
+        self.assertEqual(sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in plocki), 1000 * 500)
+        self.assertEqual(plocki[-1], (910, 320, 1010, 520))
+
+    def test_isto_kako_cel_warp(self):
+        """Тестирај дека паралелните плочки даваат исти пиксели како еден warpPerspective"""
+        slika = napravi_teksturirani_delovi(broj_delovi=1, sirina_na_del=400, visina=300)[0]
+        homografija = np.array([[1.1, 0.05, 900], [0.02, 0.95, 200], [1e-4, 1e-5, 1]])
+
+        cel = cv2.warpPerspective(slika, homografija, (2000, 900))
+        maska = cv2.warpPerspective(
+            np.full(slika.shape[:2], 255, dtype=np.uint8), homografija, (2000, 900), flags=cv2.INTER_NEAREST
+        ) > 0
+
+        # Поместениот изворен исечок може да ја смени интерполацијата најмногу за 1
+        platno = np.zeros_like(cel)
+        iscrtaj_vo_plocki(platno, slika, homografija, golemina_na_plocka=128, broj_rabotnici=3)
+        self.assertLessEqual(np.abs(platno.astype(np.int16) - cel).max(), 1)
+
+        # Со pokrienost се запишуваат само пикселите во сликата
+        platno = np.zeros_like(cel)
+        pokrienost = np.zeros(cel.shape[:2], dtype=bool)
+        iscrtaj_vo_plocki(platno, slika, homografija, pokrienost, golemina_na_plocka=128, broj_rabotnici=3)
+        np.testing.assert_array_equal(pokrienost, maska)
+        self.assertLessEqual(np.abs(platno[maska].astype(np.int16) - cel[maska]).max(), 1)
+        self.assertFalse(platno[~maska].any())
+
+    def test_sirina_nad_10000(self):
+        """Тестирај дека широко платно е дозволено, а ограничувањето е по површина"""
+        stitcher = PanoramaStitcher(maks_megapikseli=100)
+        self.assertFalse(stitcher._platno_e_preveliko(40000, 2000))
+        self.assertTrue(stitcher._platno_e_preveliko(20000, 6000))
+
+    def test_spoji_so_homografija_bez_kopija(self):
+        """Тестирај дека спојувањето го алоцира платното само еднаш и дава ист резултат"""
+        delovi = napravi_teksturirani_delovi(broj_delovi=2, sirina_na_del=400, pomestuvanje=250, visina=300)
+        stitcher = PanoramaStitcher(smer='horizontal', golemina_na_plocka=64, broj_rabotnici=1)
+        par = stitcher.registriraj_par(delovi[0], delovi[1])
+        stitcher.presmetaj_homografija_za_par(par)
+
+        tracemalloc.start()
+        rezultat, transformacija1, transformacija2 = stitcher._spoji_so_homografija(
+            delovi[0], delovi[1], 'horizontal', par
+        )
+        _, najmnogu = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Платното и мали плочки, без второ платно со иста големина
+        self.assertLess(najmnogu, 1.5 * rezultat.nbytes)
+
+        visina, sirina = rezultat.shape[:2]
+        ocekuvan = cv2.warpPerspective(delovi[1], transformacija2, (sirina, visina))
+        x, y = int(transformacija1[0, 2]), int(transformacija1[1, 2])
+        ocekuvan[y:y + 300, x:x + 400] = delovi[0]
+        np.testing.assert_array_equal(rezultat[y:y + 300, x:x + 400], delovi[0])
+        razlika = np.abs(rezultat.astype(np.int16) - ocekuvan)
+        self.assertLess(np.count_nonzero(razlika > 1) / razlika.size, 0.01)
+
+    def test_mali_plocki_ista_panorama(self):
+        """Тестирај дека големината на плочките не ја менува панорамата"""
+        delovi = napravi_teksturirani_delovi(broj_delovi=3)
+        for rezim in ('inkrementalen', 'globalen'):
+            with self.subTest(rezim=rezim):
+                np.testing.assert_array_equal(
+                    PanoramaStitcher(smer='horizontal', rezim=rezim).napravi_panorama(delovi),
+                    PanoramaStitcher(smer='horizontal', rezim=rezim, golemina_na_plocka=64,
+                                     broj_rabotnici=3).napravi_panorama(delovi)
+                )
+
+class TestMemmapPlatno(unittest.TestCase):
+    """Тестови за платно во np.memmap фајл"""
+
+    def test_napravi_platno(self):
+        """Тестирај дека платното во директориум е празен memmap"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            platno = napravi_platno((30, 40, 3), direktorium=temp_dir)
+            self.assertIsInstance(platno, np.memmap)
+            self.assertEqual(platno.shape, (30, 40, 3))
+            self.assertFalse(platno.any())
+        self.assertNotIsInstance(napravi_platno((30, 40, 3)), np.memmap)
+
+    def test_ista_panorama_kako_vo_ram(self):
+        """Тестирај дека memmap платното дава иста панорама, што може да се зачува"""
+        delovi = napravi_teksturirani_delovi(broj_delovi=3)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for rezim in ('inkrementalen', 'globalen'):
+                with self.subTest(rezim=rezim):
+                    vo_ram = PanoramaStitcher(smer='horizontal', rezim=rezim).napravi_panorama(delovi)
+                    na_disk = PanoramaStitcher(
+                        smer='horizontal', rezim=rezim, privremen_direktorium=temp_dir
+                    ).napravi_panorama(delovi)
+
+                    self.assertIsInstance(na_disk, np.memmap)
+                    np.testing.assert_array_equal(vo_ram, na_disk)
+
+                    patistina = os.path.join(temp_dir, f"{rezim}.png")
+                    self.assertTrue(zacuvaj_slika(na_disk, patistina))
+                    np.testing.assert_array_equal(cv2.imread(patistina), vo_ram)
+
+    def test_opfat_na_sodrzina(self):
+        """Тестирај дека опфатот по појаси е ист како boundingRect врз целата слика"""
+        slika = np.zeros((300, 200, 3), dtype=np.uint8)
+        slika[37:251, 15:160] = 200
+        slika[280, 190] = 50
+
+        siva = cv2.cvtColor(slika, cv2.COLOR_BGR2GRAY)
+        ocekuvan = cv2.boundingRect(cv2.findNonZero((siva > 10).astype(np.uint8)))
+
+        self.assertEqual(opfat_na_sodrzina(slika, 10, visina_na_pojas=64), ocekuvan)
+        self.assertIsNone(opfat_na_sodrzina(np.zeros((50, 50, 3), dtype=np.uint8)))
+
+class TestEdnoDoDrugo(unittest.TestCase):
+    """Тестови за спојување на слики без преклоп во едно платно"""
+
+    def test_isto_kako_niza_od_spojuvanja(self):
+        """Тестирај дека едното платно е исто како спојувањето на парови"""
+        rng = np.random.RandomState(3)
+        stitcher = PanoramaStitcher()
+        for smer in ('horizontal', 'vertical'):
+            for _ in range(10):
+                sliki = [
+                    rng.randint(1, 255, (rng.randint(20, 90), rng.randint(20, 90), 3)).astype(np.uint8)
+                    for _ in range(rng.randint(2, 6))
+                ]
+                na_vrv = [False] + [bool(rng.randint(2)) for _ in sliki[1:]]
+
+                panorama = sliki[0]
+                transformacii = [np.eye(3)]
+                for slika, gore in zip(sliki[1:], na_vrv[1:]):
+                    panorama, transformacija1, transformacija2 = stitcher._spoji_edno_do_drugo(
+                        panorama, slika, smer, gore
+                    )
+                    transformacii = [transformacija1.dot(t) for t in transformacii] + [transformacija2]
+
+                rezultat, transformacii_odednas, _ = stitcher._spoji_site_edno_do_drugo(sliki, smer, na_vrv)
+                np.testing.assert_array_equal(rezultat, panorama)
+                for ocekuvana, dobiena in zip(transformacii, transformacii_odednas):
+                    np.testing.assert_allclose(dobiena, ocekuvana)
+
+    def test_centrirano_secenje(self):
+        """Тестирај го распоредот кога висините се разликуваат повеќе од 20 пиксели"""
+        (visina, sirina), rasporedi = rasporedi_edno_do_drugo([(100, 50), (60, 40), (70, 30)])
+        self.assertEqual((visina, sirina), (70, 120))
+        self.assertEqual(rasporedi[0], ((20, 80, 0, 50), (0, 0)))
+        self.assertEqual(rasporedi[1], ((0, 60, 0, 40), (0, 50)))
+        self.assertEqual(rasporedi[2], ((0, 70, 0, 30), (0, 90)))
+
+    def test_rezim_edno_do_drugo(self):
+        """Тестирај го режимот за слики без преклоп со генератор на влез"""
+        delovi = [np.full((50, 40, 3), 30 * (i + 1), dtype=np.uint8) for i in range(4)]
+        stitcher = PanoramaStitcher(smer='horizontal', rezim='edno_do_drugo')
+        panorama = stitcher.napravi_panorama(del_ for del_ in delovi)
+
+        np.testing.assert_array_equal(panorama, np.hstack(delovi))
+        self.assertEqual(stitcher.broj_ednostavni_spojuvanja, 3)
+
+class TestValidenRegion(unittest.TestCase):
+    """Тестови за аналитичкото следење на регионот покриен со слики"""
+
+    def test_temna_sodrzina_ne_se_sece(self):
+        """Тестирај дека темните делови од сликите не се сечат како црна рамка"""
+        delovi = napravi_teksturirani_delovi(broj_delovi=3)
+        delovi[0][:, :30] = 0
+        delovi[-1][:, -30:] = 0
+
+        for rezim in ('inkrementalen', 'globalen'):
+            with self.subTest(rezim=rezim):
+                panorama = PanoramaStitcher(smer='horizontal', rezim=rezim).napravi_panorama(delovi)
+                self.assertGreaterEqual(panorama.shape[1], 200 + 2 * 120 - 2)
+                self.assertFalse(panorama[:, :25].any())
+
+    def test_vnatresen_pravoagolnik_bez_prazni_pikseli(self):
+        """Тестирај дека внатрешното исечување нема празни пиксели"""
+        delovi = napravi_teksturirani_delovi(broj_delovi=3)
+        for rezim in ('inkrementalen', 'globalen'):
+            with self.subTest(rezim=rezim):
+                stitcher = PanoramaStitcher(smer='horizontal', rezim=rezim, isecuvanje='vnatresen')
+                panorama = stitcher.napravi_panorama(delovi)
+                self.assertFalse((panorama == 0).all(axis=2).any())
+
+    def test_najgolem_pravoagolnik_vo_maska(self):
+        """Тестирај го најголемиот правоаголник на позната маска"""
+        maska = np.zeros((10, 12), dtype=np.uint8)
+        maska[2:9, 1:5] = 1
+        maska[4:7, 1:11] = 1
+        self.assertEqual(najgolem_pravoagolnik_vo_maska(maska), (1, 4, 10, 3))
+        self.assertEqual(najgolem_pravoagolnik_vo_maska(np.zeros((3, 3))), (0, 0, 0, 0))
+
+    def test_poligon_bez_pravoagolnik(self):
+        """Тестирај дека деловите надвор од правоаголникот ја имаат точната површина"""
+        poligon = poligon_na_slika(100, 100, translaciona_matrica(50, 20))
+        delovi = poligon_bez_pravoagolnik(poligon, (0, 0, 80, 70), 200, 200)
+        povrsina = sum(cv2.contourArea(del_) for del_ in delovi)
+        self.assertAlmostEqual(povrsina, 100 * 100 - 30 * 50, places=3)
+
+        delovi = iseci_poligoni([poligon, poligon_na_slika(10, 10, translaciona_matrica(500, 500))], 100, 120)
+        self.assertEqual(len(delovi), 1)
+        self.assertEqual(opfat_na_poligoni(delovi, 100, 120), (50, 20, 70, 80))
+
+class TestStatistika(unittest.TestCase):
+    """Тестови за мерењата по етапи и бројачите"""
+
+    def test_etapi_broevi_i_pretplatnici(self):
+        """Тестирај дека времињата и бројачите се собираат и претплатниците ги добиваат"""
+        statistika = Statistika()
+        primeni = []
+        statistika.pretplati(lambda vid, ime, vrednost: primeni.append((vid, ime)))
+
+        for _ in range(2):
+            with statistika.etapa('detekcija'):
+                pass
+        statistika.dodadi('kliucevi', 10)
+        statistika.dodadi('kliucevi', 5)
+
+        izvestaj = statistika.izvestaj()
+        self.assertEqual(izvestaj['etapi']['detekcija']['povici'], 2)
+        self.assertGreaterEqual(izvestaj['etapi']['detekcija']['vreme'], 0)
+        self.assertEqual(izvestaj['broevi'], {'kliucevi': 15})
+        self.assertEqual(primeni, [('etapa', 'detekcija')] * 2 + [('broj', 'kliucevi')] * 2)
+
+        statistika.resetiraj()
+        self.assertEqual(statistika.izvestaj(), {'etapi': {}, 'broevi': {}})
+
+    def test_stitcher_gi_popolnuva_etapite(self):
+        """Тестирај дека панорамата ги мери етапите на обработката"""
+        stitcher = PanoramaStitcher(smer='horizontal', broj_rabotnici=1)
+        self.assertIsNotNone(stitcher.napravi_panorama(napravi_teksturirani_delovi()))
+
+        izvestaj = stitcher.statistika.izvestaj()
+        for etapa in ('sivo', 'detekcija', 'sovpagjanje', 'ransac', 'transformacija', 'kompozicija', 'isecuvanje'):
+            self.assertIn(etapa, izvestaj['etapi'])
+        broevi = izvestaj['broevi']
+        self.assertGreaterEqual(broevi['sovpadanja'], broevi['inlieri'])
+        self.assertGreater(broevi['inlieri'], 0)
+        self.assertGreater(broevi['alocirani_bajti'], 0)
+
+class TestMerenjeNaPerformansi(unittest.TestCase):
+    """Тестови за сличноста и споредбата со основната линија"""
+
+    def test_slicnost(self):
+        """Тестирај дека истата сцена е слична, а поместената помалку"""
+        _, _, scena = sozdadi_sekvenca(400, 120, 3, 0.4)
+        self.assertAlmostEqual(slicnost(scena, scena), 1.0, places=6)
+        self.assertLess(slicnost(np.roll(scena, 40, axis=1), scena), 0.9)
+
+    def test_osnova_so_drugi_podesuvanja(self):
+        """Тестирај дека се пријавуваат различните и незапишаните подесувања на основната линија"""
+        podesuvanja = {'rezim': 'inkrementalen', 'maks_sirina': 1200, 'sinteticki_preklop': 0.4, 'procesori': 8}
+
+        self.assertEqual(razliki_vo_podesuvanjata(podesuvanja, dict(podesuvanja, procesori=1)), [])
+        razliki = razliki_vo_podesuvanjata(podesuvanja, {'rezim': 'globalen', 'maks_sirina': 1200})
+        self.assertEqual(len(razliki), 2)
+        self.assertTrue(razliki[0].startswith('rezim'))
+        self.assertTrue(razliki[1].startswith('sinteticki_preklop'))
+
+    def test_sinteticki_slucai(self):
+        """Тестирај дека синтетичкиот случај BROJxVISINA дава толку слики со таа висина"""
+        slucaj = napravi_slucai([], ['3x120'], {}, 1200, 1)['sinteticki_3x120']
+        delovi, _, _ = sozdadi_sekvenca(slucaj['sirina'], slucaj['visina'], slucaj['broj_sliki'], SINTETICKI_PREKLOP)
+        self.assertEqual([del_.shape for del_ in delovi], [(120, 160, 3)] * 3)
+
+    def test_sporedi_so_osnova(self):
+        """Тестирај дека се пријавуваат само регресиите поголеми од праговите"""
+        osnova = {
+            'a': {'uspeh': True, 'vreme': 1.0, 'tracemalloc_vrv_mb': 10, 'rss_vrv_mb': 100, 'slicnost': 0.9},
+            'b': {'uspeh': True, 'vreme': 1.0, 'tracemalloc_vrv_mb': 10, 'rss_vrv_mb': 100, 'slicnost': 0.9},
+        }
+        rezultati = {
+            'a': {'uspeh': True, 'vreme': 1.1, 'tracemalloc_vrv_mb': 11, 'rss_vrv_mb': 100, 'slicnost': 0.89},
+            'b': {'uspeh': True, 'vreme': 1.5, 'tracemalloc_vrv_mb': 20, 'rss_vrv_mb': 100, 'slicnost': 0.8},
+            'nov': {'uspeh': False, 'vreme': 9.0},
+        }
+
+        regresii = sporedi_so_osnova(rezultati, osnova)
+        self.assertEqual(len(regresii), 3)
+        self.assertTrue(all(poraka.startswith('b:') for poraka in regresii))
+
+class TestSintetickiSekvenci(unittest.TestCase):
+    """Тестови за генераторот на синтетички секвенци со позната хомографија"""
+
+    def test_homografiite_gi_opisuvaat_delovite(self):
+        """Тестирај дека секој дел е делот од сцената што го дава неговата хомографија"""
+        for smer in ('horizontal', 'vertical'):
+            with self.subTest(smer=smer):
+                sirina, visina = (900, 300) if smer == 'horizontal' else (300, 900)
+                delovi, homografii, scena = sozdadi_sekvenca(sirina, visina, 3, 0.4, smer, seme=1)
+
+                self.assertEqual(scena.shape, (visina, sirina, 3))
+                for del_, H in zip(delovi, homografii):
+                    # Без поместување и ротација делот е точен исечок од сцената
+                    x, y = int(H[0, 2]), int(H[1, 2])
+                    h, w = del_.shape[:2]
+                    np.testing.assert_array_equal(del_, scena[y:y + h, x:x + w])
+
+    def test_registracija_ja_naogja_vistinskata_homografija(self):
+        """Тестирај дека регистрацијата на поместени и ротирани делови е точна до пиксел"""
+        delovi, homografii, _ = sozdadi_sekvenca(1200, 450, 3, 0.45, tresenje=6, rotacija=2, seme=3)
+        stitcher = PanoramaStitcher(smer='horizontal', broj_rabotnici=1)
+
+        for i in range(len(delovi) - 1):
+            par = stitcher.registriraj_par(delovi[i], delovi[i + 1])
+            H, _ = stitcher.presmetaj_homografija_za_par(par)
+            vistinska = np.linalg.inv(homografii[i]).dot(homografii[i + 1])
+
+            h, w = delovi[i + 1].shape[:2]
+            centar = np.array([[[w / 2, h / 2]]], dtype=np.float64)
+            np.testing.assert_allclose(
+                cv2.perspectiveTransform(centar, H), cv2.perspectiveTransform(centar, vistinska), atol=1.0
+            )
+
+class TestManifest(unittest.TestCase):
+    """Тестови за ажурирање на панорама кога се додаваат или менуваат делови"""
+
+    def setUp(self):
+        self.delovi, _, _ = sozdadi_sekvenca(1800, 450, 5, 0.4, tresenje=5, rotacija=1, seme=2)
+        self.hesovi = [presmetaj_kluc_na_slika(del_) for del_ in self.delovi]
+
+    def test_se_registriraat_samo_novite_delovi(self):
+        """Тестирај дека додадените делови не ги вчитуваат старите и резултатот е ист како целосното компонирање"""
+        stitcher = PanoramaStitcher(smer='horizontal', broj_rabotnici=1)
+        stara, manifest = stitcher.azuriraj_panorama(self.hesovi[:3], lambda i: self.delovi[i])
+
+        vcitani = []
+        def vcitaj(i):
+            vcitani.append(i)
+            return self.delovi[i]
+
+        stitcher = PanoramaStitcher(smer='horizontal', broj_rabotnici=1)
+        panorama, nov_manifest = stitcher.azuriraj_panorama(self.hesovi, vcitaj, manifest, stara)
+
+        # Само последниот стар дел (за парот со првиот нов) и новите
+        self.assertEqual(sorted(set(vcitani)), [2, 3, 4])
+        self.assertEqual(stitcher.statistika.izvestaj()['broevi']['povtorno_iskoristeni_parovi'], 2)
+        self.assertEqual(len(nov_manifest['delovi']), 5)
+
+        # Истите хомографии, но сите делови компонирани одново
+        celosna, _ = PanoramaStitcher(smer='horizontal', broj_rabotnici=1).azuriraj_panorama(
+            self.hesovi, lambda i: self.delovi[i], manifest
+        )
+        self.assertEqual(panorama.shape, celosna.shape)
+        razlicni = np.any(panorama != celosna, axis=2).mean()
+        self.assertLess(razlicni, 0.005)
+
+    def test_promenet_del_se_registrira_odnovo(self):
+        """Тестирај дека променет дел ги регистрира одново само своите два пара"""
+        stitcher = PanoramaStitcher(smer='horizontal', broj_rabotnici=1)
+        stara, manifest = stitcher.azuriraj_panorama(self.hesovi, lambda i: self.delovi[i])
+
+        hesovi = list(self.hesovi)
+        hesovi[2] = 'promenet'
+        stitcher = PanoramaStitcher(smer='horizontal', broj_rabotnici=1)
+        panorama, _ = stitcher.azuriraj_panorama(hesovi, lambda i: self.delovi[i], manifest, stara)
+
+        self.assertEqual(stitcher.statistika.izvestaj()['broevi']['povtorno_iskoristeni_parovi'], 2)
+        self.assertEqual(panorama.shape, stara.shape)
+
+    def test_folder_se_azurira_na_mesto(self):
+        """Тестирај дека со манифест резултатот се ажурира наместо да се креира _Result_1"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            folder = os.path.join(temp_dir, "Test_Panorama")
+            os.makedirs(folder)
+            for i, del_ in enumerate(self.delovi[:3], start=1):
+                cv2.imwrite(os.path.join(folder, f"Test_panorama_Part{i}.jpg"), del_)
+
+            parametri = dict(smer='horizontal', broj_rabotnici=1, manifest=True)
+            self.assertTrue(obraboti_panorama_folder(folder, **parametri))
+            sirina_pred = cv2.imread(os.path.join(folder, "Test_Panorama_Result_horizontal.jpg")).shape[1]
+
+            for i, del_ in enumerate(self.delovi[3:], start=4):
+                cv2.imwrite(os.path.join(folder, f"Test_panorama_Part{i}.jpg"), del_)
+            statistika = Statistika()
+            self.assertTrue(obraboti_panorama_folder(folder, statistika=statistika, **parametri))
+
+            # Последниот стар дел, двата нови и PNG копијата од претходниот резултат
+            self.assertEqual(statistika.izvestaj()['etapi']['dekodiranje']['povici'], 4)
+            self.assertFalse(os.path.exists(os.path.join(folder, "Test_Panorama_Result_horizontal_1.jpg")))
+            rezultat = cv2.imread(os.path.join(folder, "Test_Panorama_Result_horizontal.jpg"))
+            self.assertGreater(rezultat.shape[1], sirina_pred)
+            self.assertTrue(os.path.exists(os.path.join(folder, "Test_Panorama_Manifest_horizontal.json")))
+
+            # Без промени резултатот не се декодира одново
+            statistika = Statistika()
+            self.assertTrue(obraboti_panorama_folder(folder, statistika=statistika, **parametri))
+            self.assertNotIn('dekodiranje', statistika.izvestaj()['etapi'])
+
+    def test_dodavanjeto_prodolzuva_od_kopija_bez_zaguba(self):
+        """Тестирај дека при додавање старите пиксели се земаат точно од PNG копијата"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            folder = os.path.join(temp_dir, "Test_Panorama")
+            os.makedirs(folder)
+            for i, del_ in enumerate(self.delovi[:3], start=1):
+                cv2.imwrite(os.path.join(folder, f"Test_panorama_Part{i}.jpg"), del_)
+
+            parametri = dict(smer='horizontal', broj_rabotnici=1, manifest=True)
+            patistina_na_manifest = os.path.join(folder, "Test_Panorama_Manifest_horizontal.json")
+            patistina_na_kopija = os.path.join(folder, "Test_Panorama_Manifest_horizontal.png")
+
+            self.assertTrue(obraboti_panorama_folder(folder, **parametri))
+            stara = cv2.imread(patistina_na_kopija)
+            with open(patistina_na_manifest, encoding='utf-8') as f:
+                star_pocetok = json.load(f)['rezultat']['pocetok']
+
+            for i, del_ in enumerate(self.delovi[3:], start=4):
+                cv2.imwrite(os.path.join(folder, f"Test_panorama_Part{i}.jpg"), del_)
+            self.assertTrue(obraboti_panorama_folder(folder, **parametri))
+            nova = cv2.imread(patistina_na_kopija)
+            with open(patistina_na_manifest, encoding='utf-8') as f:
+                nov_pocetok = json.load(f)['rezultat']['pocetok']
+
+            # Старата панорама е во новата непроменета, пиксел по пиксел
+            x0, y0 = star_pocetok[0] - nov_pocetok[0], star_pocetok[1] - nov_pocetok[1]
+            region = nova[y0:y0 + stara.shape[0], x0:x0 + stara.shape[1]]
+            popolneti = np.any(stara > 0, axis=2)
+            np.testing.assert_array_equal(region[popolneti], stara[popolneti])
+
+            # JPEG резултатот е енкодиран од истата слика
+            rezultat = cv2.imread(os.path.join(folder, "Test_Panorama_Result_horizontal.jpg"))
+            self.assertEqual(rezultat.shape, nova.shape)
+
+    def test_manifest_bara_globalen_rezim(self):
+        """Тестирај дека манифестот не се комбинира тивко со друг режим"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            folder = os.path.join(temp_dir, "Test_Panorama")
+            os.makedirs(folder)
+            for i, del_ in enumerate(self.delovi[:2], start=1):
+                cv2.imwrite(os.path.join(folder, f"Test_panorama_Part{i}.jpg"), del_)
+
+            self.assertFalse(obraboti_panorama_folder(folder, smer='horizontal', rezim='inkrementalen', manifest=True))
+            self.assertFalse(os.path.exists(os.path.join(folder, "Test_Panorama_Manifest_horizontal.json")))
+
+class PatistinaStoGoUbivaRabotnikot(str):
+    """Патека до папка што го убива процесот на работникот штом тој ќе ја отпакува"""
+
+    def __reduce__(self):
+        return os._exit, (1,)
+
+class TestObrabotkaNaFolderi(unittest.TestCase):
+    """Тестови за паралелна обработка на повеќе папки"""
+
+    def test_padnat_rabotnik_ja_sobori_samo_svojata_papka(self):
+        """Тестирај дека по паѓање на работник останатите папки сепак се обработуваат"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            dobri = []
+            for ime in ("Prva_Panorama", "Vtora_Panorama", "Treta_Panorama"):
+                folder = os.path.join(temp_dir, ime)
+                os.makedirs(folder)
+                for i, del_ in enumerate(napravi_teksturirani_delovi(), start=1):
+                    cv2.imwrite(os.path.join(folder, f"Test_panorama_Part{i}.jpg"), del_)
+                dobri.append(folder)
+            padnat = PatistinaStoGoUbivaRabotnikot(os.path.join(temp_dir, "Padnat_Panorama"))
+
+            folderi = [dobri[0], padnat, dobri[1], dobri[2]]
+            rezultati = obraboti_folderi_paralelno(folderi, dict(smer='horizontal', broj_rabotnici=1), 2)
+
+            self.assertEqual([r[0] for r in rezultati], folderi)
+            self.assertEqual([r[1] for r in rezultati], [True, False, True, True])
+            self.assertIsNotNone(rezultati[1][3])
+            for folder in dobri:
+                self.assertTrue(os.path.exists(os.path.join(folder, f"{os.path.basename(folder)}_Result_horizontal.jpg")))
+
+    def test_paralelni_folderi(self):
+        """Тестирај дека секоја папка има резултат, време и редослед како на влезот"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            dobar = os.path.join(temp_dir, "Test_Panorama")
+            os.makedirs(dobar)
+            for i, del_ in enumerate(napravi_teksturirani_delovi(), start=1):
+                cv2.imwrite(os.path.join(dobar, f"Test_panorama_Part{i}.jpg"), del_)
+            nepostoecki = os.path.join(temp_dir, "Nema_Panorama")
+
+            rezultati = obraboti_folderi_paralelno(
+                [nepostoecki, dobar], dict(smer='horizontal', broj_rabotnici=1), 2
+            )
+
+            self.assertEqual([r[0] for r in rezultati], [nepostoecki, dobar])
+            self.assertEqual([r[1] for r in rezultati], [False, True])
+            self.assertGreater(rezultati[1][2], 0)
+            self.assertTrue(os.path.exists(os.path.join(dobar, "Test_Panorama_Result_horizontal.jpg")))
+
+            # Извештајот од работниот процес стигнува и има ги етапите на обработката
+            izvestaj = rezultati[1][4]
+            self.assertIn('enkodiranje', izvestaj['etapi'])
+            self.assertGreater(izvestaj['broevi']['inlieri'], 0)
+
 class TestImageLoader(unittest.TestCase):
     """Тестови за модулот за вчитување на слики"""
 
@@ -77,6 +1320,53 @@ class TestImageLoader(unittest.TestCase):
             sliki = vcitaj_sliki([patistina1, patistina2])  # <-- CHANGED HERE
             self.assertEqual(len(sliki), 2)
 
+    def test_procitaj_dimenzii(self):
+        """Тестирај читање на димензиите од заглавието"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            slika = np.zeros((120, 340, 3), dtype=np.uint8)
+            for nastavka in ("jpg", "png"):
+                patistina = os.path.join(temp_dir, f"test.{nastavka}")
+                cv2.imwrite(patistina, slika)
+                self.assertEqual(procitaj_dimenzii(patistina), (340, 120))
+
+            patistina = os.path.join(temp_dir, "test.txt")
+            with open(patistina, "w") as f:
+                f.write("не е слика")
+            self.assertIsNone(procitaj_dimenzii(patistina))
+
+    def test_namaleno_dekodiranje_i_redosled(self):
+        """Тестирај дека JPEG се декодира намален и редоследот се задржува"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            patisti = []
+            for i, sirina in enumerate((800, 300, 1700)):
+                patistina = os.path.join(temp_dir, f"test{i}.jpg")
+                cv2.imwrite(patistina, np.full((200, sirina, 3), i * 50, dtype=np.uint8))
+                patisti.append(patistina)
+            patisti.insert(1, os.path.join(temp_dir, "nepostoi.jpg"))
+
+            sliki = vcitaj_sliki(patisti, maksimalna_sirina=200, broj_rabotnici=3)
+
+            self.assertEqual([slika.shape[1] for slika in sliki], [200, 300, 213])
+            self.assertEqual([int(slika[0, 0, 0]) for slika in sliki], [0, 50, 100])
+
+    def test_tok_na_sliki(self):
+        """Тестирај дека потокот ги дава сликите намалени, по ред и повеќе пати"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            patisti = []
+            for i in range(4):
+                patistina = os.path.join(temp_dir, f"test{i}.png")
+                cv2.imwrite(patistina, np.full((100, 400, 3), i * 50, dtype=np.uint8))
+                patisti.append(patistina)
+            patisti.append(os.path.join(temp_dir, "nepostoi.png"))
+
+            tok = TokNaSliki(patisti, maksimalna_sirina=200, prozorec=2)
+            self.assertEqual(len(tok), 4)
+
+            for _ in range(2):
+                sliki = list(tok)
+                self.assertEqual([int(slika[0, 0, 0]) for slika in sliki], [0, 50, 100, 150])
+                self.assertTrue(all(slika.shape[:2] == (50, 200) for slika in sliki))
+
     def test_promeni_golemina_na_slikite(self):
         """Тестирај промена на големина на слики"""
         slika1 = np.zeros((200, 400, 3), dtype=np.uint8)
@@ -108,10 +1398,39 @@ class TestUtils(unittest.TestCase):
             vcitana_slika = cv2.imread(patistina_izlez)
             self.assertIsNotNone(vcitana_slika)
 
+    def test_ogranici_niski_na_opencv(self):
+        """Тестирај дека бројот на нишки на OpenCV се враќа по блокот"""
+        prethodni = cv2.getNumThreads()
+        with ogranici_niski_na_opencv(1):
+            self.assertEqual(cv2.getNumThreads(), 1)
+        self.assertEqual(cv2.getNumThreads(), prethodni)
+
 def run_tests():
     """Изврши ги сите тестови"""
     # Креирај тест суит
     test_suite = unittest.TestLoader().loadTestsFromTestCase(TestPanoramaStitcher)
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestPairRegistration))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestGlobalnaRegistracija))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestGruboKonFino))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestDetekcijaVoRabovi))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestDetekcijaNaSmer))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestModelNaDvizenje))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestMosaicFeatureStore))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestKarakteristiki))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestMatching))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestDetektori))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestFeatureCache))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestParalelnaDetekcija))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestStrimuvanje))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestPlocki))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestMemmapPlatno))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestEdnoDoDrugo))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestValidenRegion))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestStatistika))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestMerenjeNaPerformansi))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestSintetickiSekvenci))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestManifest))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestObrabotkaNaFolderi))
     test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestImageLoader))
     test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestUtils))
 